@@ -0,0 +1,179 @@
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from api.models import Job
+from backend.logger import logger
+
+# 'thread' runs queued jobs on a pool inside the web process, 'external' leaves them to `manage.py run_job_worker`
+JOB_WORKER_MODE = getattr(settings, 'JOB_WORKER_MODE', 'thread')
+# Maximum number of jobs the in-process pool runs at the same time
+JOB_WORKER_THREADS = getattr(settings, 'JOB_WORKER_THREADS', 2)
+# Seconds between heartbeats of a running job
+JOB_HEARTBEAT_INTERVAL = getattr(settings, 'JOB_HEARTBEAT_INTERVAL', 30)
+# A running job without a heartbeat for this long was left behind by a worker that died
+JOB_STALE_AFTER = getattr(settings, 'JOB_STALE_AFTER', 180)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def enqueue(kind, key, payload=None):
+    """
+    Queue a job of the given kind, or return the already queued or running job with the same key.
+    Returns a (job, created) tuple.
+    """
+    key = str(key)
+    try:
+        with transaction.atomic():
+            job = Job.objects.create(kind=kind, key=key, payload=payload or {})
+    except IntegrityError:
+        # Another request queued the same job first; share it unless its worker died
+        job = Job.objects.filter(kind=kind, key=key, status__in=Job.ACTIVE_STATUSES).first()
+        if job is not None and fail_stale_jobs(job_ids=[job.id]):
+            job = None
+        if job is not None:
+            if job.status == Job.STATUS_QUEUED:
+                # The process that queued it may have exited before running it
+                _submit_drain(kind)
+            return job, False
+        # The active job finished or was found dead between our insert and the lookup, so try once more
+        try:
+            with transaction.atomic():
+                job = Job.objects.create(kind=kind, key=key, payload=payload or {})
+        except IntegrityError:
+            # A concurrent request retried first; share its job
+            job = get_active_job(kind, key)
+            if job is None:
+                raise
+            return job, False
+
+    logger.info(f"Queued job {job.id} ({kind}:{key}).")
+    _submit_drain(kind)
+    return job, True
+
+
+def fail_stale_jobs(job_ids=None):
+    """
+    Mark running jobs whose worker stopped sending heartbeats as failed, so that their key can be queued again.
+    Returns the number of jobs marked.
+    """
+    cutoff = timezone.now() - timedelta(seconds=JOB_STALE_AFTER)
+    stale = Job.objects.filter(status=Job.STATUS_RUNNING).filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+    if job_ids is not None:
+        stale = stale.filter(id__in=job_ids)
+    count = stale.update(
+        status=Job.STATUS_FAILED,
+        error="The worker running this job stopped responding.",
+        finished_at=timezone.now(),
+    )
+    if count:
+        logger.warning(f"Marked {count} stale running jobs as failed.")
+    return count
+
+
+def get_active_job(kind, key):
+    return Job.objects.filter(kind=kind, key=str(key), status__in=Job.ACTIVE_STATUSES).first()
+
+
+def claim_next(kinds=None):
+    """
+    Atomically move the oldest queued job to 'running' and return it, or None if the queue is empty.
+    The conditional UPDATE makes claiming safe across threads and worker processes.
+    Running jobs abandoned by a dead worker are failed first, which frees their keys.
+    """
+    fail_stale_jobs()
+    queued = Job.objects.filter(status=Job.STATUS_QUEUED).order_by('created_at')
+    if kinds:
+        queued = queued.filter(kind__in=kinds)
+
+    for job_id in queued.values_list('id', flat=True)[:10]:
+        claimed = Job.objects.filter(id=job_id, status=Job.STATUS_QUEUED).update(
+            status=Job.STATUS_RUNNING,
+            started_at=timezone.now(),
+            heartbeat_at=timezone.now(),
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """
+    Execute a claimed job with its registered handler and store the result or error.
+    """
+    from api.jobs.tasks import JOB_HANDLERS
+
+    handler = JOB_HANDLERS.get(job.kind)
+    stop_heartbeat = threading.Event()
+    threading.Thread(target=_send_heartbeats, args=(job.id, stop_heartbeat), daemon=True).start()
+    try:
+        if handler is None:
+            raise Exception(f"No handler registered for job kind '{job.kind}'.")
+        job.result = handler(job)
+        job.status = Job.STATUS_DONE
+        logger.info(f"Job {job.id} ({job.kind}:{job.key}) finished.")
+    except Exception as e:
+        job.status = Job.STATUS_FAILED
+        job.error = str(e)
+        logger.error(f"Job {job.id} ({job.kind}:{job.key}) failed: {e}\n{traceback.format_exc()}")
+    finally:
+        stop_heartbeat.set()
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+    return job
+
+
+def run_pending(kinds=None):
+    """
+    Run queued jobs until the queue is empty. Returns the number of jobs processed.
+    """
+    processed = 0
+    while True:
+        job = claim_next(kinds)
+        if job is None:
+            return processed
+        run_job(job)
+        processed += 1
+
+
+def _send_heartbeats(job_id, stop):
+    try:
+        while not stop.wait(JOB_HEARTBEAT_INTERVAL):
+            Job.objects.filter(id=job_id, status=Job.STATUS_RUNNING).update(heartbeat_at=timezone.now())
+    except Exception as e:
+        logger.error(f"Heartbeat of job {job_id} failed: {e}")
+    finally:
+        connection.close()
+
+
+def _submit_drain(kind):
+    if JOB_WORKER_MODE == 'thread':
+        _get_executor().submit(_drain_queue, [kind])
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=JOB_WORKER_THREADS, thread_name_prefix='job-worker')
+    return _executor
+
+
+def _drain_queue(kinds):
+    close_old_connections()
+    try:
+        run_pending(kinds)
+    except Exception as e:
+        logger.error(f"Job worker thread crashed: {e}")
+    finally:
+        close_old_connections()
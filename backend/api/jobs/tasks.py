@@ -0,0 +1,69 @@
+from django.utils import timezone
+
+from api.models import Job, Product, Review
+
+# Every training run shares this key, so at most one is queued or running at a time
+TRAIN_MODEL_JOB_KEY = 'sentiment'
+
+
+def scrape_product_job(job):
+    """
+    Scrape all marketplaces for a product and save the results to the database.
+    """
+    # Imported here so the job queue does not pull in Selenium until a scrape actually runs
+    from api.scrapers.scraper_manager import scrape_and_save_product
+
+    product = Product.objects.get(id=job.payload['product_id'])
+    product = scrape_and_save_product(product.name)
+    return {
+        'product_id': product.id,
+        'is_detailed': product.is_detailed,
+    }
+
+
+def refresh_product_job(job):
+    """
+    Re-scrape the stale marketplaces of a detailed product.
+    """
+    from api.scrapers.scraper_manager import refresh_product_sources
+
+    product = Product.objects.get(id=job.payload['product_id'])
+    refresh_product_sources(product, job.payload.get('marketplaces'))
+    return {
+        'product_id': product.id,
+        'marketplaces': job.payload.get('marketplaces'),
+    }
+
+
+def train_model_job(job):
+    """
+    Train a new sentiment model on the labelled reviews, recording per-stage and per-epoch progress on the job.
+    """
+    # Imported here so the job queue does not pull in TensorFlow until a training actually runs
+    from api.sentiment.active_ml import train_new_model
+
+    def report_progress(stage, **details):
+        Job.objects.filter(id=job.id).update(
+            progress={'stage': stage, 'updated_at': timezone.now().isoformat(), **details}
+        )
+
+    def should_cancel():
+        return Job.objects.filter(id=job.id, cancel_requested=True).exists()
+
+    reviews = Review.objects.filter(human_sentiment__isnull=False)
+    ml_model = train_new_model(
+        reviews, mode=job.payload.get('mode'), report_progress=report_progress, should_cancel=should_cancel
+    )
+    return {
+        'model_id': ml_model.id,
+        'file_name': ml_model.file_name,
+        'training_mode': ml_model.training_mode,
+    }
+
+
+# Maps Job.kind to the function that executes it
+JOB_HANDLERS = {
+    'scrape_product': scrape_product_job,
+    'refresh_product': refresh_product_job,
+    'train_model': train_model_job,
+}
@@ -0,0 +1,75 @@
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.sentiment.corpus_cache import CORPUS_PATH
+from api.sentiment.preprocessing import STOP_WORDS, get_stemmer, preprocess_review, preprocess_reviews, \
+    preprocess_word
+
+# Vocabulary for synthetic reviews when the training corpus is not available
+SAMPLE_WORDS = (
+    "the phone is great and the battery lasts all day but the screen scratches easily camera quality "
+    "was disappointing for this price delivery arrived quickly packaging damaged works perfectly would "
+    "recommend to friends charger stopped working after two weeks sound loud clear very happy with it "
+    "returned because keyboard keys stick laptop runs hot fans noisy display bright colours amazing"
+).split()
+
+
+def legacy_preprocess_review(review, stop_words=tuple(STOP_WORDS)):
+    # The implementation before the preprocessing module: a list scan per word and an uncached stem
+    review = re.sub('[^a-zA-Z]', ' ', review)
+    review = review.split()
+    ps = get_stemmer()
+    review = [ps.stem(word) for word in review if word not in stop_words]
+    return ' '.join(review)
+
+
+class Command(BaseCommand):
+    help = "Measure the per-review cost of review preprocessing before and after memoization."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reviews', type=int, default=5000, help="Number of reviews to preprocess.")
+        parser.add_argument(
+            '--processes', type=int, default=0, help="Also time a process pool of this many workers.",
+        )
+
+    def handle(self, *args, **options):
+        reviews = self.load_reviews(options['reviews'])
+        get_stemmer()  # Keep the nltk import out of the timings
+
+        legacy = self.time_per_review(lambda: [legacy_preprocess_review(review) for review in reviews], reviews)
+        preprocess_word.cache_clear()
+        cold = self.time_per_review(lambda: [preprocess_review(review) for review in reviews], reviews)
+        warm = self.time_per_review(lambda: preprocess_reviews(reviews, processes=1), reviews)
+
+        if [legacy_preprocess_review(review) for review in reviews] != preprocess_reviews(reviews, processes=1):
+            self.stderr.write("Preprocessing results differ from the previous implementation.")
+
+        self.stdout.write(f"{len(reviews)} reviews, microseconds per review:")
+        self.stdout.write(f"  before (list scan, uncached stems): {legacy:8.1f}")
+        self.stdout.write(f"  after, cold stem cache:             {cold:8.1f}")
+        self.stdout.write(f"  after, warm stem cache:             {warm:8.1f}")
+        if options['processes'] > 1:
+            pooled = self.time_per_review(lambda: preprocess_reviews(reviews, options['processes']), reviews)
+            self.stdout.write(f"  after, {options['processes']} processes:                {pooled:8.1f}")
+
+    def load_reviews(self, count):
+        try:
+            import pandas as pd
+
+            reviews = pd.read_csv(CORPUS_PATH, usecols=['reviews'], nrows=count)['reviews'].astype(str).tolist()
+            self.stdout.write(f"Using reviews from {CORPUS_PATH}.")
+            return reviews
+        except (ImportError, OSError, ValueError):
+            self.stdout.write("Training corpus not found; using synthetic reviews.")
+            rng = random.Random(0)
+            words = SAMPLE_WORDS + sorted(STOP_WORDS)
+            return [' '.join(rng.choices(words, k=rng.randint(5, 60))).capitalize() for _ in range(count)]
+
+    @staticmethod
+    def time_per_review(run, reviews):
+        start = time.perf_counter()
+        run()
+        return (time.perf_counter() - start) / len(reviews) * 1_000_000
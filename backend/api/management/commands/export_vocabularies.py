@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from api.models import MLModel
+from api.sentiment.vocabulary import BASE_DIR, legacy_tokenizer_file, load_tokenizer_vocabulary
+
+
+class Command(BaseCommand):
+    help = "Convert the pickled tokenizers of models trained before vocabulary artifacts into artifacts."
+
+    def handle(self, *args, **options):
+        vocabularies = {}
+        count = 0
+        for ml_model in MLModel.objects.filter(vocabulary__isnull=True):
+            tokenizer_file = legacy_tokenizer_file(ml_model)
+            if tokenizer_file not in vocabularies:
+                vocabularies[tokenizer_file] = load_tokenizer_vocabulary(tokenizer_file, BASE_DIR).save(BASE_DIR)
+            ml_model.vocabulary = vocabularies[tokenizer_file]
+            ml_model.save(update_fields=['vocabulary'])
+            self.stdout.write(f"{ml_model.file_name}: {tokenizer_file} -> {ml_model.vocabulary}")
+            count += 1
+        self.stdout.write(f"Exported vocabularies for {count} models.")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.utils.aggregate_utils import rebuild_all_product_aggregates
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized review count, rating and sentiment columns of every product."
+
+    def handle(self, *args, **options):
+        count = rebuild_all_product_aggregates()
+        self.stdout.write(f"Rebuilt review aggregates for {count} products.")
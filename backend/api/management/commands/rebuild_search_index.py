@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from api.utils.product_search import index_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Re-create the product search index from the Product table."
+
+    def handle(self, *args, **options):
+        if not index_available():
+            self.stdout.write("The product search index is not available on this database.")
+            return
+        count = rebuild_index()
+        self.stdout.write(f"Indexed {count} products.")
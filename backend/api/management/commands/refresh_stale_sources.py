@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from api.jobs.queue import enqueue, get_active_job
+from api.models import ProductSource
+from api.utils.freshness import REFRESH_SCRAPE_BUDGET, refresh_budget_remaining, stale_sources_filter
+
+
+class Command(BaseCommand):
+    help = "Queue refreshes of stale marketplace data, most viewed products first, within a scrape budget."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget', type=int, default=REFRESH_SCRAPE_BUDGET,
+            help="Maximum number of marketplace scrapes queued or running at once, including earlier runs.",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="List what would be refreshed without queuing it.")
+
+    def handle(self, *args, **options):
+        # Marketplace scrapes already pending from earlier runs or from stale-while-revalidate count against the budget
+        budget = refresh_budget_remaining(options['budget'])
+
+        stale_sources = ProductSource.objects.filter(
+            stale_sources_filter(), product__is_detailed=True
+        ).order_by('-product__view_count', 'last_updated').values_list('product_id', 'marketplace')
+
+        # Group stale marketplaces per product, keeping the most viewed products first
+        refreshes = {}
+        for product_id, marketplace in stale_sources.iterator():
+            if budget <= 0:
+                break
+            if product_id not in refreshes and get_active_job('refresh_product', product_id):
+                continue
+            refreshes.setdefault(product_id, []).append(marketplace)
+            budget -= 1
+
+        for product_id, marketplaces in refreshes.items():
+            if options['dry_run']:
+                self.stdout.write(f"Would refresh product {product_id}: {', '.join(marketplaces)}")
+                continue
+            enqueue('refresh_product', product_id, {'product_id': product_id, 'marketplaces': marketplaces})
+
+        if not options['dry_run']:
+            self.stdout.write(f"Queued refreshes for {len(refreshes)} products.")
@@ -0,0 +1,76 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import PriceObservation
+
+PRICE_HISTORY_RAW_DAYS = getattr(settings, 'PRICE_HISTORY_RAW_DAYS', 30)
+# Raw rows rolled up per transaction; keeps the delete under SQLite's bound parameter limit
+CHUNK_SIZE = 900
+
+
+class Command(BaseCommand):
+    help = "Downsample raw price observations older than the retention period to one row per source and day."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int, default=PRICE_HISTORY_RAW_DAYS,
+            help="Roll up raw observations older than this many days.",
+        )
+
+    def handle(self, *args, **options):
+        # Cut at midnight so a day is never split between raw and rolled-up rows
+        cutoff_date = timezone.localdate() - timedelta(days=options['older_than_days'])
+        cutoff = timezone.make_aware(datetime.combine(cutoff_date, time.min))
+
+        raw = PriceObservation.objects.filter(
+            resolution=PriceObservation.RESOLUTION_RAW, observed_at__lt=cutoff
+        ).order_by('source_id', 'observed_at', 'id').values_list('id', 'source_id', 'observed_at', 'price_minor', 'currency')
+
+        rolled_up = 0
+        days = 0
+        while True:
+            rows = list(raw[:CHUNK_SIZE])
+            if not rows:
+                break
+
+            def day_key(row):
+                return row[1], timezone.localtime(row[2]).date()
+
+            if len(rows) == CHUNK_SIZE:
+                # Leave the last source and day, which may continue past this chunk, for the next one
+                last_key = day_key(rows[-1])
+                complete = [row for row in rows if day_key(row) != last_key]
+                if not complete:
+                    # One source and day fills the chunk. Only its closing price is kept, so drop all but
+                    # the latest row and roll the day up once the rest of it fits in a chunk
+                    PriceObservation.objects.filter(id__in=[row[0] for row in rows[:-1]]).delete()
+                    rolled_up += len(rows) - 1
+                    continue
+                rows = complete
+
+            # The last (closing) price of each source and day
+            closing = {}
+            for row in rows:
+                closing[day_key(row)] = (row[3], row[4])
+
+            with transaction.atomic():
+                PriceObservation.objects.bulk_create([
+                    PriceObservation(
+                        source_id=source_id,
+                        observed_at=timezone.make_aware(datetime.combine(day, time.min)),
+                        price_minor=price_minor,
+                        currency=currency,
+                        resolution=PriceObservation.RESOLUTION_DAY,
+                    )
+                    for (source_id, day), (price_minor, currency) in closing.items()
+                ])
+                PriceObservation.objects.filter(id__in=[row[0] for row in rows]).delete()
+
+            rolled_up += len(rows)
+            days += len(closing)
+
+        self.stdout.write(f"Rolled up {rolled_up} raw price observations into {days} daily rows.")
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.jobs.queue import claim_next, run_job
+
+
+class Command(BaseCommand):
+    help = "Process queued background jobs until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', action='append', dest='kinds', help="Only run jobs of this kind (repeatable).")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Exit as soon as the queue is empty.")
+
+    def handle(self, *args, **options):
+        self.stdout.write("Job worker started.")
+        while True:
+            job = claim_next(options['kinds'])
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            job = run_job(job)
+            self.stdout.write(f"Job {job.id} ({job.kind}:{job.key}) -> {job.status}")
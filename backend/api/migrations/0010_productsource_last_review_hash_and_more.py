@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productsource',
+            name='last_review_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='productsource',
+            name='reviews_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
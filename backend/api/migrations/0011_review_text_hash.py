@@ -0,0 +1,55 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:02
+
+import hashlib
+import unicodedata
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+# Frozen copy of api.utils.hash_utils.normalized_text_hash as of this migration, so the backfill never changes
+def normalized_text_hash(text):
+    normalized = ' '.join(unicodedata.normalize('NFC', text).split())
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def backfill_text_hash(apps, schema_editor):
+    Review = apps.get_model('api', 'Review')
+
+    seen = {}
+    duplicate_ids = []
+    # Labelled reviews first, so that of a group of duplicates the one an admin labelled is kept
+    reviews = Review.objects.order_by(F('human_sentiment').asc(nulls_last=True), 'id').only(
+        'id', 'product_source_id', 'text', 'human_sentiment'
+    )
+    for review in reviews.iterator(chunk_size=2000):
+        key = (review.product_source_id, normalized_text_hash(review.text))
+        if key in seen:
+            duplicate_ids.append(review.id)
+            continue
+        seen[key] = review.id
+        review.text_hash = key[1]
+        review.save(update_fields=['text_hash'])
+
+    Review.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_productsource_last_review_hash_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='text_hash',
+            field=models.CharField(default='', max_length=64),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_text_hash, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='review',
+            constraint=models.UniqueConstraint(fields=('product_source', 'text_hash'), name='unique_review_text_per_source'),
+        ),
+    ]
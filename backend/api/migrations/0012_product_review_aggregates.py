@@ -0,0 +1,60 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:38
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_aggregates(apps, schema_editor):
+    Product = apps.get_model('api', 'Product')
+    Review = apps.get_model('api', 'Review')
+
+    def sentiment_filter(sentiment):
+        return Q(human_sentiment=sentiment) | Q(human_sentiment__isnull=True, model_sentiment=sentiment)
+
+    rows = Review.objects.values('product_source__product_id').annotate(
+        review_count=Count('id'),
+        rating_sum=Sum('rating'),
+        positive_count=Count('id', filter=sentiment_filter('Positive')),
+        neutral_count=Count('id', filter=sentiment_filter('Neutral')),
+        negative_count=Count('id', filter=sentiment_filter('Negative')),
+    )
+    for row in rows:
+        product_id = row.pop('product_source__product_id')
+        row['rating_sum'] = row['rating_sum'] or 0.0
+        Product.objects.filter(id=product_id).update(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_review_text_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='negative_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='neutral_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='positive_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+import unicodedata
+
+from django.db import OperationalError, migrations
+
+# Frozen copies of api.utils.product_search as of this migration, so later changes there do not alter it
+SEARCH_TABLE = 'api_product_search'
+
+TRANSLITERATION = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'h', 'ґ': 'g', 'д': 'd', 'е': 'e', 'є': 'ie', 'ж': 'zh', 'з': 'z',
+    'и': 'y', 'і': 'i', 'ї': 'i', 'й': 'i', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p',
+    'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh',
+    'щ': 'shch', 'ь': '', 'ю': 'iu', 'я': 'ia', "'": '', 'ʼ': '', '’': '',
+    'ы': 'y', 'э': 'e', 'ё': 'e', 'ъ': '',
+}
+
+
+def to_search_text(text):
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    return ' '.join(''.join(TRANSLITERATION.get(char, char) for char in text).split())
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+
+    Product = apps.get_model('api', 'Product')
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(name, category, tokenize='trigram')"
+            )
+        except OperationalError:
+            # SQLite older than 3.34 or built without FTS5; search falls back to icontains
+            return
+
+        rows = [
+            (product_id, to_search_text(name), category or '')
+            for product_id, name, category in Product.objects.values_list('id', 'name', 'category')
+        ]
+        cursor.executemany(f"INSERT INTO {SEARCH_TABLE} (rowid, name, category) VALUES (%s, %s, %s)", rows)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_product_review_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
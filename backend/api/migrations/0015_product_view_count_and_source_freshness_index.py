@@ -0,0 +1,22 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_inflightoperation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='view_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='productsource',
+            index=models.Index(fields=['marketplace', 'last_updated'], name='api_product_marketp_5864f0_idx'),
+        ),
+    ]
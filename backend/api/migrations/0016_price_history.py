@@ -0,0 +1,60 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from api.utils.price_utils import parse_price
+
+
+def backfill_parsed_prices(apps, schema_editor):
+    ProductSource = apps.get_model('api', 'ProductSource')
+    PriceObservation = apps.get_model('api', 'PriceObservation')
+
+    observations = []
+    for source in ProductSource.objects.exclude(price__isnull=True).iterator():
+        source.price_minor, source.currency = parse_price(source.price)
+        if source.price_minor is None:
+            continue
+        ProductSource.objects.filter(id=source.id).update(price_minor=source.price_minor, currency=source.currency)
+        observations.append(PriceObservation(
+            source_id=source.id,
+            observed_at=source.last_updated,
+            price_minor=source.price_minor,
+            currency=source.currency,
+        ))
+    PriceObservation.objects.bulk_create(observations, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_product_view_count_and_source_freshness_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productsource',
+            name='currency',
+            field=models.CharField(blank=True, max_length=3, null=True),
+        ),
+        migrations.AddField(
+            model_name='productsource',
+            name='price_minor',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='PriceObservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('observed_at', models.DateTimeField()),
+                ('price_minor', models.BigIntegerField()),
+                ('currency', models.CharField(max_length=3)),
+                ('resolution', models.PositiveSmallIntegerField(choices=[(0, 'Raw'), (1, 'Day')], default=0)),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_observations', to='api.productsource')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['source', 'observed_at'], name='api_priceob_source__2e2ea7_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_parsed_prices, migrations.RunPython.noop),
+    ]
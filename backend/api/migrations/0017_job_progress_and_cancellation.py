@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_price_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='cancel_requested',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='progress',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_job_progress_and_cancellation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mlmodel',
+            name='base_model',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='finetuned_models', to='api.mlmodel'),
+        ),
+        migrations.AddField(
+            model_name='mlmodel',
+            name='training_mode',
+            field=models.CharField(choices=[('full', 'Full'), ('finetune', 'Fine-tuned')], default='full', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 10:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_mlmodel_training_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mlmodel',
+            name='vocabulary',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
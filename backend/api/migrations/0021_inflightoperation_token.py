@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inflightoperation',
+            name='token',
+            field=models.CharField(default='', max_length=32),
+        ),
+    ]
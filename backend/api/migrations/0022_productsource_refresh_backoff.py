@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 11:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_inflightoperation_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productsource',
+            name='last_refresh_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='productsource',
+            name='refresh_failures',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
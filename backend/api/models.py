@@ -1,5 +1,7 @@
 from django.db import models
 
+from api.utils.hash_utils import normalized_text_hash
+
 
 class Product(models.Model):
     name = models.CharField(max_length=255)
@@ -9,6 +11,17 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_detailed = models.BooleanField(default=False)
+    # Denormalized review aggregates, kept up to date by api.utils.aggregate_utils
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.FloatField(default=0)
+    positive_count = models.PositiveIntegerField(default=0)
+    neutral_count = models.PositiveIntegerField(default=0)
+    negative_count = models.PositiveIntegerField(default=0)
+    view_count = models.PositiveIntegerField(default=0)  # Detail page views, used to prioritize refreshes
+
+    @property
+    def average_rating(self):
+        return self.rating_sum / self.review_count if self.review_count else 0
 
     def __str__(self):
         return self.name
@@ -19,12 +32,50 @@ class ProductSource(models.Model):
     marketplace = models.CharField(max_length=50)  # e.g., 'rozetka', 'comfy'
     url = models.URLField()
     price = models.CharField(max_length=50, blank=True, null=True)
+    price_minor = models.BigIntegerField(blank=True, null=True)  # Parsed price in minor units (kopiykas)
+    currency = models.CharField(max_length=3, blank=True, null=True)  # ISO 4217 code, e.g. 'UAH'
     last_updated = models.DateTimeField(auto_now=True)
+    last_review_hash = models.CharField(max_length=64, blank=True, null=True)  # Hash of the newest scraped review
+    reviews_synced_at = models.DateTimeField(blank=True, null=True)
+    last_refresh_attempt_at = models.DateTimeField(blank=True, null=True)  # Start of the latest background refresh
+    refresh_failures = models.PositiveIntegerField(default=0)  # Consecutive refreshes that failed or found nothing
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['marketplace', 'last_updated']),
+        ]
 
     def __str__(self):
         return f"{self.marketplace} - {self.product.name}"
 
 
+class PriceObservation(models.Model):
+    """
+    Append-only price history of a ProductSource. Old raw observations are rolled up to one
+    row per day by the rollup_price_history command.
+    """
+    RESOLUTION_RAW = 0
+    RESOLUTION_DAY = 1
+    RESOLUTION_CHOICES = (
+        (RESOLUTION_RAW, 'Raw'),
+        (RESOLUTION_DAY, 'Day'),
+    )
+
+    source = models.ForeignKey(ProductSource, on_delete=models.CASCADE, related_name='price_observations')
+    observed_at = models.DateTimeField()
+    price_minor = models.BigIntegerField()
+    currency = models.CharField(max_length=3)
+    resolution = models.PositiveSmallIntegerField(choices=RESOLUTION_CHOICES, default=RESOLUTION_RAW)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['source', 'observed_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.source} - {self.price_minor} {self.currency} at {self.observed_at}"
+
+
 class Review(models.Model):
     product_source = models.ForeignKey(ProductSource, on_delete=models.CASCADE, related_name='reviews')
     text = models.TextField()
@@ -33,20 +84,111 @@ class Review(models.Model):
     confidence = models.FloatField()
     human_sentiment = models.CharField(max_length=50, null=True, blank=True)  # Corrected sentiment
     needs_review = models.BooleanField(default=False)  # Mark for admin review
+    text_hash = models.CharField(max_length=64)  # sha256 of the normalized text, used for deduplication
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product_source', 'text_hash'], name='unique_review_text_per_source'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.text_hash:
+            self.text_hash = normalized_text_hash(self.text)
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Review for {self.product_source.product.name} on {self.product_source.marketplace}"
 
 
 class MLModel(models.Model):
+    TRAINING_MODE_FULL = 'full'
+    TRAINING_MODE_FINETUNE = 'finetune'
+    TRAINING_MODE_CHOICES = (
+        (TRAINING_MODE_FULL, 'Full'),
+        (TRAINING_MODE_FINETUNE, 'Fine-tuned'),
+    )
+
     file_name = models.CharField(max_length=255, unique=True)  # The filename of the saved model
+    # The vocabulary artifact the model was trained with; models from before artifacts use a legacy tokenizer
+    vocabulary = models.CharField(max_length=255, null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)  # Timestamp when the model was created
     accuracy = models.FloatField(null=True, blank=True)  # Accuracy metric
     precision = models.FloatField(null=True, blank=True)  # Precision metric
     recall = models.FloatField(null=True, blank=True)  # Recall metric
     f1_score = models.FloatField(null=True, blank=True)  # F1-score metric
     is_active = models.BooleanField(default=False)  # Whether this model is currently in use
+    training_mode = models.CharField(max_length=20, choices=TRAINING_MODE_CHOICES, default=TRAINING_MODE_FULL)
+    base_model = models.ForeignKey(  # The model a fine-tuned model started from
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='finetuned_models'
+    )
     reviews = models.ManyToManyField(Review, related_name="models")  # Many-to-Many relationship
 
     def __str__(self):
         return f"Model {self.file_name} - {'Active' if self.is_active else 'Inactive'}"
+
+
+class TranslationCache(models.Model):
+    text_hash = models.CharField(max_length=64, unique=True)  # sha256 of the normalized source text
+    translated_text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Translation {self.text_hash[:12]}"
+
+
+class Job(models.Model):
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    )
+    ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+    kind = models.CharField(max_length=50)  # Name of the handler, e.g. 'scrape_product'
+    key = models.CharField(max_length=255)  # Deduplication key, e.g. the product id
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    progress = models.JSONField(null=True, blank=True)  # Written by long-running handlers while they run
+    heartbeat_at = models.DateTimeField(null=True, blank=True)  # Refreshed by the worker while the job runs
+    cancel_requested = models.BooleanField(default=False)  # Checked by handlers that support cancellation
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+        constraints = [
+            # At most one queued or running job per (kind, key), so concurrent requests share it
+            models.UniqueConstraint(
+                fields=['kind', 'key'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='unique_active_job',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Job {self.kind}:{self.key} - {self.status}"
+
+
+class InflightOperation(models.Model):
+    """
+    Lock row held while one process performs an expensive operation (e.g. a scrape) on behalf of all
+    concurrent callers asking for the same thing. See api.utils.singleflight.
+    """
+    key = models.CharField(max_length=64, unique=True)  # sha256 of (operation, normalized query, category)
+    operation = models.CharField(max_length=50)
+    token = models.CharField(max_length=32, default='')  # Random per holder; only the holder renews or releases it
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()  # After this the holder is presumed dead and the lock can be taken over
+
+    def __str__(self):
+        return f"{self.operation} until {self.expires_at}"
@@ -1,46 +1,116 @@
+from urllib.parse import urljoin
+
 from selenium.webdriver import Keys
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import NoSuchElementException
-import time
 from backend.logger import logger
-from ..utils.web_driver import get_driver, quit_driver  # Import the centralized get_driver function
+from ..utils.http_client import fetch_html, parse_html, scrape_with_fallback
+from ..utils.waits import ScrapeTimer, wait_for_element, wait_for_url_change
+from ..utils.web_driver import borrow_driver
+
+ALLO_BASE_URL = 'https://allo.ua/'
+ALLO_SEARCH_URL = 'https://allo.ua/ua/catalogsearch/result/'
 
 
 def scrape_allo_product(product_name, partial_names):
-    driver = get_driver()
+    return scrape_with_fallback(
+        'allo', scrape_allo_product_http, scrape_allo_product_browser, product_name, partial_names
+    )
 
-    # URL for searching the product on Allo
-    # search_url = f"https://allo.ua/ua/catalogsearch/result/?q={product_name.replace(' ', '%20')}"
-    # driver.get(search_url)
-    # time.sleep(3)
-    driver.get('https://allo.ua')
-    time.sleep(3)
 
-    search_input = driver.find_element(By.XPATH, '//input[@name="search"]')
-    search_input.send_keys(product_name + Keys.ENTER)
-    time.sleep(3)
+def scrape_allo_product_http(product_name, partial_names):
+    search_html = fetch_html('allo', ALLO_SEARCH_URL, params={'q': product_name})
+
+    # Find the first product link in the search results (Allo uses 'product-card__title' class)
+    product_link = parse_html(search_html).select_one('.product-card__title')
+    if product_link is None:
+        return None
+    product_url = urljoin(ALLO_BASE_URL, product_link.get('href', ''))
+    logger.info(f"Found product link: {product_url}")
+
+    product_html = fetch_html('allo', product_url)
+    product_details = parse_allo_product(product_html, product_url)
+    if product_details:
+        product_details['reviews'] = parse_allo_reviews(product_html)
+    return product_details
+
+
+def parse_allo_product(html, product_url):
+    """
+    Extract the product name and price from the HTML of an Allo product page, or None if they are missing.
+    """
+    soup = parse_html(html)
+    name = soup.find('h1')
+    price = soup.select_one('.p-trade-price__current > span')
+    if name is None or price is None:
+        return None
+
+    return {
+        'name': name.get_text(strip=True),
+        'price': price.get_text(strip=True),
+        'url': product_url,
+    }
 
-    try:
-        # Find the first product link in the search results (Allo uses 'product-card__title' class)
-        product_link = driver.find_element(By.CLASS_NAME, 'product-card__title').get_attribute('href')
-        logger.info(f"Found product link: {product_link}")
 
-        # Scrape the product details
-        product_details = scrape_allo_product_details(driver, product_link)
+def parse_allo_reviews(html):
+    """
+    Extract review texts and ratings from the HTML of an Allo product page.
+    """
+    reviews = []
+    for review_element in parse_html(html).select('div[itemprop="review"]'):
+        text = review_element.select_one('.product-comment .product-comment__text .text')
+        if text is None:
+            continue
+
+        rating = review_element.select_one('.user__rating--estimate')
+        try:
+            review_rating = float(rating.get_text(strip=True)) if rating else None
+        except ValueError:
+            review_rating = None
+
+        reviews.append({
+            'text': text.get_text(" ", strip=True),
+            'rating': review_rating
+        })
+    return reviews
 
+
+def scrape_allo_product_browser(product_name, partial_names):
+    timer = ScrapeTimer('allo')
+    try:
+        with borrow_driver() as driver:
+            # URL for searching the product on Allo
+            # search_url = f"https://allo.ua/ua/catalogsearch/result/?q={product_name.replace(' ', '%20')}"
+            # driver.get(search_url)
+            driver.get('https://allo.ua')
+
+            search_input = wait_for_element(driver, (By.XPATH, '//input[@name="search"]'), 'allo.search_input', timer)
+            previous_url = driver.current_url
+            search_input.send_keys(product_name + Keys.ENTER)
+            wait_for_url_change(driver, previous_url, 'allo.search_submit', timer)
+
+            # Find the first product link in the search results (Allo uses 'product-card__title' class)
+            product_link = wait_for_element(
+                driver, (By.CLASS_NAME, 'product-card__title'), 'allo.search_results', timer
+            ).get_attribute('href')
+            logger.info(f"Found product link: {product_link}")
+
+            # Scrape the product details
+            product_details = scrape_allo_product_details(driver, product_link, timer)
     finally:
-        quit_driver()
+        timer.report()
 
     return product_details
 
 
-def scrape_allo_product_details(driver, product_url):
+def scrape_allo_product_details(driver, product_url, timer=None):
     driver.get(product_url)
-    time.sleep(3)
 
     # Extract product name and price
+    product_price = wait_for_element(
+        driver, (By.CSS_SELECTOR, '.p-trade-price__current>span'), 'allo.product_page', timer
+    ).text.strip()
     product_name = driver.find_element(By.TAG_NAME, 'h1').text.strip()
-    product_price = driver.find_element(By.CSS_SELECTOR, '.p-trade-price__current>span').text.strip()
 
     # print(f"Scraped product: {product_name}, Price: {product_price}")
 
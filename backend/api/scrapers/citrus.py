@@ -1,103 +1,178 @@
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException
-import time
+from urllib.parse import urljoin
 
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
 
 from backend.logger import logger
-from ..utils.search_utils import find_best_match
-from ..utils.web_driver import get_driver, quit_driver  # Import the centralized get_driver function
+from ..utils.http_client import fetch_html, parse_html, scrape_with_fallback
+from ..utils.search_utils import find_best_match, find_best_match_across_queries
+from ..utils.waits import ScrapeTimer, wait_for_any, wait_for_element, wait_for_elements
+from ..utils.web_driver import borrow_driver
+
+EMPTY_SEARCH_LOCATOR = (By.XPATH, '//section[contains(@class,"EmptySearch_emptyContainer")]')
+SEARCH_RESULTS_LOCATOR = (By.XPATH, '//div[@class="catalog-facet"]//a[contains(@class,"MainProductCard-module__link")]')
+
+CITRUS_BASE_URL = "https://www.ctrs.com.ua/"
+CITRUS_SEARCH_URL = "https://www.ctrs.com.ua/ru/search/"
+# Fill colour of a highlighted rating star, as rendered by the browser and as written in the page source
+FILLED_STAR_COLORS = ("rgb(255, 193, 7)", "#ffc107")
 
 
 def scrape_citrus_product(product_name, partial_names):
-    driver = get_driver()
+    return scrape_with_fallback(
+        'citrus', scrape_citrus_product_http, scrape_citrus_product_browser, product_name, partial_names
+    )
+
+
+def scrape_citrus_product_http(product_name, partial_names):
+    def search(query):
+        return parse_citrus_search(fetch_html('citrus', CITRUS_SEARCH_URL, params={'query': query}))
+
+    best_match = find_best_match_across_queries(product_name, partial_names, search)
+    if not best_match:
+        logger.info("No suitable match found on Citrus.")
+        return None
+
+    logger.info(f"Best match found on Citrus: {best_match['name']} with score {best_match['score']}")
+    product_html = fetch_html('citrus', best_match['url'])
+    product_details = parse_citrus_product(product_html, best_match['url'])
+    if product_details:
+        product_details['reviews'] = parse_citrus_reviews(product_html)
+    return product_details
+
+
+def parse_citrus_search(html):
+    """
+    Extract product names and links from the HTML of a Citrus search page.
+    """
+    results = []
+    for product in parse_html(html).select('div.catalog-facet a[class*="MainProductCard-module__link"]'):
+        name = product.get('title')  # Citrus includes titles in the 'title' attribute
+        if name:
+            results.append({'name': name.strip(), 'url': urljoin(CITRUS_BASE_URL, product.get('href', ''))})
+    return results
+
+
+def parse_citrus_product(html, product_url):
+    """
+    Extract the product name and price from the HTML of a Citrus product page, or None if they are missing.
+    """
+    soup = parse_html(html)
+    name = soup.find('h1')
+    price = soup.select_one('div[class*="Price_price_"]')
+    if name is None or price is None:
+        return None
+
+    return {
+        'name': name.get_text(strip=True),
+        'price': price.get_text(strip=True),
+        'url': product_url,
+    }
+
+
+def parse_citrus_reviews(html):
+    """
+    Extract review texts and star ratings from the HTML of a Citrus product page.
+    """
+    reviews = []
+    for review_element in parse_html(html).select('div[class*="Reviews_comment"] > div'):
+        review_text_element = next(
+            (p for p in review_element.find_all('p') if p.find('span', string="Опыт использования")), None
+        )
+        if review_text_element is None:
+            continue
+
+        stars = review_element.select('div[class*="Rating-module"] > span > svg > path')
+        reviews.append({
+            'text': review_text_element.get_text(" ", strip=True),
+            'rating': sum(1 for star in stars if (star.get('fill') or '').lower() in FILLED_STAR_COLORS)
+        })
+    return reviews
 
+
+def scrape_citrus_product_browser(product_name, partial_names):
+    timer = ScrapeTimer('citrus')
     try:
-        # Base URL for Citrus search
-        base_url = "https://www.ctrs.com.ua/ru/search/?query={query}"
+        with borrow_driver() as driver:
+            return find_and_scrape_citrus_product(driver, product_name, partial_names, timer)
+    finally:
+        timer.report()
 
-        # Initialize variables to track the best match
-        best_match = None
-        best_score = 0
 
-        # Iterate through partial names to perform searches
-        for partial_name in partial_names:
-            logger.info(f"Searching Citrus with query: {partial_name}")
+def find_and_scrape_citrus_product(driver, product_name, partial_names, timer):
+    # Base URL for Citrus search
+    base_url = "https://www.ctrs.com.ua/ru/search/?query={query}"
 
-            # Navigate to the search page
-            search_url = base_url.format(query=partial_name.replace(" ", "%20"))
-            driver.get(search_url)
-            time.sleep(3)  # Allow search results to load
+    # Initialize variables to track the best match
+    best_match = None
+    best_score = 0
 
-            # Check if the empty result section is present
-            try:
-                empty_section = WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.XPATH, '//section[contains(@class,"EmptySearch_emptyContainer")]'))
-                )
-                if empty_section:
-                    logger.info(f"No results found for query: {partial_name}")
-                    continue  # Skip to the next partial name
-            except:
-                logger.info(f"Results found for query: {partial_name}")
+    # Iterate through partial names to perform searches
+    for partial_name in partial_names:
+        logger.info(f"Searching Citrus with query: {partial_name}")
 
-            try:
-                # TODO: Handle the case, when product is opened directly because of accurate search query
-                # Wait for product elements to load
-                product_elements = WebDriverWait(driver, 10).until(
-                    EC.presence_of_all_elements_located((By.XPATH, '//div[@class="catalog-facet"]//a[contains(@class,"MainProductCard-module__link")]'))
-                )
-
-                # Extract product names and links from the results
-                results = []
-                for product in product_elements:
-                    try:
-                        name = product.get_attribute('title').strip()  # Citrus includes titles in the 'title' attribute
-                        link = product.get_attribute('href')
-                        results.append({'name': name, 'url': link})
-                    except Exception as e:
-                        logger.error(f"Error extracting product details: {e}")
-                        continue
-
-                # Find the best match for the current search
-                match = find_best_match(product_name, results)
-                if match and match['score'] > best_score:
-                    best_score = match['score']
-                    best_match = match
+        # Navigate to the search page
+        search_url = base_url.format(query=partial_name.replace(" ", "%20"))
+        driver.get(search_url)
+
+        # Wait for either the empty result section or the product cards, whichever renders first
+        try:
+            found = wait_for_any(driver, [EMPTY_SEARCH_LOCATOR, SEARCH_RESULTS_LOCATOR], 'citrus.search', timer)
+        except TimeoutException:
+            logger.info(f"No valid products found for query: {partial_name}.")
+            continue
+
+        if found == 0:
+            logger.info(f"No results found for query: {partial_name}")
+            continue  # Skip to the next partial name
 
+        # TODO: Handle the case, when product is opened directly because of accurate search query
+        product_elements = driver.find_elements(*SEARCH_RESULTS_LOCATOR)
+
+        # Extract product names and links from the results
+        results = []
+        for product in product_elements:
+            try:
+                name = product.get_attribute('title').strip()  # Citrus includes titles in the 'title' attribute
+                link = product.get_attribute('href')
+                results.append({'name': name, 'url': link})
             except Exception as e:
-                logger.info(f"No valid products found for query: {partial_name}. Error: {e}")
+                logger.error(f"Error extracting product details: {e}")
                 continue
 
-        if best_match:
-            logger.info(f"Best match found on Citrus: {best_match['name']} with score {best_score}")
-            # Navigate to the best match's product page
-            product_details = scrape_citrus_product_details(driver, best_match['url'])
-            return product_details
-        else:
-            logger.info("No suitable match found on Citrus.")
-            return None
+        # Find the best match for the current search
+        match = find_best_match(product_name, results)
+        if match and match['score'] > best_score:
+            best_score = match['score']
+            best_match = match
 
-    finally:
-        quit_driver()  # Ensure the driver quits
+    if best_match:
+        logger.info(f"Best match found on Citrus: {best_match['name']} with score {best_score}")
+        # Navigate to the best match's product page
+        return scrape_citrus_product_details(driver, best_match['url'], timer)
+    else:
+        logger.info("No suitable match found on Citrus.")
+        return None
 
 
-def scrape_citrus_product_details(driver, product_url):
+def scrape_citrus_product_details(driver, product_url, timer=None):
     driver.get(product_url)
-    time.sleep(3)  # Allow time for the product page to load
+
+    # Extract product price
+    product_price_element = wait_for_element(
+        driver, (By.XPATH, '//div[contains(@class,"Price_price_")]'), 'citrus.product_page', timer
+    )  # Update this with actual price class name if different
 
     # Extract product name
     product_name_element = driver.find_element(By.TAG_NAME, 'h1')
     product_name = product_name_element.text.strip() if product_name_element else "N/A"
 
-    # Extract product price
-    product_price_element = driver.find_element(By.XPATH, '//div[contains(@class,"Price_price_")]')  # Update this with actual price class name if different
     product_price = product_price_element.text.strip() if product_price_element else "N/A"
 
     # print(f"Scraped product: {product_name}, Price: {product_price}")
 
     # Optionally, scrape reviews if available
-    reviews = scrape_citrus_reviews(driver)
+    reviews = scrape_citrus_reviews(driver, timer)
 
     return {
         'name': product_name,
@@ -107,17 +182,21 @@ def scrape_citrus_product_details(driver, product_url):
     }
 
 
-def scrape_citrus_reviews(driver):
+def scrape_citrus_reviews(driver, timer=None):
     reviews = []
 
     try:
         # Scroll to the reviews section to ensure it loads
         review_section = driver.find_element(By.ID, 'reviews')
         driver.execute_script("arguments[0].scrollIntoView({ behavior: 'smooth', block: 'center' });", review_section)
-        time.sleep(2)  # Wait for reviews to load
 
-        # Find individual review elements
-        review_elements = driver.find_elements(By.XPATH, '//div[contains(@class,"Reviews_comment")]/div')  # Adjust with actual class name
+        # Find individual review elements once they have loaded
+        try:
+            review_elements = wait_for_elements(
+                driver, (By.XPATH, '//div[contains(@class,"Reviews_comment")]/div'), 'citrus.reviews', timer
+            )  # Adjust with actual class name
+        except TimeoutException:
+            review_elements = []
 
         for review_element in review_elements:
             # Extract review text
@@ -132,7 +211,7 @@ def scrape_citrus_reviews(driver):
                 filled_stars = 0
                 for star in star_elements:
                     fill_color = star.get_attribute("fill")
-                    if fill_color == "rgb(255, 193, 7)":  # Yellow star color
+                    if fill_color in FILLED_STAR_COLORS:  # Yellow star color
                         filled_stars += 1
 
                 review_rating = filled_stars
@@ -1,89 +1,168 @@
-from selenium.common import NoSuchElementException
+from urllib.parse import urljoin
+
+from selenium.common import NoSuchElementException, TimeoutException
 from selenium.webdriver import Keys
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from api.utils.search_utils import find_best_match
+from api.utils.http_client import fetch_html, parse_html, scrape_with_fallback
+from api.utils.search_utils import find_best_match, find_best_match_across_queries
+from api.utils.waits import ScrapeTimer, wait_for_element, wait_for_elements, wait_for_url_change
 
 from backend.logger import logger
 
-from api.utils.web_driver import get_driver, quit_driver
-import time
+from api.utils.web_driver import borrow_driver
+
+COMFY_BASE_URL = 'https://comfy.ua/'
+COMFY_SEARCH_URL = 'https://comfy.ua/search/'
 
 
 def scrape_comfy_product(product_name, partial_names):
-    driver = get_driver()
+    return scrape_with_fallback(
+        'comfy', scrape_comfy_product_http, scrape_comfy_product_browser, product_name, partial_names
+    )
+
+
+def scrape_comfy_product_http(product_name, partial_names):
+    def search(query):
+        return parse_comfy_search(fetch_html('comfy', COMFY_SEARCH_URL, params={'q': query}))
+
+    best_match = find_best_match_across_queries(product_name, partial_names, search)
+    if not best_match:
+        logger.info("No suitable match found on Comfy.")
+        return None
+
+    logger.info(f"Best match found on Comfy: {best_match['name']} with score {best_match['score']}")
+    product_html = fetch_html('comfy', best_match['url'])
+    product_details = parse_comfy_product(product_html, best_match['url'])
+    if product_details:
+        product_details['reviews'] = parse_comfy_reviews(product_html)
+    return product_details
+
+
+def parse_comfy_search(html):
+    """
+    Extract product names and links from the HTML of a Comfy search page.
+    """
+    results = []
+    for product in parse_html(html).select('.prdl-item .prdl-item__name'):
+        name = product.get_text(strip=True)
+        if name:
+            results.append({'name': name, 'url': urljoin(COMFY_BASE_URL, product.get('href', ''))})
+    return results
+
+
+def parse_comfy_product(html, product_url):
+    """
+    Extract the product name and price from the HTML of a Comfy product page, or None if they are missing.
+    """
+    soup = parse_html(html)
+    name = soup.select_one('.gen-tab__name')
+    price = soup.select_one('.price__current')
+    if name is None or price is None:
+        return None
+
+    return {
+        'name': name.get_text(strip=True),
+        'price': price.get_text(strip=True),
+        'url': product_url,
+    }
+
+
+def parse_comfy_reviews(html):
+    """
+    Extract review texts and ratings from the HTML of a Comfy product page.
+    """
+    reviews = []
+    for review_element in parse_html(html).select('#feedback .r-item'):
+        text = review_element.select_one('.r-item__text')
+        rating = review_element.select_one('.rating-box__active')
+        if text is None or rating is None:
+            continue
+
+        reviews.append({
+            'text': text.get_text(" ", strip=True),
+            'rating': parse_width_rating(rating.get('style', ''))
+        })
+    return reviews
 
+
+def parse_width_rating(rating_style):
+    """
+    Convert the width style of Comfy's star bar (e.g. "width: 80%;") to a 0-5 rating.
+    """
+    rating_percentage = float(rating_style.split('width:')[1].replace('%', '').replace(';', '').strip())
+    return round((rating_percentage / 100) * 5, 1)
+
+
+def scrape_comfy_product_browser(product_name, partial_names):
+    timer = ScrapeTimer('comfy')
     try:
-        # Base URL for Comfy search
-        base_url = 'https://comfy.ua/'
+        with borrow_driver() as driver:
+            return find_and_scrape_comfy_product(driver, product_name, partial_names, timer)
+    finally:
+        timer.report()
 
-        # Initialize variables to track the best match
-        best_match = None
-        best_score = 0
 
-        # Iterate through partial names to perform searches
-        for partial_name in partial_names:
-            logger.info(f"Searching Comfy with query: {partial_name}")
+def find_and_scrape_comfy_product(driver, product_name, partial_names, timer):
+    # Base URL for Comfy search
+    base_url = 'https://comfy.ua/'
 
-            # Navigate to Comfy's home page
-            driver.get(base_url)
-            time.sleep(3)  # Allow the page to load
+    # Initialize variables to track the best match
+    best_match = None
+    best_score = 0
 
-            # Locate the search input and perform the search
-            search_input = WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.XPATH, '//input[@name="q"]'))
-            )
-            search_input.clear()  # Clear the search bar for the next query
-            search_input.send_keys(partial_name + Keys.ENTER)
-            time.sleep(3)  # Allow search results to load
+    # Iterate through partial names to perform searches
+    for partial_name in partial_names:
+        logger.info(f"Searching Comfy with query: {partial_name}")
 
-            try:
-                # Wait for the product elements to load
-                product_elements = WebDriverWait(driver, 10).until(
-                    EC.presence_of_all_elements_located((By.CLASS_NAME, 'prdl-item'))
-                )
-
-                # Extract product names and links from the results
-                results = []
-                for product in product_elements:
-                    try:
-                        name = product.find_element(By.CLASS_NAME, 'prdl-item__name').text.strip()
-                        link = product.find_element(By.CLASS_NAME, 'prdl-item__name').get_attribute('href')
-                        results.append({'name': name, 'url': link})
-                    except Exception as e:
-                        logger.error(f"Error extracting product details: {e}")
-                        continue
-
-                # Find the best match for the current search
-                match = find_best_match(product_name, results)
-                if match and match['score'] > best_score:
-                    best_score = match['score']
-                    best_match = match
+        # Navigate to Comfy's home page and locate the search input
+        driver.get(base_url)
+        search_input = wait_for_element(driver, (By.XPATH, '//input[@name="q"]'), 'comfy.search_input', timer)
+        search_input.clear()  # Clear the search bar for the next query
 
+        previous_url = driver.current_url
+        search_input.send_keys(partial_name + Keys.ENTER)
+
+        try:
+            # Wait for the results page and its product elements to load
+            wait_for_url_change(driver, previous_url, 'comfy.search_submit', timer)
+            product_elements = wait_for_elements(driver, (By.CLASS_NAME, 'prdl-item'), 'comfy.search_results', timer)
+        except TimeoutException:
+            logger.info(f"No results found for query: {partial_name}")
+            continue
+
+        # Extract product names and links from the results
+        results = []
+        for product in product_elements:
+            try:
+                name = product.find_element(By.CLASS_NAME, 'prdl-item__name').text.strip()
+                link = product.find_element(By.CLASS_NAME, 'prdl-item__name').get_attribute('href')
+                results.append({'name': name, 'url': link})
             except Exception as e:
-                logger.info(f"No results found for query: {partial_name}")
+                logger.error(f"Error extracting product details: {e}")
                 continue
 
-        if best_match:
-            logger.info(f"Best match found on Comfy: {best_match['name']} with score {best_score}")
-            # Navigate to the best match's product page
-            product_details = scrape_comfy_product_details(driver, best_match['url'])
-            return product_details
-        else:
-            logger.info("No suitable match found on Comfy.")
-            return None
+        # Find the best match for the current search
+        match = find_best_match(product_name, results)
+        if match and match['score'] > best_score:
+            best_score = match['score']
+            best_match = match
 
-    finally:
-        quit_driver()
+    if best_match:
+        logger.info(f"Best match found on Comfy: {best_match['name']} with score {best_score}")
+        # Navigate to the best match's product page
+        return scrape_comfy_product_details(driver, best_match['url'], timer)
+    else:
+        logger.info("No suitable match found on Comfy.")
+        return None
 
 
-def scrape_comfy_product_details(driver, product_url):
+def scrape_comfy_product_details(driver, product_url, timer=None):
     driver.get(product_url)
-    time.sleep(3)
 
     # Extract product name and price
-    product_name = driver.find_element(By.CLASS_NAME, 'gen-tab__name').text.strip()
+    product_name = wait_for_element(
+        driver, (By.CLASS_NAME, 'gen-tab__name'), 'comfy.product_page', timer
+    ).text.strip()
     product_price = driver.find_element(By.CLASS_NAME, 'price__current').text.strip()
 
     # print(f"Scraped product: {product_name}, Price: {product_price}")
@@ -112,13 +191,11 @@ def scrape_comfy_reviews(driver, product_url):
 
             # Assume rating is stored in some form
             review_rating_element = review_element.find_element(By.CLASS_NAME, 'rating-box__active')
-            rating_style = review_rating_element.get_attribute('style')
-            rating_percentage = float(rating_style.split('width:')[1].replace('%;', '').strip())
-            review_rating = (rating_percentage / 100) * 5
+            review_rating = parse_width_rating(review_rating_element.get_attribute('style'))
 
             reviews.append({
                 'text': review_text,
-                'rating': round(review_rating, 1)
+                'rating': review_rating
             })
 
         logger.info(f"Scraped {len(reviews)} valid reviews with ratings.")
@@ -1,47 +1,115 @@
+from urllib.parse import urljoin
+
 from selenium.webdriver import Keys
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException
-import time
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from backend.logger import logger
-from ..utils.web_driver import get_driver, quit_driver  # Import the centralized get_driver function
+from ..utils.http_client import fetch_html, parse_html, scrape_with_fallback
+from ..utils.waits import ScrapeTimer, wait_for_element, wait_for_elements, wait_for_url_change
+from ..utils.web_driver import borrow_driver
+
+FOXTROT_BASE_URL = 'https://www.foxtrot.com.ua/'
+FOXTROT_SEARCH_URL = 'https://www.foxtrot.com.ua/uk/search'
 
 
 def scrape_foxtrot_product(product_name, partial_names):
-    driver = get_driver()
+    return scrape_with_fallback(
+        'foxtrot', scrape_foxtrot_product_http, scrape_foxtrot_product_browser, product_name, partial_names
+    )
+
 
-    # Construct the search URL for Foxtrot
-    # search_url = f"https://www.foxtrot.com.ua/uk/search?query={product_name.replace(' ', '%20')}"
-    # driver.get(search_url)
-    # time.sleep(3)  # Allow some time for the page to load
+def scrape_foxtrot_product_http(product_name, partial_names):
+    search_html = fetch_html('foxtrot', FOXTROT_SEARCH_URL, params={'query': product_name})
 
-    driver.get('https://comfy.ua/')
-    time.sleep(3)
+    # Find the first product link in the search results
+    product_link = parse_html(search_html).select_one('.card__title')
+    if product_link is None:
+        return None
+    product_url = urljoin(FOXTROT_BASE_URL, product_link.get('href', ''))
+    logger.info(f"Found product link: {product_url}")
+
+    product_html = fetch_html('foxtrot', product_url)
+    product_details = parse_foxtrot_product(product_html, product_url)
+    if product_details:
+        product_details['reviews'] = parse_foxtrot_reviews(product_html)
+    return product_details
 
-    search_input = driver.find_element(By.XPATH, '//input[@type="search"]')
-    search_input.send_keys(product_name + Keys.ENTER)
-    time.sleep(3)
 
+def parse_foxtrot_product(html, product_url):
+    """
+    Extract the product name and price from the HTML of a Foxtrot product page, or None if they are missing.
+    """
+    soup = parse_html(html)
+    name = soup.select_one('h1#product-page-title')
+    price = soup.select_one('div.product-box__main_price')
+    if name is None or price is None:
+        return None
+
+    return {
+        'name': name.get_text(strip=True),
+        'price': price.get_text(strip=True),
+        'url': product_url,
+    }
+
+
+def parse_foxtrot_reviews(html):
+    """
+    Extract review texts and ratings from the HTML of a Foxtrot product page.
+    """
+    reviews = []
+    for review_element in parse_html(html).select('div.product-comment__item'):
+        text = review_element.select_one('.product-comment__item-text')
+        if text is None:
+            continue
+
+        rating = review_element.select_one('.product-comment__item-rating-num')
+        try:
+            review_rating = float(rating.get_text(strip=True).split('/')[0]) if rating else None
+        except ValueError:
+            review_rating = None
+
+        reviews.append({
+            'text': text.get_text(" ", strip=True),
+            'rating': review_rating
+        })
+    return reviews
+
+
+def scrape_foxtrot_product_browser(product_name, partial_names):
+    timer = ScrapeTimer('foxtrot')
     try:
-        # Find the first product link in the search results
-        product_link_element = driver.find_element(By.CLASS_NAME, 'card__title')
-        product_link = product_link_element.get_attribute('href')
-        logger.info(f"Found product link: {product_link}")
+        with borrow_driver() as driver:
+            # Construct the search URL for Foxtrot
+            # search_url = f"https://www.foxtrot.com.ua/uk/search?query={product_name.replace(' ', '%20')}"
+            # driver.get(search_url)
+
+            driver.get('https://comfy.ua/')
+
+            search_input = wait_for_element(driver, (By.XPATH, '//input[@type="search"]'), 'foxtrot.search_input', timer)
+            previous_url = driver.current_url
+            search_input.send_keys(product_name + Keys.ENTER)
+            wait_for_url_change(driver, previous_url, 'foxtrot.search_submit', timer)
 
-        # Scrape the product details
-        product_details = scrape_foxtrot_product_details(driver, product_link)
+            # Find the first product link in the search results
+            product_link_element = wait_for_element(driver, (By.CLASS_NAME, 'card__title'), 'foxtrot.search_results', timer)
+            product_link = product_link_element.get_attribute('href')
+            logger.info(f"Found product link: {product_link}")
 
+            # Scrape the product details
+            product_details = scrape_foxtrot_product_details(driver, product_link, timer)
     finally:
-        quit_driver()
+        timer.report()
 
     return product_details
 
 
-def scrape_foxtrot_product_details(driver, product_url):
+def scrape_foxtrot_product_details(driver, product_url, timer=None):
     driver.get(product_url)
-    time.sleep(3)  # Allow time for the product page to load
 
     # Extract product name
-    product_name_element = driver.find_element(By.XPATH, '//h1[@id="product-page-title"]')
+    product_name_element = wait_for_element(
+        driver, (By.XPATH, '//h1[@id="product-page-title"]'), 'foxtrot.product_page', timer
+    )
     product_name = product_name_element.text.strip() if product_name_element else "N/A"
 
     # Extract product price
@@ -51,7 +119,7 @@ def scrape_foxtrot_product_details(driver, product_url):
     # print(f"Scraped product: {product_name}, Price: {product_price}")
 
     # Extract reviews (if available)
-    reviews = scrape_foxtrot_reviews(driver)
+    reviews = scrape_foxtrot_reviews(driver, timer)
 
     return {
         'name': product_name,
@@ -61,17 +129,21 @@ def scrape_foxtrot_product_details(driver, product_url):
     }
 
 
-def scrape_foxtrot_reviews(driver):
+def scrape_foxtrot_reviews(driver, timer=None):
     reviews = []
 
     try:
         # Scroll to the reviews section to ensure it's in view
         review_section = driver.find_element(By.CLASS_NAME, 'comments-container')  # Update this if needed
         driver.execute_script("arguments[0].scrollIntoView({ behavior: 'smooth', block: 'center' });", review_section)
-        time.sleep(2)  # Wait for reviews to load
 
-        # Find individual review elements
-        review_elements = driver.find_elements(By.XPATH, '//div[@class="product-comment__item"]')  # Update with actual class
+        # Find individual review elements once they have loaded
+        try:
+            review_elements = wait_for_elements(
+                driver, (By.XPATH, '//div[@class="product-comment__item"]'), 'foxtrot.reviews', timer
+            )  # Update with actual class
+        except TimeoutException:
+            review_elements = []
 
         for review_element in review_elements:
             # Extract review text
@@ -1,73 +1,213 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlencode, urljoin
+
+import httpx
+from django.conf import settings
 from selenium.webdriver import Keys
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
-from selenium.webdriver.support import expected_conditions as EC
-import time
-
-from selenium.webdriver.support.wait import WebDriverWait
 
 from api.utils.category_utils import ROZETKA_CATEGORIES
+from api.utils.hash_utils import normalized_text_hash
+from api.utils.waits import ScrapeTimer, ScrapeBudgetExceeded, wait_for_element, wait_for_elements, \
+    wait_for_page_ready, wait_for_url_change, wait_until
+from api.utils.http_client import fetch, fetch_html, get_scrape_mode, parse_html, scrape_with_fallback
 from backend.logger import logger
 
-from api.utils.web_driver import get_driver, quit_driver
+from api.utils.web_driver import borrow_driver
+
+ROZETKA_BASE_URL = "https://rozetka.com.ua/"
+ROZETKA_SEARCH_URL = "https://rozetka.com.ua/ua/search/"
+# Upper bound on review pages read per scrape, for products scraped for the first time
+ROZETKA_REVIEW_MAX_PAGES = getattr(settings, 'ROZETKA_REVIEW_MAX_PAGES', 20)
+# Categories scraped at the same time across all searches in this process
+SUGGESTION_SCRAPE_CONCURRENCY = getattr(settings, 'SUGGESTION_SCRAPE_CONCURRENCY', 4)
+
+_category_executor = None
+_category_executor_lock = threading.Lock()
 
 
 def scrape_rozetka_suggestions(product_name, category_id=None):
     """
     Scrape search suggestions for a given product name on Rozetka.
     """
-    driver = get_driver()
+    suggestions = []
+    for _, category_suggestions in iter_rozetka_suggestions(product_name, category_id):
+        suggestions = suggestions + category_suggestions
+
+    logger.info(f"Found {len(suggestions)} suggestions for '{product_name}'.")
+    return suggestions
+
+
+def iter_rozetka_suggestions(product_name, category_id=None):
+    """
+    Scrape the search results of each category concurrently and yield (category_name, suggestions)
+    as each category finishes. Categories are fetched over HTTP first; if that finds nothing at all,
+    they are scraped again in pooled browser sessions.
+    """
+    categories = [
+        (category_name, section_id) for category_name, section_id in ROZETKA_CATEGORIES.items()
+        if not category_id or section_id == int(category_id)
+    ]
+
+    if get_scrape_mode('rozetka') == 'http':
+        found = False
+        for category_name, suggestions in scrape_categories(scrape_rozetka_category_http, product_name, categories):
+            found = found or bool(suggestions)
+            yield category_name, suggestions
+        if found:
+            return
+        logger.info(f"HTTP search of rozetka found nothing for '{product_name}', falling back to the browser.")
+
+    yield from scrape_categories(scrape_rozetka_category_browser, product_name, categories)
+
+
+def _get_category_executor():
+    global _category_executor
+    if _category_executor is None:
+        with _category_executor_lock:
+            if _category_executor is None:
+                _category_executor = ThreadPoolExecutor(
+                    max_workers=SUGGESTION_SCRAPE_CONCURRENCY, thread_name_prefix='rozetka-category'
+                )
+    return _category_executor
+
+
+def scrape_categories(scrape_category, product_name, categories):
+    """
+    Run `scrape_category(product_name, category_name, section_id)` for each category on the shared
+    executor and yield (category_name, suggestions) in completion order. A failed category yields no suggestions.
+    """
+    executor = _get_category_executor()
+    future_to_category = {
+        executor.submit(scrape_category, product_name, category_name, section_id): category_name
+        for category_name, section_id in categories
+    }
+
+    for future in as_completed(future_to_category):
+        category_name = future_to_category[future]
+        try:
+            suggestions = future.result()
+        except Exception as e:
+            logger.error(f"Error scraping category '{category_name}' for '{product_name}': {e}")
+            suggestions = []
+        yield category_name, suggestions
+
+
+def rozetka_category_search_url(product_name, section_id):
+    return f"{ROZETKA_SEARCH_URL}?{urlencode({'redirected': 0, 'text': product_name, 'section_id': section_id})}"
+
+
+def scrape_rozetka_category_http(product_name, category_name, section_id):
+    """
+    Fetch the search results of one category over HTTP and parse the server-rendered product tiles.
+    """
+    html = fetch_html('rozetka', ROZETKA_SEARCH_URL, params={'text': product_name, 'section_id': section_id})
+    return parse_rozetka_catalog(html, category_name)
+
+
+def parse_rozetka_catalog(html, category_name):
+    """
+    Extract product suggestions from the HTML of a Rozetka search or catalog page.
+    """
+    category_suggestions = []
+
+    for product in parse_html(html).select('.goods-tile__inner'):
+        title = product.select_one('.goods-tile__title')
+        heading = product.select_one('.goods-tile__heading')
+        if title is None or heading is None:
+            logger.error("Error extracting product details for a suggestion, skipping.")
+            continue
+
+        price = product.select_one('.goods-tile__price-value')
+        image = product.select_one('a.goods-tile__picture img')
+
+        category_suggestions.append({
+            'name': title.get_text(strip=True),
+            'url': urljoin(ROZETKA_BASE_URL, heading.get('href', '')),
+            'price': price.get_text(strip=True) if price else "Price not available",
+            'image': image.get('src') if image else None,
+            'category': category_name
+        })
+    return category_suggestions
+
+
+def parse_rozetka_product(html, product_url):
+    """
+    Extract the product name and price from the HTML of a Rozetka product page, or None if they are missing.
+    """
+    soup = parse_html(html)
+    name = soup.find('h1')
+    price = soup.select_one('.product-price__big')
+    if name is None or price is None:
+        return None
+
+    return {
+        'name': name.get_text(strip=True),
+        'price': price.get_text(strip=True),
+        'url': product_url,
+    }
+
+
+def parse_rozetka_reviews(html):
+    """
+    Extract review texts and ratings from the HTML of a Rozetka comments page.
+    """
+    reviews = []
+
+    for review_element in parse_html(html).select('div.comment__inner'):
+        text = review_element.select_one('div.comment__body > p')
+        rating = review_element.select_one('.stars__rating')
+        if text is None or rating is None:
+            logger.warn("No rating found for this review, skipping.")
+            continue
+
+        reviews.append({
+            'text': text.get_text(" ", strip=True),
+            'rating': parse_rating_style(rating.get('style', ''))
+        })
+    return reviews
 
-    base_url = "https://rozetka.com.ua/ua/search/?redirected=0"
-    search_url = f"{base_url}&text={product_name.replace(' ', '%20')}"
-    time.sleep(3)
-    wait = WebDriverWait(driver, 10)  # Wait up to 10 seconds
-    driver.get(search_url)
-    time.sleep(3)
 
+def parse_rating_style(rating_style):
+    """
+    Convert the width style of Rozetka's star bar (e.g. "width: calc(80% - 2px)") to a 0-5 rating.
+    """
+    if 'calc(' in rating_style:
+        style_attribute = rating_style.split('calc(')[1].split('%')[0].strip()
+    else:
+        style_attribute = rating_style.split('width:')[-1].replace('%', '').replace(';', '').strip()
+    rating_percentage = float(style_attribute)
+    return round((rating_percentage / 100) * 5, 1)
+
+
+def scrape_rozetka_category_browser(product_name, category_name, section_id):
+    """
+    Scrape the search results of one category in a pooled browser session, opening the category's
+    search URL directly instead of clicking through the category filters.
+    """
     suggestions = []
+    timer = ScrapeTimer(f"rozetka suggestions ({category_name})")
 
     try:
-        if category_id:
-            key = next((k for k, v in ROZETKA_CATEGORIES.items() if v == int(category_id)), None)
-            category_link = wait.until(EC.presence_of_element_located((By.XPATH, f'//a[@data-test="filter-link" and ./span[.="{key}"]]')))
-            category_link.click()
-            time.sleep(2)
-            try:
-                wait.until(EC.presence_of_element_located(
-                    (By.XPATH, f'//li[contains(@class,"breadcrumbs__item ")]//span[.="{key}"]')))
-                print("First condition satisfied")
-            except:
-                try:
-                    wait.until(EC.presence_of_element_located((By.XPATH,
-                                                               f'//button[contains(@class,"catalog-selection__link") and contains(text(),"{key}")]')))
-                    print("Second condition satisfied")
-                except:
-                    raise Exception("Neither condition was met.")
-            suggestions = get_catalog_grid_product(driver, key)
-        else:
-            for category_name, _ in ROZETKA_CATEGORIES.items():
-                try:
-                    category_link = wait.until(EC.presence_of_element_located((By.XPATH, f'//a[@data-test="filter-link" and ./span[.="{category_name}"]]')))
-                except TimeoutException:
-                    logger.info(f"Category '{category_name}' is not present for search term '{product_name}', skipping...")
-                    continue
-                category_link.click()
-                time.sleep(2)
-                wait.until(EC.presence_of_element_located((By.XPATH, f'//li[contains(@class,"breadcrumbs__item ")]//span[.="{category_name}"]')))
-                category_suggestions = get_catalog_grid_product(driver, category_name)
-                suggestions = suggestions + category_suggestions
+        with borrow_driver() as driver:
+            driver.get(rozetka_category_search_url(product_name, section_id))
+            wait_for_page_ready(driver, 'rozetka.search', timer)
+            suggestions = get_catalog_grid_product(driver, category_name, timer)
+    except TimeoutException:
+        logger.info(f"Category '{category_name}' has no results for search term '{product_name}', skipping...")
+    except ScrapeBudgetExceeded as e:
+        logger.warning(f"{e} Skipping category '{category_name}'.")
     finally:
-        quit_driver()
+        timer.report()
 
-    logger.info(f"Found {len(suggestions)} suggestions for '{product_name}'.")
     return suggestions
 
 
-def get_catalog_grid_product(driver, category_name):
-    wait = WebDriverWait(driver, 10)  # Wait up to 10 seconds
-    product_elements = wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, 'goods-tile__inner')))
+def get_catalog_grid_product(driver, category_name, timer=None):
     # Find all product elements in the search results
+    product_elements = wait_for_elements(driver, (By.CLASS_NAME, 'goods-tile__inner'), 'rozetka.catalog_grid', timer)
 
     category_suggestions = []
 
@@ -75,7 +215,6 @@ def get_catalog_grid_product(driver, category_name):
         try:
             # Scroll the product element into view
             driver.execute_script("arguments[0].scrollIntoView(true);", product)
-            time.sleep(0.2)  # Optional: Slight delay to allow for smooth scrolling
 
             # Get product name
             product_name = product.find_element(By.CLASS_NAME, 'goods-tile__title').text.strip()
@@ -91,9 +230,8 @@ def get_catalog_grid_product(driver, category_name):
 
             # Get product image URL using the provided XPath
             try:
-                product_image = product.find_element(By.XPATH,
-                                                     './/a[contains(@class,"goods-tile__picture")]/img[1]').get_attribute(
-                    'src')
+                image_element = product.find_element(By.XPATH, './/a[contains(@class,"goods-tile__picture")]/img[1]')
+                product_image = wait_for_lazy_image(driver, image_element, timer)
             except NoSuchElementException:
                 product_image = None  # Set to None if image is not found
 
@@ -111,42 +249,134 @@ def get_catalog_grid_product(driver, category_name):
     return category_suggestions
 
 
-def scrape_rozetka_product(product_name, partial_names):
-    driver = get_driver()
+def wait_for_lazy_image(driver, image_element, timer=None):
+    """
+    Return the image URL once the lazily loaded tile image has its real `src`, or whatever it has after a short wait.
+    """
+    def loaded_src(d):
+        src = image_element.get_attribute('src')
+        return src if src and src.startswith('http') else False
+
+    try:
+        return wait_until(driver, loaded_src, 'rozetka.tile_image', timer, max_timeout=1)
+    except TimeoutException:
+        return image_element.get_attribute('src')
+
+
+def scrape_rozetka_product(product_name, partial_names, review_cursor=None):
+    """
+    Scrape a product and its reviews from Rozetka.
+    `review_cursor` is the hash of the newest review already stored; review pages are read
+    newest-first and scraping stops once that review is reached.
+    """
+    return scrape_with_fallback(
+        'rozetka', scrape_rozetka_product_http, scrape_rozetka_product_browser, product_name, partial_names,
+        review_cursor=review_cursor,
+    )
+
+
+def rozetka_reviews_page_url(product_url, page):
+    return f"{product_url}comments/" if page == 1 else f"{product_url}comments/page={page}/"
+
+
+def collect_new_reviews(fetch_page, review_cursor=None, max_pages=ROZETKA_REVIEW_MAX_PAGES):
+    """
+    Read review pages newest-first with `fetch_page(page)` until the review matching `review_cursor`
+    is reached, a page is empty or repeats already seen reviews, or `max_pages` pages were read.
+    Returns the new reviews, newest first.
+    """
+    reviews = []
+    seen_hashes = set()
+
+    for page in range(1, max_pages + 1):
+        page_has_new_reviews = False
+        for review in fetch_page(page):
+            review_hash = normalized_text_hash(review['text'])
+            if review_hash == review_cursor:
+                logger.info(f"Reached the last stored review on page {page}, {len(reviews)} new reviews found.")
+                return reviews
+            if review_hash not in seen_hashes:
+                seen_hashes.add(review_hash)
+                reviews.append(review)
+                page_has_new_reviews = True
+
+        # Out-of-range page numbers return no reviews or repeat the last page
+        if not page_has_new_reviews:
+            break
+
+    logger.info(f"Scraped {len(reviews)} valid reviews with ratings.")
+    return reviews
+
 
-    driver.get('https://rozetka.com.ua/search/')
-    time.sleep(3)
+def scrape_rozetka_product_http(product_name, partial_names, review_cursor=None):
+    response = fetch('rozetka', ROZETKA_SEARCH_URL, params={'text': product_name})
 
-    search_input = driver.find_element(By.XPATH, '//input[@name="search"]')
-    search_input.send_keys(product_name + Keys.ENTER)
-    time.sleep(3)
+    if 'search' not in response.url.path:
+        # Rozetka redirects exact matches straight to the product page
+        product_link = str(response.url)
+        product_html = response.text
+    else:
+        heading = parse_html(response.text).select_one('.goods-tile__heading')
+        if heading is None:
+            return None
+        product_link = urljoin(ROZETKA_BASE_URL, heading.get('href', ''))
+        product_html = fetch_html('rozetka', product_link)
+    logger.info(f"Found product link: {product_link}")
 
+    product_details = parse_rozetka_product(product_html, product_link)
+    if product_details is None:
+        return None
+
+    def fetch_page(page):
+        try:
+            return parse_rozetka_reviews(fetch_html('rozetka', rozetka_reviews_page_url(product_link, page)))
+        except httpx.HTTPStatusError:
+            return []
+
+    product_details['reviews'] = collect_new_reviews(fetch_page, review_cursor)
+    return product_details
+
+
+def scrape_rozetka_product_browser(product_name, partial_names, review_cursor=None):
+    timer = ScrapeTimer('rozetka')
     try:
-        current_url = driver.current_url
+        with borrow_driver() as driver:
+            driver.get('https://rozetka.com.ua/search/')
+            search_input = wait_for_element(driver, (By.XPATH, '//input[@name="search"]'), 'rozetka.search_input', timer)
 
-        if 'search' not in current_url:
-            product_link = current_url
-            logger.info(f"Already on product page: {product_link}")
-        else:
-            product_link = driver.find_element(By.CLASS_NAME, 'goods-tile__heading').get_attribute('href')
-            logger.info(f"Found product link: {product_link}")
+            previous_url = driver.current_url
+            search_input.send_keys(product_name + Keys.ENTER)
+            wait_for_url_change(driver, previous_url, 'rozetka.search_submit', timer)
 
-        product_details = scrape_rozetka_product_details(driver, product_link)
+            current_url = driver.current_url
 
+            if 'search' not in current_url:
+                product_link = current_url
+                logger.info(f"Already on product page: {product_link}")
+            else:
+                product_link = wait_for_element(
+                    driver, (By.CLASS_NAME, 'goods-tile__heading'), 'rozetka.search_results', timer
+                ).get_attribute('href')
+                logger.info(f"Found product link: {product_link}")
+
+            product_details = scrape_rozetka_product_details(driver, product_link, timer, review_cursor)
     finally:
-        quit_driver()
+        timer.report()
 
     return product_details
 
 
-def scrape_rozetka_product_details(driver, product_url):
+def scrape_rozetka_product_details(driver, product_url, timer=None, review_cursor=None):
     driver.get(product_url)
-    time.sleep(3)
+    wait_for_element(driver, (By.CLASS_NAME, 'product-price__big'), 'rozetka.product_page', timer)
 
     product_name = driver.find_element(By.TAG_NAME, 'h1').text.strip()
     product_price = driver.find_element(By.CLASS_NAME, 'product-price__big').text.strip()
 
-    reviews = scrape_rozetka_reviews(driver, product_url)
+    reviews = collect_new_reviews(
+        lambda page: scrape_rozetka_reviews(driver, rozetka_reviews_page_url(product_url, page), timer),
+        review_cursor,
+    )
 
     return {
         'name': product_name,
@@ -156,16 +386,13 @@ def scrape_rozetka_product_details(driver, product_url):
     }
 
 
-def scrape_rozetka_reviews(driver, product_url):
-    reviews_url = product_url + 'comments/'
+def scrape_rozetka_reviews(driver, reviews_url, timer=None):
     driver.get(reviews_url)
-    time.sleep(3)
 
     reviews = []
 
     try:
-        wait = WebDriverWait(driver, 10)  # Wait up to 10 seconds
-        review_elements = wait.until(EC.presence_of_all_elements_located((By.XPATH, '//div[@class="comment__inner"]')))
+        review_elements = wait_for_elements(driver, (By.XPATH, '//div[@class="comment__inner"]'), 'rozetka.reviews', timer)
         logger.info(f"Found {len(review_elements)} review elements.")
     except TimeoutException:
         logger.info("No review elements found within the timeout period. Skipping...")
@@ -175,23 +402,15 @@ def scrape_rozetka_reviews(driver, product_url):
             review_text = review_element.find_element(By.XPATH, './/div[@class="comment__body"]/p').text.strip()
 
             review_rating_element = review_element.find_element(By.CLASS_NAME, 'stars__rating')
-            rating_style = review_rating_element.get_attribute('style')
-            if 'calc(' in rating_style:
-                style_attribute = rating_style.split('calc(')[1].split('%')[0].strip()
-            else:
-                style_attribute = rating_style.split('width:')[-1].replace('%', '')
-            rating_percentage = float(style_attribute)
-            review_rating = (rating_percentage / 100) * 5
+            review_rating = parse_rating_style(review_rating_element.get_attribute('style'))
 
             reviews.append({
                 'text': review_text,
-                'rating': round(review_rating, 1)
+                'rating': review_rating
             })
 
         except NoSuchElementException:
             logger.warn("No rating found for this review, skipping.")
             continue
 
-    logger.info(f"Scraped {len(reviews)} valid reviews with ratings.")
     return reviews
-
@@ -1,73 +1,125 @@
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from functools import partial
+
+from django.db.models import F
+from django.utils import timezone
 
-from django.db.models import Q
 from api.models import Product, ProductSource
 from api.scrapers.comfy import scrape_comfy_product
-from api.scrapers.rozetka import scrape_rozetka_product, scrape_rozetka_suggestions
+from api.scrapers.rozetka import iter_rozetka_suggestions, scrape_rozetka_product
 from api.scrapers.allo import scrape_allo_product
 from api.scrapers.foxtrot import scrape_foxtrot_product
 from api.scrapers.citrus import scrape_citrus_product
 from api.utils.category_utils import ROZETKA_CATEGORIES
-from api.utils.db_utils import save_product_to_db
+from api.utils.db_utils import record_price_observation, save_product_to_db
+from api.utils.freshness import get_stale_marketplaces
+from api.utils.price_utils import parse_price
+from api.utils.product_search import search_products
 from api.utils.search_utils import generate_partial_product_names
+from api.utils.singleflight import singleflight
 from backend.logger import logger
 from urllib.parse import urlparse
 
 
+def get_category_name(category_id):
+    if category_id and category_id.strip():
+        return next((k for k, v in ROZETKA_CATEGORIES.items() if v == int(category_id)), None)
+    return None
+
+
 def get_product_suggestions(product_name, category_id=None):
     """
     Retrieve product suggestions based on the product name.
     First, try to find matching products in the database.
     If no products are found, scrape new suggestions from Rozetka.
     """
-    if category_id and category_id.strip():
-        category_name = next((k for k, v in ROZETKA_CATEGORIES.items() if v == int(category_id)), None)
-    else:
-        category_name = None
+    suggestions = None
+    for category_name, products in iter_product_suggestions(product_name, category_id):
+        if category_name is None:
+            suggestions = products
+
+    if suggestions is None:
+        suggestions = search_products(product_name, get_category_name(category_id))
+    return suggestions
 
-    logger.info(f"Fetching product suggestions for '{product_name}', category '{category_name}'")
 
-    filters = Q(name__icontains=product_name)
-    if category_name:
-        filters &= Q(category__icontains=category_name)
+def iter_product_suggestions(product_name, category_id=None):
+    """
+    Streaming counterpart of `get_product_suggestions`, yielding (category_name, products) batches.
+    Matches already in the database are yielded at once as a single queryset with category_name None.
+    Otherwise Rozetka is scraped and each category's saved products are yielded as it finishes.
+    """
+    category_name = get_category_name(category_id)
+    logger.info(f"Fetching product suggestions for '{product_name}', category '{category_name}'")
 
-    suggestions = Product.objects.filter(filters)
+    # Ranked and typo-tolerant, so a near-match already in the database avoids a scrape
+    suggestions = search_products(product_name, category_name)
 
     if suggestions.exists():
         logger.info(f"Found existing suggestions for '{product_name}' in the database.")
-        return suggestions
+        yield None, suggestions
+        return
+
+    # Concurrent searches for the same new query share one scrape instead of each launching a browser
+    with singleflight('scrape_suggestions', product_name, category_name) as leader:
+        if leader and not search_products(product_name, category_name).exists():
+            logger.info(f"No matching products found for '{product_name}' in the database. Scraping suggestions...")
+            yield from iter_scrape_and_save_suggestions(product_name, category_id)
+            logger.info(f"Scraped and saved suggestions for '{product_name}', category '{category_name}'.")
+            return
+
+    # Another request scraped this query (or just had); serve what it saved
+    yield None, search_products(product_name, category_name)
+
+
+def scrape_and_save_suggestions(product_name, category_id=None):
+    """
+    Scrape product suggestions from Rozetka and save them as non-detailed products.
+    """
+    for _ in iter_scrape_and_save_suggestions(product_name, category_id):
+        pass
 
-    logger.info(f"No matching products found for '{product_name}' in the database. Scraping suggestions...")
 
+def iter_scrape_and_save_suggestions(product_name, category_id=None):
+    """
+    Scrape product suggestions from Rozetka category by category, saving each category's suggestions
+    as soon as it finishes. Yields (category_name, saved products).
+    """
     # Primary source for product suggestions (e.g., Rozetka)
-    suggestions_data = scrape_rozetka_suggestions(product_name, category_id)
-
-    # Save each suggestion to the database if it doesn't already exist
-    for suggestion in suggestions_data:
-        # Find or create the main Product entry
-        product, _ = Product.objects.get_or_create(
-            name=suggestion['name'],
-            category=suggestion['category'],
-            defaults={
-                'image_url': suggestion.get('image', ''),
-                'is_detailed': False,  # Mark as non-detailed initially
-            }
-        )
-
-        # Create or update the ProductSource for this suggestion
-        ProductSource.objects.update_or_create(
-            product=product,
-            marketplace='rozetka',  # Assuming 'rozetka' is the marketplace for suggestions
-            url=suggestion['url'],
-            defaults={
-                'price': suggestion.get('price', ''),
-                'last_updated': datetime.now()
-            }
-        )
-
-    logger.info(f"Scraped and saved suggestions for '{product_name}', category '{category_name}'.")
-    return Product.objects.filter(filters)
+    for category_name, suggestions_data in iter_rozetka_suggestions(product_name, category_id):
+        yield category_name, [save_suggestion(suggestion) for suggestion in suggestions_data]
+
+
+def save_suggestion(suggestion):
+    """
+    Save a scraped suggestion as a non-detailed product with its Rozetka source, if it doesn't already exist.
+    """
+    # Find or create the main Product entry
+    product, _ = Product.objects.get_or_create(
+        name=suggestion['name'],
+        category=suggestion['category'],
+        defaults={
+            'image_url': suggestion.get('image', ''),
+            'is_detailed': False,  # Mark as non-detailed initially
+        }
+    )
+
+    # Create or update the ProductSource for this suggestion
+    price_minor, currency = parse_price(suggestion.get('price', ''))
+    source, _ = ProductSource.objects.update_or_create(
+        product=product,
+        marketplace='rozetka',  # Assuming 'rozetka' is the marketplace for suggestions
+        url=suggestion['url'],
+        defaults={
+            'price': suggestion.get('price', ''),
+            'price_minor': price_minor,
+            'currency': currency,
+            'last_updated': datetime.now()
+        }
+    )
+    record_price_observation(source)
+    return product
 
 
 def scrape_and_save_product(product_name):
@@ -75,7 +127,17 @@ def scrape_and_save_product(product_name):
     Check if the consolidated product already exists by name.
     If not, scrape data from multiple sources and create a consolidated product.
     Returns the consolidated product with data from all sources.
+    Concurrent calls for the same product wait for a single scrape and return its product.
     """
+    with singleflight('scrape_product', product_name) as leader:
+        if leader:
+            return _scrape_and_save_product(product_name)
+
+    logger.info(f"Product '{product_name}' was scraped by another worker.")
+    return Product.objects.filter(name__iexact=product_name).first()
+
+
+def _scrape_and_save_product(product_name):
     logger.info(f"Scraping detailed product data for '{product_name}'")
     # Find or create the consolidated product entry
     product, created = Product.objects.get_or_create(name__iexact=product_name, defaults={'name': product_name})
@@ -91,18 +153,41 @@ def scrape_and_save_product(product_name):
     # # TODO: Add check, if identifier consists only of digits, that use original product_name
     # if identifier is not None and not identifier.isdigit():
     #     product_name = identifier
-    partial_names = generate_partial_product_names(product_name)
+    scrape_marketplaces(product, product_name, get_scrape_functions(product))
+
+    # Mark the product as detailed if data from at least one source was saved
+    if ProductSource.objects.filter(product=product).exists():
+        product.is_detailed = True
+        product.save()
+        logger.info(f"Product '{product_name}' marked as detailed.")
 
-    # Scrape functions for each marketplace
-    scrape_functions = {
-        'rozetka': scrape_rozetka_product,
+    return product
+
+
+def get_scrape_functions(product):
+    """
+    Return the scrape function of each enabled marketplace for a product.
+    """
+    # Hash of the newest stored review per marketplace, so review scraping can stop there
+    review_cursors = dict(product.sources.values_list('marketplace', 'last_review_hash'))
+
+    return {
+        'rozetka': partial(scrape_rozetka_product, review_cursor=review_cursors.get('rozetka')),
         # 'comfy': scrape_comfy_product,
         # 'allo': scrape_allo_product,
         # 'foxtrot': scrape_foxtrot_product,
         'citrus': scrape_citrus_product,
     }
 
-    # Concurrently scrape each marketplace for the product data
+
+def scrape_marketplaces(product, product_name, scrape_functions):
+    """
+    Concurrently run the given marketplace scrape functions and save what they find to the product.
+    Returns the set of marketplaces whose data was saved.
+    """
+    partial_names = generate_partial_product_names(product_name)
+    saved = set()
+
     with ThreadPoolExecutor() as executor:
         future_to_source = {
             executor.submit(scrape_func, product_name, partial_names): source
@@ -117,13 +202,43 @@ def scrape_and_save_product(product_name):
                     product_data['marketplace'] = source  # Tag data with the marketplace source
                     save_product_to_db(product_data, product_id=product.id)  # Pass product_id for linking
                     logger.info(f"Data from {source} has been saved successfully.")
+                    saved.add(source)
             except Exception as e:
                 logger.error(f"Error scraping {source}: {e}")
+    return saved
 
-    # Mark the product as detailed if data from at least one source was saved
-    if ProductSource.objects.filter(product=product).exists():
-        product.is_detailed = True
-        product.save()
-        logger.info(f"Product '{product_name}' marked as detailed.")
+
+def refresh_product_sources(product, marketplaces=None):
+    """
+    Re-scrape the stale marketplaces of an already detailed product to refresh its prices and reviews.
+    `marketplaces` limits the refresh to the given marketplaces.
+    """
+    with singleflight('scrape_product', product.name) as leader:
+        if not leader:
+            logger.info(f"Product '{product.name}' is already being scraped by another worker.")
+            return product
+
+        # Checked again under the lock, as another worker may have just refreshed some of them
+        stale = set(get_stale_marketplaces(product))
+        if marketplaces is not None:
+            stale &= set(marketplaces)
+        scrape_functions = {
+            source: scrape_func for source, scrape_func in get_scrape_functions(product).items() if source in stale
+        }
+        if not scrape_functions:
+            logger.info(f"Product '{product.name}' has no stale sources to refresh.")
+            return product
+
+        logger.info(f"Refreshing {', '.join(scrape_functions)} data for '{product.name}'.")
+        sources = ProductSource.objects.filter(product=product, marketplace__in=scrape_functions)
+        sources.update(last_refresh_attempt_at=timezone.now())
+        saved = scrape_marketplaces(product, product.name, scrape_functions)
+
+        # Failed or empty refreshes back off, so views of the product do not queue the same scrape again
+        sources.filter(marketplace__in=saved).update(refresh_failures=0)
+        sources.exclude(marketplace__in=saved).update(refresh_failures=F('refresh_failures') + 1)
+        failed = sorted(set(scrape_functions) - saved)
+        if failed:
+            logger.warning(f"Refresh of {', '.join(failed)} data for '{product.name}' found nothing.")
 
     return product
@@ -1,110 +1,199 @@
 import os
 import numpy as np
-import pandas as pd
 from datetime import datetime
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Embedding, LSTM, Dense, Dropout, SpatialDropout1D
-from tensorflow.keras.preprocessing.sequence import pad_sequences
-from tensorflow.keras.optimizers import Adam
-from tensorflow.keras.preprocessing.text import one_hot, Tokenizer
-from tensorflow.keras.callbacks import Callback, EarlyStopping, ModelCheckpoint, ReduceLROnPlateau
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, classification_report
-from sklearn.utils.class_weight import compute_class_weight
-from sklearn.preprocessing import LabelEncoder
-import pickle
+
+from django.conf import settings
 
 from api.models import MLModel
-from api.sentiment.sentiment_model import translate_to_english
+from api.sentiment.corpus_cache import TrainingCorpus
+from api.sentiment.model_registry import registry
+from api.sentiment.translation import translate_many
+from api.sentiment.vocabulary import MAX_SEQUENCE_LENGTH, load_tokenizer_vocabulary
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+EPOCHS = 25
+# Models trained from scratch use the vocabulary of this tokenizer
+TRAINING_TOKENIZER = 'tokenizer.pkl'
+MODE_FULL = MLModel.TRAINING_MODE_FULL
+MODE_FINETUNE = MLModel.TRAINING_MODE_FINETUNE
+
+# Fine-tune the active model instead of training from scratch when at most this many labelled reviews are new to it
+FINETUNE_MAX_NEW_LABELS = getattr(settings, 'FINETUNE_MAX_NEW_LABELS', 500)
+FINETUNE_EPOCHS = getattr(settings, 'FINETUNE_EPOCHS', 3)
+# Base corpus rows replayed per new label, so that fine-tuning does not forget the corpus
+FINETUNE_REPLAY_RATIO = getattr(settings, 'FINETUNE_REPLAY_RATIO', 4)
+FINETUNE_MIN_REPLAY = getattr(settings, 'FINETUNE_MIN_REPLAY', 1000)
+# Small steps keep the pretrained weights close to where they were
+FINETUNE_LEARNING_RATE = 0.0001
+
 
+class TrainingCancelled(Exception):
+    pass
 
-def train_new_model(reviews):
+
+def choose_training_mode(active_model, new_label_count):
     """
-    Train a new LSTM model using the provided reviews.
-    Save the model and its tokenizer, and update the MLModel database.
+    Fine-tune when there is an active model and only a few labels are new to it, otherwise train from scratch.
     """
+    if active_model is not None and new_label_count <= FINETUNE_MAX_NEW_LABELS:
+        return MODE_FINETUNE
+    return MODE_FULL
 
-    existing_df = pd.read_csv(os.path.join(BASE_DIR, 'process_reviews.csv'))
 
-    # Prepare review texts and labels
-    texts = [translate_to_english(review.text) for review in reviews]
-    labels = [review.human_sentiment for review in reviews]
-
-    # Load the new reviews into DataFrame
-    new_reviews = pd.DataFrame({
-        "reviews": texts,
-        "sentiment": labels
-    })
+def train_new_model(reviews, mode=None, report_progress=None, should_cancel=None):
+    """
+    Train a new LSTM model using the provided reviews.
+    Save the model and its vocabulary, and update the MLModel database.
+    In 'full' mode the model is trained from random weights on the base corpus plus all the reviews.
+    In 'finetune' mode it starts from the active model's weights and trains for a few epochs on the
+    reviews that model was not trained on, mixed with a sample of the base corpus. Without a mode,
+    fine-tuning is chosen when there are at most FINETUNE_MAX_NEW_LABELS new reviews.
+    `report_progress(stage, **details)` is called as training advances, including after every epoch
+    with its metrics. `should_cancel()` is checked between stages and epochs; once it returns True
+    training stops and TrainingCancelled is raised without saving a model.
+    """
+    def report(stage, **details):
+        if report_progress is not None:
+            report_progress(stage, **details)
+
+    def check_cancelled():
+        if should_cancel is not None and should_cancel():
+            raise TrainingCancelled("Training was cancelled.")
+
+    # Heavy ML dependencies are imported here so that importing this module stays cheap
+    from tensorflow.keras.models import Sequential, clone_model
+    from tensorflow.keras.layers import Embedding, LSTM, Dense, Dropout, SpatialDropout1D
+    from tensorflow.keras.optimizers import Adam
+    from tensorflow.keras.callbacks import Callback, EarlyStopping, ReduceLROnPlateau
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+    from sklearn.utils.class_weight import compute_class_weight
+    from sklearn.preprocessing import LabelEncoder
+
+    reviews = list(reviews)
+    active_model = MLModel.objects.filter(is_active=True).first()
+    if active_model is not None:
+        trained_ids = set(active_model.reviews.values_list('id', flat=True))
+        new_reviews = [review for review in reviews if review.id not in trained_ids]
+    else:
+        new_reviews = reviews
+
+    mode = mode or choose_training_mode(active_model, len(new_reviews))
+    if mode not in (MODE_FULL, MODE_FINETUNE):
+        raise ValueError(f"Unknown training mode '{mode}'.")
+    if mode == MODE_FINETUNE:
+        if active_model is None:
+            raise Exception("Fine-tuning needs an active model. Activate a model or train in full mode.")
+        if not new_reviews:
+            raise Exception("No labelled reviews were added since the active model was trained.")
+    training_reviews = new_reviews if mode == MODE_FINETUNE else reviews
 
     # Load the saved LabelEncoder
     label_encoder = LabelEncoder()
     label_encoder.classes_ = np.load(os.path.join(BASE_DIR, 'classes.npy'), allow_pickle=True)
 
-    # Encode sentiments in the new reviews using the existing LabelEncoder
-    new_reviews['sentiment'] = label_encoder.transform(new_reviews['sentiment'])
+    # A fine-tuned model keeps the vocabulary its embedding was trained on
+    if mode == MODE_FINETUNE:
+        vocabulary = registry.get_vocabulary(active_model)
+    else:
+        vocabulary = load_tokenizer_vocabulary(TRAINING_TOKENIZER, BASE_DIR)
 
-    # Add additional fields to the new reviews
-    new_reviews['review_len'] = new_reviews['reviews'].str.len()
-    new_reviews['word_count'] = new_reviews['reviews'].str.split().str.len()
+    # The base corpus is encoded once and memory-mapped from the cache afterwards
+    report('loading', mode=mode)
+    corpus = TrainingCorpus(vocabulary)
+    base_sequences, base_labels = corpus.base()
+    if mode == MODE_FINETUNE:
+        # Replay part of the base corpus alongside the new labels
+        replay_size = min(max(FINETUNE_MIN_REPLAY, FINETUNE_REPLAY_RATIO * len(training_reviews)), len(base_labels))
+        replay_rows = np.sort(np.random.default_rng(0).choice(len(base_labels), size=replay_size, replace=False))
+        base_sequences, base_labels = base_sequences[replay_rows], base_labels[replay_rows]
 
-    # Append the new reviews to the existing DataFrame
-    updated_df = pd.concat([existing_df, new_reviews], ignore_index=True)
-    updated_df['reviews'] = updated_df['reviews'].astype("str")
+    check_cancelled()
 
-    # Parameters
-    NUM_WORDS = 30000
-    MAX_SEQUENCE_LENGTH = 32
-    OOV_TOKEN = '<OOV>'
-    PADDING = 'post'
+    # Only reviews added or edited since the previous run are translated and tokenized
+    report('tokenizing', reviews=len(training_reviews))
+    review_sequences = corpus.review_sequences(training_reviews, translate_many)
+    review_labels = label_encoder.transform([review.human_sentiment for review in training_reviews])
 
-    # Preprocess Reviews
-    with open(os.path.join(BASE_DIR, 'tokenizer.pkl'), 'rb') as f:
-        tokenizer = pickle.load(f)
-    X_seq = tokenizer.texts_to_sequences(updated_df['reviews'])
-    X_seq = pad_sequences(X_seq, maxlen=MAX_SEQUENCE_LENGTH, padding=PADDING, truncating=PADDING)
+    X_seq = np.concatenate([base_sequences, review_sequences])
+    labels = np.concatenate([base_labels, review_labels]).astype(np.int32)
 
-    Y_seq = pd.get_dummies(updated_df['sentiment']).values
+    # One column per known class, even if a fine-tuning sample lacks some of them
+    num_classes = len(label_encoder.classes_)
+    Y_seq = np.eye(num_classes, dtype=np.float32)[labels]
 
     X_train, X_test, Y_train, Y_test = train_test_split(X_seq, Y_seq, test_size=0.25, random_state=0)
 
     # Compute class weights
+    present_classes = np.unique(labels)
     class_weights = compute_class_weight(
         class_weight='balanced',
-        classes=np.unique(updated_df['sentiment']),
-        y=updated_df['sentiment']
+        classes=present_classes,
+        y=labels
     )
-    class_weights = dict(enumerate(class_weights))
-
-    # Build LSTM Model
-    model = Sequential([
-        Embedding(input_dim=len(tokenizer.word_index) + 1, output_dim=32, input_length=MAX_SEQUENCE_LENGTH),
-        SpatialDropout1D(0.5),
-        LSTM(100, dropout=0.2, recurrent_dropout=0.2),
-        Dense(512, activation='relu'),
-        Dropout(0.8),
-        Dense(256, activation='relu'),
-        Dropout(0.8),
-        Dense(Y_train.shape[1], activation='softmax')
-    ])
-
-    model.compile(loss='categorical_crossentropy', optimizer=Adam(learning_rate=0.001), metrics=['accuracy'])
+    class_weights = {label: 1.0 for label in range(num_classes)} | dict(zip(present_classes.tolist(), class_weights))
+
+    if mode == MODE_FINETUNE:
+        # Copy the active model so the instance serving predictions is left untouched
+        base_model = registry.get_model(active_model)
+        model = clone_model(base_model)
+        model.set_weights(base_model.get_weights())
+        epochs = FINETUNE_EPOCHS
+        learning_rate = FINETUNE_LEARNING_RATE
+        schedule_callbacks = []
+    else:
+        # Build LSTM Model
+        model = Sequential([
+            Embedding(input_dim=len(vocabulary) + 1, output_dim=32, input_length=MAX_SEQUENCE_LENGTH),
+            SpatialDropout1D(0.5),
+            LSTM(100, dropout=0.2, recurrent_dropout=0.2),
+            Dense(512, activation='relu'),
+            Dropout(0.8),
+            Dense(256, activation='relu'),
+            Dropout(0.8),
+            Dense(Y_train.shape[1], activation='softmax')
+        ])
+        epochs = EPOCHS
+        learning_rate = 0.001
+        schedule_callbacks = [
+            EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True),
+            ReduceLROnPlateau(monitor='val_loss', factor=0.2, patience=2)
+        ]
+
+    model.compile(loss='categorical_crossentropy', optimizer=Adam(learning_rate=learning_rate), metrics=['accuracy'])
+
+    class ProgressCallback(Callback):
+        def __init__(self):
+            super().__init__()
+            self.history = []
+            self.cancelled = False
+
+        def on_epoch_end(self, epoch, logs=None):
+            metrics = {name: float(value) for name, value in (logs or {}).items()}
+            self.history.append(metrics)
+            report('training', mode=mode, epoch=epoch + 1, epochs=epochs, metrics=metrics, history=self.history)
+            if should_cancel is not None and should_cancel():
+                self.cancelled = True
+                self.model.stop_training = True
+
+    progress_callback = ProgressCallback()
 
     # Train the model
+    check_cancelled()
+    report('training', mode=mode, epoch=0, epochs=epochs, metrics={}, history=[])
     history = model.fit(
         X_train, Y_train,
         validation_split=0.2,
-        epochs=25,
+        epochs=epochs,
         batch_size=16,
         class_weight=class_weights,
-        callbacks=[
-            EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True),
-            ReduceLROnPlateau(monitor='val_loss', factor=0.2, patience=2)
-        ]
+        callbacks=[*schedule_callbacks, progress_callback]
     )
+    if progress_callback.cancelled:
+        raise TrainingCancelled("Training was cancelled.")
 
     # Evaluate the model
+    report('evaluating', mode=mode, epochs_trained=len(progress_callback.history))
     y_pred = model.predict(X_test)
     accuracy = accuracy_score(Y_test.argmax(axis=1), y_pred.argmax(axis=1))
     precision = precision_score(Y_test.argmax(axis=1), y_pred.argmax(axis=1), average='weighted')
@@ -116,19 +205,23 @@ def train_new_model(reviews):
     model_filename = f'lstm_model_{timestamp}.h5'
 
     model.save(os.path.join(BASE_DIR, model_filename))
+    vocabulary_filename = vocabulary.save(BASE_DIR)
 
     # Save metadata to database
     ml_model = MLModel.objects.create(
         file_name=model_filename,
+        vocabulary=vocabulary_filename,
         created_at=datetime.now(),
         accuracy=accuracy,
         precision=precision,
         recall=recall,
         f1_score=f1,
-        is_active=False  # Newly trained models are not active by default
+        is_active=False,  # Newly trained models are not active by default
+        training_mode=mode,
+        base_model=active_model if mode == MODE_FINETUNE else None,
     )
 
-    # Associate the reviews with the new model
+    # Associate the reviews with the new model; a fine-tuned model has also learned those of its base model
     ml_model.reviews.add(*[review.id for review in reviews])
 
     return ml_model
@@ -0,0 +1,122 @@
+import hashlib
+import os
+import shutil
+
+import numpy as np
+
+from api.sentiment.sentiment_model import encode_reviews
+from api.sentiment.vocabulary import MAX_SEQUENCE_LENGTH
+from api.utils.hash_utils import normalized_text_hash
+from backend.logger import logger
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_PATH = os.path.join(BASE_DIR, 'process_reviews.csv')
+CACHE_DIR = os.path.join(BASE_DIR, 'corpus_cache')
+
+# Bump when the layout or the encoding of the cached arrays changes
+CACHE_VERSION = 3
+
+
+def _save_array(path, array):
+    # Write to a temporary file first so that a crash never leaves a truncated array behind
+    temp_path = f"{path}.tmp.npy"
+    np.save(temp_path, array)
+    os.replace(temp_path, path)
+
+
+class TrainingCorpus:
+    """
+    Encoded training data kept on disk as NumPy arrays, in a directory keyed by the vocabulary fingerprint
+    and the base corpus file. The base corpus is read from CSV and encoded once; later runs memory-map
+    the arrays. Labelled reviews are encoded once as well and reused until their text changes, so a run
+    only translates and tokenizes reviews added since the previous one. Labels of reviews are not cached,
+    since admins can change them at any time.
+    """
+
+    def __init__(self, vocabulary, corpus_path=CORPUS_PATH, cache_dir=CACHE_DIR):
+        self.vocabulary = vocabulary
+        self.corpus_path = corpus_path
+        self.cache_dir = cache_dir
+        stat = os.stat(corpus_path)
+        key = f"v{CACHE_VERSION}-{vocabulary.fingerprint}-{stat.st_size}-{stat.st_mtime_ns}"
+        self.fingerprint = hashlib.sha256(key.encode()).hexdigest()[:16]
+        self.path = os.path.join(cache_dir, self.fingerprint)
+
+    def _file(self, name):
+        return os.path.join(self.path, f'{name}.npy')
+
+    def base(self):
+        """
+        Return the encoded base corpus as memory-mapped (sequences, labels) arrays, building them on first use.
+        """
+        if not os.path.exists(self._file('base_labels')):
+            self._build_base()
+        return (
+            np.load(self._file('base_sequences'), mmap_mode='r'),
+            np.load(self._file('base_labels'), mmap_mode='r'),
+        )
+
+    def _build_base(self):
+        import pandas as pd
+
+        logger.info(f"Building training corpus cache {self.fingerprint} from {self.corpus_path}.")
+        os.makedirs(self.path, exist_ok=True)
+        corpus = pd.read_csv(self.corpus_path, usecols=['reviews', 'sentiment'])
+        # The base corpus is stored already preprocessed, so it is only encoded
+        sequences = self.vocabulary.encode(corpus['reviews'].astype(str).tolist())
+        labels = corpus['sentiment'].to_numpy(dtype=np.int32)
+        del corpus
+
+        _save_array(self._file('base_sequences'), sequences)
+        # Labels are written last; their presence marks the base corpus as complete
+        _save_array(self._file('base_labels'), labels)
+        self._remove_stale_caches()
+
+    def _remove_stale_caches(self):
+        for name in os.listdir(self.cache_dir):
+            if name != self.fingerprint:
+                shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+
+    def review_sequences(self, reviews, translate):
+        """
+        Return the encoded texts of the reviews as an int32 array in the same order.
+        Only reviews missing from the cache, or whose text changed, are passed through `translate`
+        (a function from a list of texts to a list of English texts) and encoded; they are then
+        appended to the cache.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        reviews_file = os.path.join(self.path, 'reviews.npz')
+        if os.path.exists(reviews_file):
+            with np.load(reviews_file) as cached:
+                cached_ids, cached_hashes, cached_sequences = cached['ids'], cached['hashes'], cached['sequences']
+        else:
+            cached_ids = np.zeros(0, dtype=np.int64)
+            cached_hashes = np.zeros(0, dtype='S64')
+            cached_sequences = np.zeros((0, MAX_SEQUENCE_LENGTH), dtype=np.int32)
+
+        rows = {review_id: row for row, review_id in enumerate(cached_ids.tolist())}
+        text_hashes = [(review.text_hash or normalized_text_hash(review.text)).encode() for review in reviews]
+        missing = [
+            index for index, review in enumerate(reviews)
+            if review.id not in rows or cached_hashes[rows[review.id]] != text_hashes[index]
+        ]
+
+        if missing:
+            logger.info(f"Encoding {len(missing)} of {len(reviews)} training reviews.")
+            new_sequences = encode_reviews(translate([reviews[index].text for index in missing]), self.vocabulary)
+            new_ids = np.array([reviews[index].id for index in missing], dtype=np.int64)
+
+            # Drop the outdated rows of reviews whose text changed, then append the new rows
+            keep = ~np.isin(cached_ids, new_ids)
+            cached_ids = np.concatenate([cached_ids[keep], new_ids])
+            new_hashes = np.array([text_hashes[index] for index in missing], dtype='S64')
+            cached_hashes = np.concatenate([cached_hashes[keep], new_hashes])
+            cached_sequences = np.concatenate([cached_sequences[keep], new_sequences])
+
+            # Labelled reviews are a small fraction of the corpus, so they are rewritten as one compressed file
+            temp_file = f"{reviews_file}.tmp.npz"
+            np.savez_compressed(temp_file, ids=cached_ids, hashes=cached_hashes, sequences=cached_sequences)
+            os.replace(temp_file, reviews_file)
+            rows = {review_id: row for row, review_id in enumerate(cached_ids.tolist())}
+
+        return cached_sequences[[rows[review.id] for review in reviews]].reshape(-1, MAX_SEQUENCE_LENGTH)
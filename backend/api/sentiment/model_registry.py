@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from api.models import MLModel
+from api.sentiment.vocabulary import Vocabulary, legacy_tokenizer_file, load_tokenizer_vocabulary
+from backend.logger import logger
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# How often (in seconds) the registry re-reads which MLModel is active
+ACTIVE_MODEL_CHECK_INTERVAL = getattr(settings, 'ACTIVE_MODEL_CHECK_INTERVAL', 5)
+
+
+class ModelRegistry:
+    """
+    Lazily loads sentiment models and their vocabularies and keeps them cached.
+    Nothing is read from disk until the first prediction, so importing the sentiment
+    package does not pay the TensorFlow startup cost. The active model is re-checked
+    against the database at most every ACTIVE_MODEL_CHECK_INTERVAL seconds, and the
+    registry swaps to a newly activated model without a restart.
+    """
+
+    def __init__(self, check_interval=ACTIVE_MODEL_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._models = {}
+        self._vocabularies = {}  # By artifact or legacy tokenizer file name
+        self._active = None  # (MLModel.id, keras model, vocabulary), replaced as a whole on swap
+        self._checked_at = 0.0
+        self._label_encoder = None
+
+    def get_model(self, ml_model):
+        """
+        Return the loaded Keras model for the given MLModel row, loading it on first use.
+        """
+        model = self._models.get(ml_model.id)
+        if model is not None:
+            return model
+
+        with self._lock:
+            model = self._models.get(ml_model.id)
+            if model is None:
+                from tensorflow.keras.models import load_model
+
+                model = load_model(os.path.join(BASE_DIR, ml_model.file_name))
+                self._models[ml_model.id] = model
+                logger.info(f"Loaded ML model: {ml_model.file_name}")
+        return model
+
+    def get_vocabulary(self, ml_model):
+        """
+        Return the vocabulary the given MLModel was trained with, loading it on first use.
+        """
+        file_name = ml_model.vocabulary or legacy_tokenizer_file(ml_model)
+        vocabulary = self._vocabularies.get(file_name)
+        if vocabulary is not None:
+            return vocabulary
+
+        with self._lock:
+            vocabulary = self._vocabularies.get(file_name)
+            if vocabulary is None:
+                if ml_model.vocabulary:
+                    vocabulary = Vocabulary.load(file_name, BASE_DIR)
+                else:
+                    vocabulary = load_tokenizer_vocabulary(file_name, BASE_DIR)
+                self._vocabularies[file_name] = vocabulary
+                logger.info(f"Loaded vocabulary: {file_name}")
+        return vocabulary
+
+    def get_active(self):
+        """
+        Return the Keras model of the currently active MLModel together with its vocabulary.
+        """
+        active = self._active
+        if active is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return active[1], active[2]
+
+        active_id = MLModel.objects.filter(is_active=True).values_list('id', flat=True).first()
+        self._checked_at = time.monotonic()
+        if active_id is None:
+            raise Exception("No active model found in the database. Please activate a model.")
+
+        if active is not None and active[0] == active_id:
+            return active[1], active[2]
+
+        ml_model = MLModel.objects.get(id=active_id)
+        model, vocabulary = self.get_model(ml_model), self.get_vocabulary(ml_model)
+        self._active = (active_id, model, vocabulary)
+        logger.info(f"Switched active ML model to id {active_id}")
+        return model, vocabulary
+
+    def get_active_model(self):
+        """
+        Return the Keras model of the currently active MLModel.
+        """
+        return self.get_active()[0]
+
+    def invalidate(self):
+        """
+        Force the next `get_active` call to re-check the database.
+        """
+        self._checked_at = 0.0
+
+    def evict(self, model_id):
+        """
+        Drop a loaded model from the cache, e.g. after its file has been removed.
+        """
+        with self._lock:
+            self._models.pop(model_id, None)
+            if self._active is not None and self._active[0] == model_id:
+                self._active = None
+
+    def get_label_encoder(self):
+        if self._label_encoder is None:
+            with self._lock:
+                if self._label_encoder is None:
+                    from sklearn.preprocessing import LabelEncoder
+
+                    label_encoder = LabelEncoder()
+                    label_encoder.classes_ = np.load(os.path.join(BASE_DIR, 'classes.npy'), allow_pickle=True)
+                    self._label_encoder = label_encoder
+        return self._label_encoder
+
+
+registry = ModelRegistry()
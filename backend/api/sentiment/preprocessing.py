@@ -0,0 +1,75 @@
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+
+# Lists of at least this many reviews are preprocessed across a process pool by default
+PREPROCESS_PARALLEL_THRESHOLD = getattr(settings, 'PREPROCESS_PARALLEL_THRESHOLD', 200000)
+# Number of distinct surface words whose stems are kept in memory
+STEM_CACHE_SIZE = 100000
+
+NON_LETTERS = re.compile('[^a-zA-Z]')
+
+STOP_WORDS = frozenset([
+    'yourselves', 'between', 'whom', 'itself', 'is', "she's", 'up', 'herself', 'here', 'your', 'each',
+    'we', 'he', 'my', "you've", 'having', 'in', 'both', 'for', 'themselves', 'are', 'them', 'other',
+    'and', 'an', 'during', 'their', 'can', 'yourself', 'she', 'until', 'so', 'these', 'ours', 'above',
+    'what', 'while', 'have', 're', 'more', 'only', "needn't", 'when', 'just', 'that', 'were', "don't",
+    'very', 'should', 'any', 'y', 'isn', 'who', 'a', 'they', 'to', 'too', "should've", 'has', 'before',
+    'into', 'yours', "it's", 'do', 'against', 'on', 'now', 'her', 've', 'd', 'by', 'am', 'from',
+    'about', 'further', "that'll", "you'd", 'you', 'as', 'how', 'been', 'the', 'or', 'doing', 'such',
+    'his', 'himself', 'ourselves', 'was', 'through', 'out', 'below', 'own', 'myself', 'theirs',
+    'me', 'why', 'once', 'him', 'than', 'be', 'most', "you'll", 'same', 'some', 'with', 'few', 'it',
+    'at', 'after', 'its', 'which', 'there', 'our', 'this', 'hers', 'being', 'did', 'of', 'had', 'under',
+    'over', 'again', 'where', 'those', 'then', "you're", 'i', 'because', 'does', 'all',
+])
+
+
+@lru_cache(maxsize=None)
+def get_stemmer():
+    # nltk takes over a second to import, so it is only loaded once preprocessing is needed
+    from nltk.stem import PorterStemmer
+
+    return PorterStemmer()
+
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def preprocess_word(word):
+    """
+    Stem a word, or return None for a stop word. Memoized by surface word, since reviews share most of their words.
+    """
+    if word in STOP_WORDS:
+        return None
+    return get_stemmer().stem(word)
+
+
+def preprocess_review(review):
+    """
+    Keep the Latin words of an English review, drop stop words and stem the rest.
+    """
+    words = (preprocess_word(word) for word in NON_LETTERS.sub(' ', review).split())
+    return ' '.join(word for word in words if word is not None)
+
+
+def preprocess_reviews(reviews, processes=None):
+    """
+    Preprocess a list of reviews, returning the results in the same order.
+    With `processes` above 1 the list is split into chunks that are preprocessed in that many worker
+    processes; by default a pool of one process per CPU is used for lists of at least
+    PREPROCESS_PARALLEL_THRESHOLD reviews, such as a full retraining corpus, and smaller lists stay
+    in this process where the stem cache is already warm.
+    """
+    reviews = list(reviews)
+    if processes is None:
+        processes = (os.cpu_count() or 1) if len(reviews) >= PREPROCESS_PARALLEL_THRESHOLD else 1
+    if processes <= 1 or len(reviews) < 2:
+        return [preprocess_review(review) for review in reviews]
+
+    # Large chunks keep pickling overhead low; a few chunks per process even out the load
+    chunk_size = -(-len(reviews) // (processes * 4))
+    # Spawned workers, since forking a process that runs web or job worker threads can copy held locks
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return list(pool.map(preprocess_review, reviews, chunksize=chunk_size))
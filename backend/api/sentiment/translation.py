@@ -0,0 +1,131 @@
+import threading
+
+from cachetools import LRUCache
+from django.conf import settings
+
+from api.models import TranslationCache
+from api.utils.hash_utils import normalize_text, normalized_text_hash
+from backend.logger import logger
+
+# Name of the translator backend: 'google' for googletrans, 'stub' for an offline identity translator
+TRANSLATION_BACKEND = getattr(settings, 'TRANSLATION_BACKEND', 'google')
+# Number of translations kept in the in-process LRU in front of the database table
+TRANSLATION_CACHE_SIZE = getattr(settings, 'TRANSLATION_CACHE_SIZE', 10000)
+# Keeps `text_hash__in` lookups under the database's bound parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+
+class GoogleTranslatorBackend:
+    """
+    Translates texts to English through googletrans.
+    """
+
+    def __init__(self):
+        from googletrans import Translator
+
+        self.translator = Translator()
+
+    def translate_batch(self, texts):
+        """
+        Return a list with the English translation of each text, or None where translation failed.
+        """
+        try:
+            return [translated.text for translated in self.translator.translate(texts, src='auto', dest='en')]
+        except Exception as e:
+            logger.warning(f"Batch translation failed, retrying texts one by one: {e}")
+
+        translations = []
+        for text in texts:
+            try:
+                translations.append(self.translator.translate(text, src='auto', dest='en').text)
+            except Exception as e:
+                logger.error(f"Translation error: {e}")
+                translations.append(None)
+        return translations
+
+
+class StubTranslatorBackend:
+    """
+    Offline backend that returns texts unchanged, for tests and local runs without network access.
+    """
+
+    def translate_batch(self, texts):
+        return list(texts)
+
+
+TRANSLATOR_BACKENDS = {
+    'google': GoogleTranslatorBackend,
+    'stub': StubTranslatorBackend,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+_memory_cache = LRUCache(maxsize=TRANSLATION_CACHE_SIZE)
+_memory_cache_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = TRANSLATOR_BACKENDS[TRANSLATION_BACKEND]()
+    return _backend
+
+
+def translate_many(texts):
+    """
+    Translate a list of texts to English, returning translations in the same order.
+    Lookups go through the in-process LRU, then the TranslationCache table, and only the
+    remaining misses are sent to the translator backend in a single batch.
+    Texts that fail to translate are returned unchanged and are not cached.
+    """
+    hashes = [normalized_text_hash(text) for text in texts]
+    translations = {}
+
+    with _memory_cache_lock:
+        for key in hashes:
+            if key in _memory_cache:
+                translations[key] = _memory_cache[key]
+
+    missing = [key for key in set(hashes) if key not in translations]
+    if missing:
+        stored = {}
+        for start in range(0, len(missing), LOOKUP_CHUNK_SIZE):
+            stored.update(
+                TranslationCache.objects.filter(
+                    text_hash__in=missing[start:start + LOOKUP_CHUNK_SIZE]
+                ).values_list('text_hash', 'translated_text')
+            )
+        translations.update(stored)
+
+        # Deduplicate misses so repeated texts are only translated once
+        to_translate = {}
+        for key, text in zip(hashes, texts):
+            if key not in translations and key not in to_translate:
+                to_translate[key] = normalize_text(text)
+
+        new_entries = []
+        if to_translate:
+            results = get_backend().translate_batch(list(to_translate.values()))
+            for key, translated in zip(to_translate, results):
+                if translated is not None:
+                    translations[key] = translated
+                    stored[key] = translated
+                    new_entries.append(TranslationCache(text_hash=key, translated_text=translated))
+            TranslationCache.objects.bulk_create(new_entries, ignore_conflicts=True)
+            logger.info(f"Translated {len(new_entries)} of {len(to_translate)} uncached texts.")
+
+        with _memory_cache_lock:
+            _memory_cache.update(stored)
+
+    return [translations.get(key, text) for key, text in zip(hashes, texts)]
+
+
+def translate_to_english(text):
+    return translate_many([text])[0]
+
+
+def clear_memory_cache():
+    with _memory_cache_lock:
+        _memory_cache.clear()
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+from functools import cached_property
+from itertools import chain
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MAX_SEQUENCE_LENGTH = 32
+# Bump when the artifact layout changes
+VOCABULARY_FORMAT = 1
+
+# Tokenizer that every model trained before vocabulary artifacts existed was served with
+LEGACY_TOKENIZER = 'tokenizer_balanced.pkl'
+
+
+class Vocabulary:
+    """
+    Immutable word-to-index lookup equivalent to a fitted Keras tokenizer.
+    Words are kept in a sorted NumPy array, so a batch of tokens is looked up with one `searchsorted`
+    call instead of a dict lookup per word, and the whole vocabulary costs a few hundred kilobytes.
+    The same instance encodes texts for training and for inference of the models that use it.
+    """
+
+    def __init__(self, words, num_words=None, oov_token=None, filters='', lower=True, split=' '):
+        # `words[i]` is the word with index i + 1; index 0 is padding
+        self.words = tuple(words)
+        self.num_words = num_words
+        self.oov_token = oov_token
+        self.filters = filters
+        self.lower = lower
+        self.split = split
+
+        words_array = np.array(self.words, dtype=str)
+        order = np.argsort(words_array)
+        self._sorted_words = words_array[order]
+        self._sorted_indices = (order + 1).astype(np.int32)
+        self._oov_index = self.words.index(oov_token) + 1 if oov_token in self.words else None
+        self._filter_table = str.maketrans({char: split for char in filters})
+
+    def __len__(self):
+        return len(self.words)
+
+    @classmethod
+    def from_tokenizer(cls, tokenizer):
+        if tokenizer.char_level:
+            raise ValueError("Character-level tokenizers are not supported.")
+        words = sorted(tokenizer.word_index, key=tokenizer.word_index.get)
+        if [tokenizer.word_index[word] for word in words] != list(range(1, len(words) + 1)):
+            raise ValueError("Tokenizer word indices are not contiguous.")
+        return cls(
+            words, num_words=tokenizer.num_words, oov_token=tokenizer.oov_token,
+            filters=tokenizer.filters, lower=tokenizer.lower, split=tokenizer.split,
+        )
+
+    def to_dict(self):
+        return {
+            'format': VOCABULARY_FORMAT,
+            'num_words': self.num_words,
+            'oov_token': self.oov_token,
+            'filters': self.filters,
+            'lower': self.lower,
+            'split': self.split,
+            'words': list(self.words),
+        }
+
+    @cached_property
+    def fingerprint(self):
+        """
+        Content hash of the vocabulary; two vocabularies with the same fingerprint encode every text the same way.
+        """
+        content = json.dumps(self.to_dict(), sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+    @property
+    def file_name(self):
+        return f'vocabulary_{self.fingerprint}.json'
+
+    def save(self, directory=BASE_DIR):
+        """
+        Write the vocabulary artifact unless it already exists and return its file name.
+        Artifacts are named by content, so they never change once written.
+        """
+        path = os.path.join(directory, self.file_name)
+        if not os.path.exists(path):
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        return self.file_name
+
+    @classmethod
+    def load(cls, file_name, directory=BASE_DIR):
+        with open(os.path.join(directory, file_name), encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('format') != VOCABULARY_FORMAT:
+            raise ValueError(f"Unsupported vocabulary format in {file_name}.")
+        return cls(
+            data['words'], num_words=data['num_words'], oov_token=data['oov_token'],
+            filters=data['filters'], lower=data['lower'], split=data['split'],
+        )
+
+    def split_words(self, text):
+        # Same splitting as Keras text_to_word_sequence
+        if self.lower:
+            text = text.lower()
+        return [word for word in text.translate(self._filter_table).split(self.split) if word]
+
+    def encode(self, texts):
+        """
+        Map texts to word indices, padded or truncated at the end to MAX_SEQUENCE_LENGTH, with the same
+        result as Keras `texts_to_sequences` followed by `pad_sequences(padding='post', truncating='post')`.
+        Returns an int32 array of shape (len(texts), MAX_SEQUENCE_LENGTH).
+        """
+        encoded = np.zeros((len(texts), MAX_SEQUENCE_LENGTH), dtype=np.int32)
+        words_per_text = [self.split_words(text) for text in texts]
+        tokens = np.array(list(chain.from_iterable(words_per_text)), dtype=str)
+        if not len(tokens) or not len(self._sorted_words):
+            return encoded
+
+        positions = np.minimum(np.searchsorted(self._sorted_words, tokens), len(self._sorted_words) - 1)
+        indices = np.where(self._sorted_words[positions] == tokens, self._sorted_indices[positions], 0)
+        if self.num_words:
+            # Keras only keeps the num_words - 1 most frequent words
+            indices[indices >= self.num_words] = 0
+        rows = np.repeat(np.arange(len(texts)), [len(words) for words in words_per_text])
+
+        if self._oov_index is not None:
+            indices[indices == 0] = self._oov_index
+        else:
+            known = indices != 0
+            indices, rows = indices[known], rows[known]
+
+        # Column of each token within its text; tokens past the sequence length are truncated
+        counts = np.bincount(rows, minlength=len(texts))
+        columns = np.arange(len(indices)) - np.repeat(np.cumsum(counts) - counts, counts)
+        kept = columns < MAX_SEQUENCE_LENGTH
+        encoded[rows[kept], columns[kept]] = indices[kept]
+        return encoded
+
+
+def legacy_tokenizer_file(ml_model):
+    """
+    Name of the pickled Keras tokenizer a model trained before vocabulary artifacts was used with.
+    Inference used LEGACY_TOKENIZER for all of them, so they keep encoding text the same way.
+    """
+    return LEGACY_TOKENIZER
+
+
+def load_tokenizer_vocabulary(tokenizer_file, directory=BASE_DIR):
+    """
+    Build a vocabulary from a pickled Keras tokenizer.
+    """
+    import pickle
+
+    with open(os.path.join(directory, tokenizer_file), 'rb') as f:
+        return Vocabulary.from_tokenizer(pickle.load(f))
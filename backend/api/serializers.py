@@ -1,12 +1,12 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
-from api.models import Product, ProductSource, Review, MLModel
+from api.models import Product, ProductSource, Review, MLModel, Job
 
 
 class ProductSourceSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductSource
-        fields = ['marketplace', 'url', 'price', 'last_updated']
+        fields = ['marketplace', 'url', 'price', 'price_minor', 'currency', 'last_updated']
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -29,23 +29,43 @@ class MLModelSerializer(serializers.ModelSerializer):
             "recall",
             "f1_score",
             "is_active",
+            "training_mode",
+            "base_model",
             'reviews',
         ]
 
 
+REVIEW_FIELDS = ['id', 'text', 'rating', 'model_sentiment', 'confidence', 'human_sentiment', 'needs_review']
+
+
 class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
-        fields = ['id', 'text', 'rating', 'model_sentiment', 'confidence', 'human_sentiment', 'needs_review',]
+        fields = REVIEW_FIELDS
 
 
 class DetailedProductSerializer(serializers.ModelSerializer):
     sources = ProductSourceSerializer(many=True, read_only=True)  # Nested ProductSource data
-    reviews = ReviewSerializer(many=True, read_only=True, source='sources__reviews')
+    # Review metrics come from the precomputed aggregates; the reviews themselves are paginated separately
+    average_rating = serializers.FloatField(read_only=True)
 
     class Meta:
         model = Product
-        fields = ['id', 'name', 'image_url', 'description', 'is_detailed', 'sources', 'reviews']
+        fields = [
+            'id', 'name', 'image_url', 'description', 'is_detailed', 'sources',
+            'review_count', 'positive_count', 'neutral_count', 'negative_count', 'average_rating',
+        ]
+
+
+class JobSerializer(serializers.ModelSerializer):
+    job_id = serializers.IntegerField(source='id', read_only=True)
+
+    class Meta:
+        model = Job
+        fields = [
+            'job_id', 'kind', 'status', 'result', 'error', 'progress', 'cancel_requested',
+            'created_at', 'started_at', 'finished_at',
+        ]
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -1,3 +1,622 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.backends.utils import CursorWrapper
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from selenium.common.exceptions import TimeoutException
+
+from api.jobs.queue import JOB_STALE_AFTER, claim_next, enqueue, run_job
+from api.models import InflightOperation, Job, MLModel, PriceObservation, Product, ProductSource, Review
+from api.scrapers.allo import parse_allo_product, parse_allo_reviews
+from api.scrapers.citrus import parse_citrus_product, parse_citrus_reviews
+from api.scrapers.comfy import parse_comfy_product, parse_comfy_reviews
+from api.scrapers.foxtrot import parse_foxtrot_product, parse_foxtrot_reviews
+from api.scrapers.rozetka import parse_rozetka_product, parse_rozetka_reviews
+from api.sentiment.active_ml import FINETUNE_MAX_NEW_LABELS, TrainingCancelled, choose_training_mode
+from api.sentiment.corpus_cache import TrainingCorpus
+from api.sentiment.preprocessing import STOP_WORDS, preprocess_review, preprocess_reviews
+from api.sentiment.vocabulary import MAX_SEQUENCE_LENGTH, Vocabulary
+from api.utils.aggregate_utils import refresh_product_aggregates
+from api.utils.freshness import REFRESH_RETRY_DELAY, REFRESH_SCRAPE_BUDGET, is_stale, stale_sources_filter
+from api.utils.price_utils import parse_price
+from api.utils.product_search import SEARCH_MAX_CANDIDATES, index_available, rebuild_index, search_products
+from api.utils.singleflight import _renew_lease, operation_key, singleflight
+from api.utils.waits import WAIT_MIN_TIMEOUT, AdaptiveTimeouts, wait_until
+from api.views import SUGGESTIONS_PAGE_SIZE, order_suggestions, queue_stale_refresh, suggestion_events
+
+
+@contextmanager
+def count_queries():
+    """
+    Count the SQL queries run inside the block on every thread. Async views run part of their work
+    on executor threads with their own connections, which CaptureQueriesContext would miss.
+    """
+    queries = []
+    lock = threading.Lock()
+    execute = CursorWrapper._execute_with_wrappers
+
+    def counting_execute(self, sql, params, many, executor):
+        with lock:
+            queries.append(sql)
+        return execute(self, sql, params, many, executor)
+
+    with mock.patch.object(CursorWrapper, '_execute_with_wrappers', counting_execute):
+        yield queries
+
+
+# Views run part of their queries on executor threads, which do not see data inside a test transaction,
+# so these tests commit their data and use TransactionTestCase
+class QueryBudgetTests(TransactionTestCase):
+    def assertMaxQueries(self, queries, budget):
+        self.assertLessEqual(
+            len(queries), budget,
+            f"{len(queries)} queries exceed the budget of {budget}:\n" + "\n".join(queries),
+        )
+
+    def create_product(self, name, is_detailed=True, sources=('rozetka', 'citrus'), reviews_per_source=5):
+        product = Product.objects.create(name=name, category='Мобільні телефони', is_detailed=is_detailed)
+        for marketplace in sources:
+            source = ProductSource.objects.create(product=product, marketplace=marketplace, url='https://example.com/')
+            Review.objects.bulk_create([
+                Review(
+                    product_source=source,
+                    text=f"{name} {marketplace} review {index}",
+                    text_hash=f"{marketplace}-{index}",
+                    rating=4,
+                    model_sentiment='Positive',
+                    confidence=0.4,
+                    needs_review=True,
+                )
+                for index in range(reviews_per_source)
+            ])
+        refresh_product_aggregates([product.id])
+        return product
+
+    def test_product_suggestions(self):
+        for index in range(30):
+            self.create_product(f"Samsung Galaxy A{index}", is_detailed=index % 2 == 0)
+
+        with count_queries() as queries:
+            response = self.client.get('/api/suggestions/', {'query': 'Samsung', 'page': 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 30)
+        self.assertMaxQueries(queries, 5)
+
+    def test_product_suggestions_are_not_capped(self):
+        count = SEARCH_MAX_CANDIDATES + 200
+        Product.objects.bulk_create([Product(name=f"Samsung Galaxy A{index}") for index in range(count)])
+        rebuild_index()
+
+        self.assertEqual(search_products("Samsung").count(), count)
+        last_page = -(-count // SUGGESTIONS_PAGE_SIZE)
+        response = self.client.get('/api/suggestions/', {'query': 'Samsung', 'page': last_page})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], count)
+        self.assertEqual(len(response.json()['results']), count - (last_page - 1) * SUGGESTIONS_PAGE_SIZE)
+        self.assertIsNone(response.json()['next'])
+
+    def test_product_details(self):
+        product = self.create_product("Apple iPhone 15")
+
+        with count_queries() as queries:
+            response = self.client.get('/api/product/', {'productId': product.id})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertMaxQueries(queries, 5)
+        # Reviews are paginated by their own endpoint; the product only carries their aggregates
+        self.assertNotIn('reviews', response.json())
+        self.assertEqual(response.json()['review_count'], 10)
+        self.assertEqual(response.json()['positive_count'], 10)
+        self.assertEqual(response.json()['average_rating'], 4)
+
+    def test_reviews_for_product(self):
+        product = self.create_product("Xiaomi Redmi Note 13", reviews_per_source=60)
+
+        with count_queries() as queries:
+            response = self.client.get(f'/api/product/{product.id}/reviews/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertMaxQueries(queries, 2)
+
+    def test_reviews_for_product_cursor_pagination(self):
+        product = self.create_product("Xiaomi Redmi Note 13", reviews_per_source=7)
+
+        review_ids = []
+        url = f'/api/product/{product.id}/reviews/?page_size=3'
+        while url:
+            data = self.client.get(url).json()
+            for group in data['results']:
+                review_ids.extend(review['id'] for review in group['reviews'])
+            url = data['next']
+
+        self.assertEqual(sorted(review_ids), sorted(Review.objects.values_list('id', flat=True)))
+        self.assertEqual(len(review_ids), len(set(review_ids)))
+
+    def test_reviews_needing_review(self):
+        for index in range(5):
+            self.create_product(f"Lenovo IdeaPad {index}")
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('admin', password='admin', is_staff=True))
+
+        with count_queries() as queries:
+            response = client.get('/api/admin/reviews/', {'mode': 'marked'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 21)
+        self.assertMaxQueries(queries, 3)
+
+    def test_list_ml_models(self):
+        for index in range(3):
+            self.create_product(f"Asus Vivobook {index}")
+        review_ids = list(Review.objects.order_by('id').values_list('id', flat=True)[:20])
+        Review.objects.filter(id__in=review_ids).update(human_sentiment='Positive')
+        # Migrations seed the initial models, which have no reviews
+        MLModel.objects.all().delete()
+        for index in range(4):
+            model = MLModel.objects.create(file_name=f"model_{index}.h5")
+            model.reviews.set(review_ids[:index * 5])
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('admin', password='admin', is_staff=True))
+
+        with count_queries() as queries:
+            response = client.get('/api/admin/models/')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['unassociated_reviews_count'], 5)
+        self.assertEqual(
+            sorted((model['associated_reviews_count'], model['new_reviews_count']) for model in data['models']),
+            [(0, 20), (5, 15), (10, 10), (15, 5)],
+        )
+        self.assertMaxQueries(queries, 3)
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        self.s23 = Product.objects.create(name="Samsung Galaxy S23 8/256GB Phantom Black")
+
+    def test_other_model_number_does_not_match(self):
+        self.assertFalse(search_products("Galaxy S24").exists())
+
+        s24 = Product.objects.create(name="Samsung Galaxy S24 8/128GB Onyx Black")
+        self.assertEqual(list(search_products("Galaxy S24")), [s24])
+        # A model number still being typed matches every model it could become
+        self.assertEqual(set(search_products("galaxy s2")), {self.s23, s24})
+
+    def test_typo_in_name_still_matches(self):
+        if not index_available():
+            self.skipTest("The trigram search index is not available.")
+        self.assertEqual(list(search_products("Galaxi S23")), [self.s23])
+
+
+class SuggestionStreamTests(TestCase):
+    def test_done_carries_the_ordered_first_page_after_scraping(self):
+        products = [Product.objects.create(name=f"Samsung Galaxy A{index}") for index in range(30)]
+        scraped = [('Смартфони', products[15:][::-1]), ('Планшети', products[:15][::-1])]
+
+        with mock.patch('api.scrapers.scraper_manager.iter_product_suggestions', return_value=iter(scraped)):
+            events = list(suggestion_events("Samsung Galaxy", None))
+
+        self.assertEqual([event for event, _ in events], ['results', 'results', 'done'])
+        done = events[-1][1]
+        self.assertEqual(done['count'], 30)
+        first_page = order_suggestions(search_products("Samsung Galaxy"))[:SUGGESTIONS_PAGE_SIZE]
+        self.assertEqual([result['id'] for result in done['results']], [product.id for product in first_page])
+
+
+class SingleflightTests(TestCase):
+    def test_leader_does_not_release_a_lock_taken_over_after_its_lease(self):
+        first = singleflight('scrape_suggestions', "galaxy s24")
+        self.assertTrue(first.__enter__())
+        key = operation_key('scrape_suggestions', "galaxy s24")
+        InflightOperation.objects.filter(key=key).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        with singleflight('scrape_suggestions', "galaxy s24") as leader:
+            self.assertTrue(leader)
+            first.__exit__(None, None, None)
+            self.assertTrue(InflightOperation.objects.filter(key=key).exists())
+        self.assertFalse(InflightOperation.objects.filter(key=key).exists())
+
+    def test_lease_is_renewed_while_the_leader_runs(self):
+        expires_at = timezone.now() + timedelta(seconds=1)
+        InflightOperation.objects.create(key='key', operation='scrape', token='token', expires_at=expires_at)
+        stop = mock.Mock(wait=mock.Mock(side_effect=[False, True]))
+
+        with mock.patch('api.utils.singleflight.connection'):
+            _renew_lease('key', 'token', 300, stop)
+
+        self.assertGreater(InflightOperation.objects.get(key='key').expires_at, expires_at + timedelta(seconds=200))
+
+
+@mock.patch('api.jobs.queue.JOB_WORKER_MODE', 'external')
+class RefreshBackoffTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name="Apple iPhone 15", is_detailed=True)
+        self.source = ProductSource.objects.create(
+            product=self.product, marketplace='rozetka', url='https://example.com/'
+        )
+        ProductSource.objects.filter(id=self.source.id).update(last_updated=timezone.now() - timedelta(days=2))
+
+    def assertStale(self, expected, now=None):
+        self.source.refresh_from_db()
+        self.assertEqual(is_stale(self.source, now), expected)
+        self.assertEqual(ProductSource.objects.filter(stale_sources_filter(now), id=self.source.id).exists(), expected)
+
+    def test_failed_refreshes_back_off(self):
+        self.assertStale(True)
+
+        attempted_at = timezone.now()
+        ProductSource.objects.filter(id=self.source.id).update(last_refresh_attempt_at=attempted_at, refresh_failures=2)
+        self.assertStale(False)
+        # Two failures double the retry delay twice
+        self.assertStale(False, attempted_at + timedelta(seconds=3 * REFRESH_RETRY_DELAY))
+        self.assertStale(True, attempted_at + timedelta(seconds=4 * REFRESH_RETRY_DELAY + 1))
+
+    def test_view_refreshes_stay_within_the_scrape_budget(self):
+        # Refreshes of other products already use all but one scrape of the budget
+        marketplaces = ['rozetka'] * (REFRESH_SCRAPE_BUDGET - 1)
+        Job.objects.create(kind='refresh_product', key='other', payload={'marketplaces': marketplaces})
+
+        job = queue_stale_refresh(self.product, ['citrus', 'rozetka'])
+        self.assertEqual(job.payload['marketplaces'], ['citrus'])
+
+        Job.objects.filter(id=job.id).delete()
+        Job.objects.create(kind='refresh_product', key='more', payload={'marketplaces': ['rozetka']})
+        self.assertIsNone(queue_stale_refresh(self.product, ['citrus', 'rozetka']))
+
+
+class PriceTests(TestCase):
+    def test_parse_price(self):
+        self.assertEqual(parse_price("12 999₴"), (1299900, 'UAH'))
+        self.assertEqual(parse_price("1 299,50 грн"), (129950, 'UAH'))
+        self.assertEqual(parse_price("37 999 ₴ 34 999 ₴"), (3499900, 'UAH'))
+        self.assertEqual(parse_price("Price not available"), (None, None))
+
+    def test_parse_price_ignores_discount_percentages(self):
+        self.assertEqual(parse_price("34 999 грн -15%"), (3499900, 'UAH'))
+        self.assertEqual(parse_price("-12,5 % 34 999₴"), (3499900, 'UAH'))
+
+    @mock.patch('api.management.commands.rollup_price_history.CHUNK_SIZE', 5)
+    def test_rollup_writes_one_row_per_source_and_day(self):
+        product = Product.objects.create(name="Apple iPhone 15")
+        source = ProductSource.objects.create(product=product, marketplace='rozetka', url='https://example.com/')
+        day = timezone.localtime() - timedelta(days=40)
+        # More observations on the first day than fit in one chunk
+        PriceObservation.objects.bulk_create([
+            PriceObservation(
+                source=source, observed_at=day.replace(hour=0, minute=index), price_minor=1000 + index, currency='UAH'
+            )
+            for index in range(12)
+        ] + [
+            PriceObservation(
+                source=source, observed_at=day.replace(hour=0) + timedelta(days=1, minutes=index),
+                price_minor=2000 + index, currency='UAH',
+            )
+            for index in range(3)
+        ])
+
+        call_command('rollup_price_history', stdout=io.StringIO())
+
+        self.assertEqual(
+            list(source.price_observations.values_list('resolution', 'price_minor').order_by('observed_at')),
+            [(PriceObservation.RESOLUTION_DAY, 1011), (PriceObservation.RESOLUTION_DAY, 2002)],
+        )
+
+
+@mock.patch('api.jobs.queue.JOB_WORKER_MODE', 'external')
+class JobQueueTests(TestCase):
+    def test_job_of_crashed_worker_is_replaced(self):
+        job, _ = enqueue('scrape_product', 1, {'product_id': 1})
+        claim_next(['scrape_product'])
+        # The worker process died mid-run, so the heartbeat stopped
+        Job.objects.filter(id=job.id).update(heartbeat_at=timezone.now() - timedelta(seconds=JOB_STALE_AFTER + 1))
+
+        new_job, created = enqueue('scrape_product', 1, {'product_id': 1})
+
+        self.assertTrue(created)
+        self.assertNotEqual(new_job.id, job.id)
+        self.assertEqual(Job.objects.get(id=job.id).status, Job.STATUS_FAILED)
+
+    def test_concurrent_retry_after_a_stale_job_shares_the_winner(self):
+        job, _ = enqueue('scrape_product', 1, {'product_id': 1})
+        claim_next(['scrape_product'])
+        competitor = []
+
+        def fail_and_race(job_ids):
+            # Another request fails the stale job and queues its replacement first
+            Job.objects.filter(id__in=job_ids).update(status=Job.STATUS_FAILED)
+            competitor.append(Job.objects.create(kind='scrape_product', key='1', payload={'product_id': 1}))
+            return 1
+
+        with mock.patch('api.jobs.queue.fail_stale_jobs', side_effect=fail_and_race):
+            self.assertEqual(enqueue('scrape_product', 1, {'product_id': 1}), (competitor[0], False))
+
+    def test_running_job_with_heartbeat_is_shared(self):
+        job, _ = enqueue('scrape_product', 1, {'product_id': 1})
+        claim_next(['scrape_product'])
+
+        self.assertEqual(enqueue('scrape_product', 1, {'product_id': 1}), (job, False))
+
+    def test_existing_queued_job_is_resubmitted(self):
+        job, _ = enqueue('scrape_product', 1, {'product_id': 1})
+
+        with mock.patch('api.jobs.queue._submit_drain') as submit_drain:
+            self.assertEqual(enqueue('scrape_product', 1, {'product_id': 1}), (job, False))
+        submit_drain.assert_called_once_with('scrape_product')
+
+
+@mock.patch('api.jobs.queue.JOB_WORKER_MODE', 'external')
+class TrainModelJobTests(TestCase):
+    def setUp(self):
+        product = Product.objects.create(name="Apple iPhone 15")
+        source = ProductSource.objects.create(product=product, marketplace='rozetka', url='https://example.com/')
+        Review.objects.create(
+            product_source=source, text="Great phone", rating=5,
+            model_sentiment='Positive', confidence=0.9, human_sentiment='Positive',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('admin', password='admin', is_staff=True))
+
+    def test_training_is_queued_once(self):
+        first = self.client.post('/api/admin/models/train/')
+        second = self.client.post('/api/admin/models/train/')
+
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(second.status_code, 202)
+        self.assertEqual(first.json()['data']['job_id'], second.json()['data']['job_id'])
+        self.assertEqual(Job.objects.filter(kind='train_model').count(), 1)
+
+    def test_progress_is_recorded(self):
+        job_id = self.client.post('/api/admin/models/train/').json()['data']['job_id']
+
+        def train_new_model(reviews, mode, report_progress, should_cancel):
+            report_progress('training', epoch=1, epochs=25, metrics={'loss': 0.5})
+            self.assertEqual(Job.objects.get(id=job_id).progress['epoch'], 1)
+            return MLModel.objects.create(file_name="lstm_model_test.h5")
+
+        with mock.patch('api.sentiment.active_ml.train_new_model', train_new_model):
+            run_job(claim_next(['train_model']))
+
+        data = self.client.get('/api/admin/models/train/status/').json()['data']
+        self.assertEqual(data['status'], Job.STATUS_DONE)
+        self.assertEqual(data['progress']['metrics'], {'loss': 0.5})
+
+    def test_training_mode(self):
+        response = self.client.post('/api/admin/models/train/', {'mode': 'partial'})
+        self.assertEqual(response.status_code, 400)
+
+        job_id = self.client.post('/api/admin/models/train/', {'mode': 'full'}).json()['data']['job_id']
+        self.assertEqual(Job.objects.get(id=job_id).payload['mode'], 'full')
+
+        active_model = MLModel(file_name="lstm_model_active.h5", is_active=True)
+        self.assertEqual(choose_training_mode(None, 10), MLModel.TRAINING_MODE_FULL)
+        self.assertEqual(choose_training_mode(active_model, 10), MLModel.TRAINING_MODE_FINETUNE)
+        self.assertEqual(choose_training_mode(active_model, FINETUNE_MAX_NEW_LABELS + 1), MLModel.TRAINING_MODE_FULL)
+
+    def test_cancel_running_training(self):
+        job_id = self.client.post('/api/admin/models/train/').json()['data']['job_id']
+        job = claim_next(['train_model'])
+
+        def train_new_model(reviews, mode, report_progress, should_cancel):
+            self.assertFalse(should_cancel())
+            self.client.post(f'/api/admin/models/train/{job_id}/cancel/')
+            self.assertTrue(should_cancel())
+            raise TrainingCancelled("Training was cancelled.")
+
+        with mock.patch('api.sentiment.active_ml.train_new_model', train_new_model):
+            job = run_job(job)
+
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+
+    def test_cancel_queued_training(self):
+        job_id = self.client.post('/api/admin/models/train/').json()['data']['job_id']
+
+        response = self.client.post(f'/api/admin/models/train/{job_id}/cancel/')
+
+        self.assertEqual(response.json()['data']['status'], Job.STATUS_FAILED)
+        self.assertIsNone(claim_next(['train_model']))
+
+
+class WordTokenizer:
+    """
+    Stand-in for a fitted Keras tokenizer.
+    """
+    num_words = 4
+    oov_token = '<OOV>'
+    filters = '!,.'
+    lower = True
+    split = ' '
+    char_level = False
+
+    def __init__(self, words):
+        self.word_index = {word: index for index, word in enumerate(words, start=1)}
+
+
+class VocabularyTests(SimpleTestCase):
+    def test_encode_matches_keras_tokenizer(self):
+        vocabulary = Vocabulary.from_tokenizer(WordTokenizer(['<OOV>', 'good', 'phone', 'screen']))
+
+        encoded = vocabulary.encode(["Good phone, GOOD screen!", "", "unknown " + "phone " * 40])
+
+        self.assertEqual(encoded.dtype, 'int32')
+        self.assertEqual(encoded.shape, (3, MAX_SEQUENCE_LENGTH))
+        # 'screen' is beyond num_words, so like unknown words it maps to the OOV index
+        self.assertEqual(encoded[0].tolist(), [2, 3, 2, 1] + [0] * (MAX_SEQUENCE_LENGTH - 4))
+        self.assertEqual(encoded[1].tolist(), [0] * MAX_SEQUENCE_LENGTH)
+        self.assertEqual(encoded[2].tolist(), [1] + [3] * (MAX_SEQUENCE_LENGTH - 1))
+
+    def test_unknown_words_are_dropped_without_oov_token(self):
+        vocabulary = Vocabulary(['good', 'phone'])
+
+        self.assertEqual(vocabulary.encode(["very good phone"])[0, :3].tolist(), [1, 2, 0])
+
+    def test_artifact_round_trip(self):
+        vocabulary = Vocabulary.from_tokenizer(WordTokenizer(['<OOV>', 'good', 'phone']))
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = vocabulary.save(directory)
+            loaded = Vocabulary.load(file_name, directory)
+
+        self.assertEqual(loaded.fingerprint, vocabulary.fingerprint)
+        self.assertEqual(file_name, f'vocabulary_{vocabulary.fingerprint}.json')
+
+
+class PreprocessingTests(SimpleTestCase):
+    reviews = [
+        "The batteries are running out quickly, I don't like it!",
+        "Great screen; the camera is amazing.",
+        "",
+    ]
+
+    def test_preprocess_review(self):
+        self.assertIn('the', STOP_WORDS)
+        self.assertEqual(preprocess_review(self.reviews[0]), "the batteri run quickli i don t like")
+        self.assertEqual(preprocess_review(self.reviews[1]), "great screen camera amaz")
+
+    def test_batch_matches_single_reviews(self):
+        expected = [preprocess_review(review) for review in self.reviews]
+
+        self.assertEqual(preprocess_reviews(self.reviews), expected)
+        self.assertEqual(preprocess_reviews(self.reviews * 10, processes=2), expected * 10)
+
+
+class TrainingCorpusTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.corpus_path = os.path.join(directory.name, 'process_reviews.csv')
+        self.cache_dir = os.path.join(directory.name, 'cache')
+        with open(self.corpus_path, 'w') as f:
+            # The base corpus is stored preprocessed
+            f.write("reviews,sentiment,review_len\ngood phone,2,10\nbad batteri,0,11\n")
+        # Stemmed words, since labelled reviews are preprocessed before encoding
+        self.vocabulary = Vocabulary(['good', 'phone', 'bad', 'batteri', 'great', 'screen'])
+
+    def test_base_corpus_is_encoded_once(self):
+        # The base corpus file is already preprocessed
+        not_preprocessed = AssertionError("The base corpus was preprocessed again.")
+        with mock.patch('api.sentiment.sentiment_model.preprocess_reviews', side_effect=not_preprocessed):
+            sequences, labels = TrainingCorpus(self.vocabulary, self.corpus_path, self.cache_dir).base()
+
+        self.assertEqual(sequences.shape, (2, MAX_SEQUENCE_LENGTH))
+        self.assertEqual(sequences[:, :3].tolist(), [[1, 2, 0], [3, 4, 0]])
+        self.assertEqual(labels.tolist(), [2, 0])
+
+        with mock.patch('pandas.read_csv', side_effect=AssertionError("The corpus was read again.")):
+            cached_sequences, _ = TrainingCorpus(self.vocabulary, self.corpus_path, self.cache_dir).base()
+        self.assertEqual(cached_sequences.tolist(), sequences.tolist())
+
+    def test_only_new_or_edited_reviews_are_encoded(self):
+        corpus = TrainingCorpus(self.vocabulary, self.corpus_path, self.cache_dir)
+        translate = mock.Mock(side_effect=lambda texts: texts)
+        reviews = [Review(id=1, text="great screen"), Review(id=2, text="bad phone")]
+
+        first = corpus.review_sequences(reviews, translate)
+        reviews = [Review(id=3, text="good battery"), Review(id=2, text="great phone"), reviews[0]]
+        second = corpus.review_sequences(reviews, translate)
+
+        self.assertEqual(translate.call_args_list[1].args, (["good battery", "great phone"],))
+        self.assertEqual(second[:, :2].tolist(), [[1, 4], [5, 2], first[0, :2].tolist()])
+
+
+TEST_PAGES_DIR = os.path.join(os.path.dirname(__file__), 'test_pages')
+PRODUCT_NAME = "Samsung Galaxy S24 8/128GB Onyx Black"
+
+
+class ScraperParserTests(SimpleTestCase):
+    """
+    Parse saved marketplace product pages. Review texts with line breaks or several paragraphs
+    must keep a space between the parts.
+    """
+
+    def parse_page(self, marketplace, parse_product, parse_reviews):
+        with open(os.path.join(TEST_PAGES_DIR, f'{marketplace}.html'), encoding='utf-8') as f:
+            html = f.read()
+        return parse_product(html, 'https://example.com/product'), parse_reviews(html)
+
+    def test_rozetka(self):
+        product, reviews = self.parse_page('rozetka', parse_rozetka_product, parse_rozetka_reviews)
+
+        self.assertEqual(product['name'], f"Мобільний телефон {PRODUCT_NAME}")
+        self.assertEqual(product['price'], "34 999₴")
+        self.assertEqual(reviews, [
+            {'text': "Чудовий телефон. Батарея тримає весь день.", 'rating': 5.0},
+            {'text': "Камера гарна, але корпус гріється.", 'rating': 3.0},
+        ])
+
+    def test_comfy(self):
+        product, reviews = self.parse_page('comfy', parse_comfy_product, parse_comfy_reviews)
+
+        self.assertEqual(product['name'], "Смартфон Samsung Galaxy S24 8/128Gb Onyx Black")
+        self.assertEqual(product['price'], "34 999 ₴")
+        self.assertEqual(reviews, [
+            {'text': "Доставили швидко. Екран яскравий.", 'rating': 4.0},
+            {'text': "Динамік тихий.", 'rating': 2.0},
+        ])
+
+    def test_allo(self):
+        product, reviews = self.parse_page('allo', parse_allo_product, parse_allo_reviews)
+
+        self.assertEqual(product['name'], f"{PRODUCT_NAME} (SM-S921BZKDEUC)")
+        self.assertEqual(product['price'], "34 999")
+        self.assertEqual(reviews, [
+            {'text': "Дуже задоволена. Працює швидко.", 'rating': 5.0},
+            {'text': "Без оцінки, але відгук корисний.", 'rating': None},
+        ])
+
+    def test_foxtrot(self):
+        product, reviews = self.parse_page('foxtrot', parse_foxtrot_product, parse_foxtrot_reviews)
+
+        self.assertEqual(product['name'], "Смартфон SAMSUNG Galaxy S24 8/128 Gb Onyx Black")
+        self.assertEqual(product['price'], "34 999₴")
+        self.assertEqual(reviews, [
+            {'text': "Гарний смартфон. Зарядка повільна.", 'rating': 4.0},
+            {'text': "Все підходить.", 'rating': None},
+        ])
+
+    def test_citrus(self):
+        product, reviews = self.parse_page('citrus', parse_citrus_product, parse_citrus_reviews)
+
+        self.assertEqual(product['name'], PRODUCT_NAME)
+        self.assertEqual(product['price'], "34 999 ₴")
+        self.assertEqual(reviews, [
+            {'text': "Опыт использования Пользуюсь месяц. Всё отлично.", 'rating': 4},
+        ])
+
+
+class WaitTests(SimpleTestCase):
+    def test_learned_timeout_is_never_below_the_floor(self):
+        timeouts = AdaptiveTimeouts()
+        timeouts.observe('fast', 0.05)
+
+        self.assertEqual(timeouts.timeout_for('fast', 10), WAIT_MIN_TIMEOUT)
+        self.assertGreaterEqual(WAIT_MIN_TIMEOUT, 3)
+
+    def test_learned_timeout_is_retried_with_the_full_limit(self):
+        timeouts = AdaptiveTimeouts()
+        timeouts.observe('page', 1)
+        wait = mock.Mock(side_effect=[TimeoutException(), 'element'])
+
+        with mock.patch('api.utils.waits.adaptive_timeouts', timeouts), mock.patch('api.utils.waits._wait', wait):
+            result = wait_until(None, None, 'page', max_timeout=10)
+
+        self.assertEqual(result, 'element')
+        self.assertEqual([call.args[4] for call in wait.call_args_list], [3.0, 10])
+
+    def test_full_limit_timeout_is_not_retried(self):
+        wait = mock.Mock(side_effect=TimeoutException())
+
+        with mock.patch('api.utils.waits.adaptive_timeouts', AdaptiveTimeouts()), \
+                mock.patch('api.utils.waits._wait', wait), self.assertRaises(TimeoutException):
+            wait_until(None, None, 'page', max_timeout=10)
+        self.assertEqual(wait.call_count, 1)
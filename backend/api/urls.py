@@ -1,7 +1,7 @@
 from django.urls import path, include
 from . import views
 from .views import mark_review_for_review, list_reviews_needing_review, update_review_sentiment, add_user_review, \
-    list_ml_models, activate_ml_model, train_model, get_user
+    list_ml_models, activate_ml_model, train_model, train_model_status, cancel_train_model, get_user
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -13,13 +13,18 @@ admin_patterns = [
     path('models/', list_ml_models, name='list-ml-models'),
     path('models/<int:model_id>/activate/', activate_ml_model, name='activate-ml-model'),
     path('models/train/', train_model, name='train-model'),
+    path('models/train/status/', train_model_status, name='train-model-status'),
+    path('models/train/<int:job_id>/cancel/', cancel_train_model, name='cancel-train-model'),
 ]
 
 urlpatterns = [
     path('suggestions/', views.get_product_suggestions, name='product-suggestions'),
+    path('suggestions/stream/', views.stream_product_suggestions, name='product-suggestions-stream'),
     path('product/', views.get_product_details, name='product-details'),
     path('product/<int:product_id>/reviews/', views.get_reviews_for_product, name='product-reviews'),
+    path('product/<int:product_id>/price-history/', views.get_price_history, name='product-price-history'),
     path('categories/', views.get_rozetka_categories, name='product-categories'),
+    path('jobs/<int:job_id>/', views.get_job_status, name='job-status'),
     path('reviews/<int:review_id>/mark-for-review/', mark_review_for_review, name='mark_review_for_review'),
     path('product/<int:product_id>/add-review/', add_user_review, name='add_user_review'),
     path('admin/', include(admin_patterns)),
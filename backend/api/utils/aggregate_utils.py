@@ -0,0 +1,61 @@
+from django.db.models import Count, Q, Sum
+
+from api.models import Product, Review
+
+SENTIMENTS = ('Positive', 'Neutral', 'Negative')
+
+
+def sentiment_filter(sentiment):
+    # An admin's label overrides the model's prediction
+    return Q(human_sentiment=sentiment) | Q(human_sentiment__isnull=True, model_sentiment=sentiment)
+
+
+def compute_product_aggregates(product_ids):
+    """
+    Return {product_id: {field: value}} with the review aggregates of the given products,
+    computed in a single grouped query. Products without reviews get zeros.
+    """
+    aggregates = {
+        product_id: {
+            'review_count': 0,
+            'rating_sum': 0.0,
+            'positive_count': 0,
+            'neutral_count': 0,
+            'negative_count': 0,
+        }
+        for product_id in product_ids
+    }
+    rows = Review.objects.filter(
+        product_source__product_id__in=product_ids
+    ).values('product_source__product_id').annotate(
+        review_count=Count('id'),
+        rating_sum=Sum('rating'),
+        positive_count=Count('id', filter=sentiment_filter('Positive')),
+        neutral_count=Count('id', filter=sentiment_filter('Neutral')),
+        negative_count=Count('id', filter=sentiment_filter('Negative')),
+    )
+    for row in rows:
+        product_id = row.pop('product_source__product_id')
+        row['rating_sum'] = row['rating_sum'] or 0.0
+        aggregates[product_id] = row
+    return aggregates
+
+
+def refresh_product_aggregates(product_ids):
+    """
+    Recompute the denormalized review aggregates of the given products.
+    Call this after reviews of a product are created, relabelled or deleted.
+    """
+    product_ids = set(product_ids)
+    for product_id, values in compute_product_aggregates(product_ids).items():
+        Product.objects.filter(id=product_id).update(**values)
+
+
+def rebuild_all_product_aggregates(chunk_size=500):
+    """
+    Recompute the aggregates of every product. Returns the number of products updated.
+    """
+    product_ids = list(Product.objects.values_list('id', flat=True))
+    for start in range(0, len(product_ids), chunk_size):
+        refresh_product_aggregates(product_ids[start:start + chunk_size])
+    return len(product_ids)
@@ -0,0 +1,57 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections
+
+# Threads available to async views for blocking work (ORM queries, scraping); bounds how much
+# blocking work runs at once no matter how many requests are waiting on it
+ASYNC_BLOCKING_THREADS = getattr(settings, 'ASYNC_BLOCKING_THREADS', 16)
+
+blocking_executor = ThreadPoolExecutor(max_workers=ASYNC_BLOCKING_THREADS, thread_name_prefix='async-blocking')
+
+_DONE = object()
+
+
+def _call(func, *args, **kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        # Executor threads outlive requests, so release their database connections like a request would
+        close_old_connections()
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a blocking function on the bounded executor and await its result.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, partial(_call, func, *args, **kwargs))
+
+
+async def iterate_blocking(func, *args, **kwargs):
+    """
+    Run a blocking generator function on the bounded executor and yield its items as they are produced.
+    The generator runs to completion even if the consumer stops early, so started work (e.g. a scrape) is kept.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def produce():
+        try:
+            for item in func(*args, **kwargs):
+                loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, (_DONE, e))
+        else:
+            loop.call_soon_threadsafe(queue.put_nowait, (_DONE, None))
+
+    loop.run_in_executor(blocking_executor, partial(_call, produce))
+    while True:
+        item, error = await queue.get()
+        if error is not None:
+            raise error
+        if item is _DONE:
+            return
+        yield item
@@ -1,7 +1,12 @@
-from api.models import Product, ProductSource, Review
+from api.models import Product, ProductSource, Review, PriceObservation
 from datetime import datetime
 
-from api.sentiment.sentiment_model import predict_sentiment
+from django.utils import timezone
+
+from api.sentiment.sentiment_model import predict_sentiment_batch
+from api.utils.aggregate_utils import refresh_product_aggregates
+from api.utils.hash_utils import normalized_text_hash
+from api.utils.price_utils import parse_price
 from backend.logger import logger
 
 
@@ -14,40 +19,76 @@ def save_product_to_db(product_data, product_id):
     product = Product.objects.get(id=product_id)
 
     # Step 2: Save or update the ProductSource entry for this marketplace
+    price_minor, currency = parse_price(product_data['price'])
     source, _ = ProductSource.objects.update_or_create(
         product=product,
         marketplace=product_data['marketplace'],  # Marketplace name e.g., 'rozetka'
         defaults={
             'url': product_data['url'],
             'price': product_data['price'],
+            'price_minor': price_minor,
+            'currency': currency,
             'last_updated': datetime.now(),
         }
     )
+    record_price_observation(source)
 
     # Step 3: Add reviews for this ProductSource entry
-    # Ensure that existing reviews for this source are not duplicated
-    existing_reviews = set(
-        source.reviews.values_list('text', flat=True)
-    )  # Use 'text' as a unique identifier for simplicity (can be enhanced)
-
-    new_reviews = []
-    for review in product_data.get('reviews', []):
-        if review['text'] not in existing_reviews:
-            sentiment, confidence = predict_sentiment(review['text'])
-            new_reviews.append(
-                Review(
-                    product_source=source,
-                    text=review['text'],
-                    model_sentiment=sentiment,
-                    confidence=confidence,
-                    rating=review['rating']
-                )
-            )
+    scraped_reviews = product_data.get('reviews', [])
+
+    # Skip reviews already stored for this source; the lookup uses the (product_source, text_hash) index
+    scraped_hashes = [normalized_text_hash(review['text']) for review in scraped_reviews]
+    existing_hashes = set(
+        source.reviews.filter(text_hash__in=scraped_hashes).values_list('text_hash', flat=True)
+    )
+
+    pending_reviews = []
+    for review, text_hash in zip(scraped_reviews, scraped_hashes):
+        if text_hash not in existing_hashes:
+            existing_hashes.add(text_hash)  # Also drop duplicates within this batch
+            pending_reviews.append((review, text_hash))
+
+    # Run inference over all new reviews at once instead of one model call per review
+    predictions = predict_sentiment_batch([review['text'] for review, _ in pending_reviews])
+
+    new_reviews = [
+        Review(
+            product_source=source,
+            text=review['text'],
+            text_hash=text_hash,
+            model_sentiment=sentiment,
+            confidence=confidence,
+            rating=review['rating']
+        )
+        for (review, text_hash), (sentiment, confidence) in zip(pending_reviews, predictions)
+    ]
+
+    # Scrapers return reviews newest first; remember the newest one so the next scrape can stop there
+    if scraped_reviews:
+        source.last_review_hash = scraped_hashes[0]
+        source.reviews_synced_at = datetime.now()
+        source.save(update_fields=['last_review_hash', 'reviews_synced_at'])
 
     if new_reviews:
-        Review.objects.bulk_create(new_reviews)
+        # Concurrent ingests of the same source are resolved by the unique index
+        Review.objects.bulk_create(new_reviews, ignore_conflicts=True)
+        refresh_product_aggregates([product.id])
         logger.info(f"Added {len(new_reviews)} new reviews for product '{product.name}' on {source.marketplace}.")
     else:
         logger.info(f"No new reviews to add for product '{product.name}' on {source.marketplace}.")
 
     logger.info(f"Data for '{product.name}' on '{source.marketplace}' has been saved to the database.")
+
+
+def record_price_observation(source):
+    """
+    Append the source's current parsed price to its price history, if it has one.
+    """
+    if source.price_minor is None:
+        return None
+    return PriceObservation.objects.create(
+        source=source,
+        observed_at=timezone.now(),
+        price_minor=source.price_minor,
+        currency=source.currency,
+    )
@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from api.models import Job
+
+DEFAULT_SOURCE_TTL = getattr(settings, 'DEFAULT_SOURCE_TTL', 12 * 60 * 60)
+SOURCE_TTLS = getattr(settings, 'SOURCE_TTLS', {})
+STALE_WHILE_REVALIDATE = getattr(settings, 'STALE_WHILE_REVALIDATE', True)
+# Marketplace scrapes that background refreshes may have queued or running at once
+REFRESH_SCRAPE_BUDGET = getattr(settings, 'REFRESH_SCRAPE_BUDGET', 20)
+# Seconds before a source is refreshed again after a refresh attempt, doubling with each consecutive failure
+REFRESH_RETRY_DELAY = getattr(settings, 'REFRESH_RETRY_DELAY', 15 * 60)
+REFRESH_RETRY_MAX_DELAY = getattr(settings, 'REFRESH_RETRY_MAX_DELAY', 24 * 60 * 60)
+# User-submitted reviews live under this pseudo-marketplace and are never scraped
+SELF_MARKETPLACE = 'self'
+
+
+def get_ttl(marketplace):
+    return timedelta(seconds=SOURCE_TTLS.get(marketplace, DEFAULT_SOURCE_TTL))
+
+
+def get_retry_delay(failures):
+    return timedelta(seconds=min(REFRESH_RETRY_DELAY * 2 ** failures, REFRESH_RETRY_MAX_DELAY))
+
+
+def is_stale(source, now=None):
+    """
+    Whether a source's data is older than its marketplace's TTL and a refresh may be attempted.
+    A source whose last refresh attempt is recent, or failed, waits out its retry delay first.
+    """
+    if source.marketplace == SELF_MARKETPLACE:
+        return False
+    now = now or timezone.now()
+    if source.last_updated >= now - get_ttl(source.marketplace):
+        return False
+    attempted_at = source.last_refresh_attempt_at
+    return attempted_at is None or attempted_at < now - get_retry_delay(source.refresh_failures)
+
+
+def stale_sources_filter(now=None):
+    """
+    Return a Q matching ProductSource rows that `is_stale` considers stale.
+    Each marketplace becomes its own condition, so the (marketplace, last_updated) index is used,
+    and each failure count below the maximum retry delay gets its own retry cutoff.
+    """
+    now = now or timezone.now()
+    filters = Q()
+    for marketplace, ttl in SOURCE_TTLS.items():
+        filters |= Q(marketplace=marketplace, last_updated__lt=now - timedelta(seconds=ttl))
+    filters |= (
+        ~Q(marketplace__in=[*SOURCE_TTLS, SELF_MARKETPLACE])
+        & Q(last_updated__lt=now - timedelta(seconds=DEFAULT_SOURCE_TTL))
+    )
+
+    retry_filters = Q(last_refresh_attempt_at__isnull=True)
+    failures = 0
+    while REFRESH_RETRY_DELAY > 0 and get_retry_delay(failures).total_seconds() < REFRESH_RETRY_MAX_DELAY:
+        retry_filters |= Q(refresh_failures=failures, last_refresh_attempt_at__lt=now - get_retry_delay(failures))
+        failures += 1
+    retry_filters |= Q(refresh_failures__gte=failures, last_refresh_attempt_at__lt=now - get_retry_delay(failures))
+    return filters & retry_filters
+
+
+def refresh_budget_remaining(budget=REFRESH_SCRAPE_BUDGET):
+    """
+    Number of marketplace scrapes that may still be queued; the marketplaces of queued or running
+    refreshes count against the budget.
+    """
+    active_jobs = Job.objects.filter(kind='refresh_product', status__in=Job.ACTIVE_STATUSES)
+    return max(0, budget - sum(len(job.payload.get('marketplaces') or []) for job in active_jobs))
+
+
+def get_stale_marketplaces(product, now=None):
+    now = now or timezone.now()
+    return sorted({source.marketplace for source in product.sources.all() if is_stale(source, now)})
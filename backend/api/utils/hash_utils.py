@@ -0,0 +1,16 @@
+import hashlib
+import unicodedata
+
+
+def normalize_text(text):
+    """
+    Normalize Unicode form and whitespace so that trivially different copies of a text compare equal.
+    """
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def normalized_text_hash(text):
+    """
+    Return the sha256 hex digest of the normalized text.
+    """
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
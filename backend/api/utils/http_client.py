@@ -0,0 +1,81 @@
+import importlib.util
+import threading
+
+import httpx
+from bs4 import BeautifulSoup
+from django.conf import settings
+
+from backend.logger import logger
+
+# Per-marketplace scraping mode: 'http' fetches and parses pages directly and falls back to the browser,
+# 'browser' always drives Chrome
+SCRAPER_MODES = getattr(settings, 'SCRAPER_MODES', {})
+DEFAULT_SCRAPER_MODE = getattr(settings, 'DEFAULT_SCRAPER_MODE', 'http')
+HTTP_TIMEOUT = getattr(settings, 'HTTP_TIMEOUT', 10)
+HTTP_MAX_CONNECTIONS = getattr(settings, 'HTTP_MAX_CONNECTIONS', 20)
+HTTP_MAX_KEEPALIVE = getattr(settings, 'HTTP_MAX_KEEPALIVE', 10)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+                  'Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,application/json;q=0.8,*/*;q=0.7',
+    'Accept-Language': 'uk-UA,uk;q=0.9,ru;q=0.8,en;q=0.7',
+}
+
+# lxml is much faster than the pure-Python parser but is optional
+HTML_PARSER = 'lxml' if importlib.util.find_spec('lxml') else 'html.parser'
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_scrape_mode(marketplace):
+    return SCRAPER_MODES.get(marketplace, DEFAULT_SCRAPER_MODE)
+
+
+def get_client(marketplace):
+    """
+    Return the shared keep-alive HTTP client for a marketplace, creating it on first use.
+    """
+    client = _clients.get(marketplace)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(marketplace)
+            if client is None:
+                client = httpx.Client(
+                    headers=DEFAULT_HEADERS,
+                    timeout=HTTP_TIMEOUT,
+                    pool_limits=httpx.PoolLimits(max_keepalive=HTTP_MAX_KEEPALIVE, max_connections=HTTP_MAX_CONNECTIONS),
+                )
+                _clients[marketplace] = client
+    return client
+
+
+def fetch(marketplace, url, params=None):
+    response = get_client(marketplace).get(url, params=params)
+    response.raise_for_status()
+    return response
+
+
+def fetch_html(marketplace, url, params=None):
+    return fetch(marketplace, url, params).text
+
+
+def parse_html(html):
+    return BeautifulSoup(html, HTML_PARSER)
+
+
+def scrape_with_fallback(marketplace, http_scraper, browser_scraper, *args, **kwargs):
+    """
+    Run `http_scraper` when the marketplace is in 'http' mode and fall back to `browser_scraper`
+    if the HTTP path fails or finds nothing (e.g. the page is rendered client-side or blocked).
+    """
+    if get_scrape_mode(marketplace) == 'http':
+        try:
+            result = http_scraper(*args, **kwargs)
+            if result:
+                return result
+            logger.info(f"HTTP scrape of {marketplace} found nothing, falling back to the browser.")
+        except Exception as e:
+            logger.warning(f"HTTP scrape of {marketplace} failed, falling back to the browser: {e}")
+    return browser_scraper(*args, **kwargs)
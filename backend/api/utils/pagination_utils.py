@@ -0,0 +1,37 @@
+import base64
+import binascii
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(*values):
+    """
+    Encode the sort key of the last row of a page as an opaque cursor string.
+    """
+    return base64.urlsafe_b64encode(','.join(str(value) for value in values).encode()).decode()
+
+
+def decode_cursor(cursor, length):
+    """
+    Decode a cursor produced by `encode_cursor` back into `length` integers.
+    """
+    try:
+        values = [int(value) for value in base64.urlsafe_b64decode(cursor.encode()).decode().split(',')]
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(cursor)
+    if len(values) != length:
+        raise InvalidCursor(cursor)
+    return values
+
+
+def parse_page_size(value, default, maximum):
+    """
+    Parse a `page_size` query parameter, falling back to `default` and capping it at `maximum`.
+    """
+    try:
+        page_size = int(value) if value else default
+    except ValueError:
+        return default
+    return max(1, min(page_size, maximum))
@@ -0,0 +1,46 @@
+import re
+
+DEFAULT_CURRENCY = 'UAH'
+CURRENCY_SYMBOLS = {
+    '₴': 'UAH',
+    'грн': 'UAH',
+    'uah': 'UAH',
+    '$': 'USD',
+    'usd': 'USD',
+    '€': 'EUR',
+    'eur': 'EUR',
+}
+
+# An amount with space-separated thousands and an optional 1-2 digit fraction, e.g. "12 999" or "1 299,50"
+PRICE_PATTERN = re.compile(
+    r'(?P<whole>\d{1,3}(?:[ \u00a0\u202f]\d{3})+|\d+)(?:[.,](?P<fraction>\d{1,2}))?(?!\d)'
+)
+# A discount or other percentage shown next to the price, e.g. "-15%"
+PERCENT_PATTERN = re.compile(r'\d+(?:[.,]\d+)?\s*%')
+
+
+def parse_price(text):
+    """
+    Parse a scraped price like "12 999₴" or "1 299,50 грн" into (amount in minor units, ISO currency code).
+    When the text holds several amounts (e.g. an old and a discounted price) the last one is used;
+    percentages such as a "-15%" discount badge are not amounts.
+    Returns (None, None) if the text contains no price, e.g. "Price not available".
+    """
+    if not text:
+        return None, None
+
+    matches = list(PRICE_PATTERN.finditer(PERCENT_PATTERN.sub(' ', text)))
+    if not matches:
+        return None, None
+
+    match = matches[-1]
+    whole = int(re.sub(r'\D', '', match.group('whole')))
+    fraction = int((match.group('fraction') or '0').ljust(2, '0'))
+
+    lowered = text.lower()
+    currency = next(
+        (code for symbol, code in CURRENCY_SYMBOLS.items() if symbol in lowered),
+        DEFAULT_CURRENCY,
+    )
+    return whole * 100 + fraction, currency
+
@@ -0,0 +1,185 @@
+import re
+import threading
+import unicodedata
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, FloatField, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from rapidfuzz import fuzz
+
+from api.models import Product
+from backend.logger import logger
+
+SEARCH_TABLE = 'api_product_search'
+# Number of index hits scored per typo-tolerant lookup; substring matches are not capped
+SEARCH_MAX_CANDIDATES = getattr(settings, 'SEARCH_MAX_CANDIDATES', 500)
+# Minimum rapidfuzz partial_ratio for a typo-tolerant match to count as a hit
+SEARCH_MIN_SIMILARITY = getattr(settings, 'SEARCH_MIN_SIMILARITY', 75)
+# Words containing a digit, such as "s24" or "128gb", which name a model or variant
+MODEL_NUMBER = re.compile(r'\w*\d\w*')
+# The trigram tokenizer cannot match shorter strings
+MIN_TRIGRAM_QUERY_LENGTH = 3
+
+# Ukrainian national romanization, plus the Russian letters that show up in product names
+TRANSLITERATION = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'h', 'ґ': 'g', 'д': 'd', 'е': 'e', 'є': 'ie', 'ж': 'zh', 'з': 'z',
+    'и': 'y', 'і': 'i', 'ї': 'i', 'й': 'i', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p',
+    'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh',
+    'щ': 'shch', 'ь': '', 'ю': 'iu', 'я': 'ia', "'": '', 'ʼ': '', '’': '',
+    'ы': 'y', 'э': 'e', 'ё': 'e', 'ъ': '',
+}
+
+_index_available = None
+_index_lock = threading.Lock()
+
+
+def to_search_text(text):
+    """
+    Lowercase and transliterate text to Latin, so that "Самсунг" and "samsung" index the same way.
+    """
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    return ' '.join(''.join(TRANSLITERATION.get(char, char) for char in text).split())
+
+
+def fts_phrase(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def index_available():
+    """
+    Whether the FTS5 search table exists; it is only created on SQLite builds with the trigram tokenizer.
+    """
+    global _index_available
+    if _index_available is None:
+        with _index_lock:
+            if _index_available is None:
+                with connection.cursor() as cursor:
+                    _index_available = SEARCH_TABLE in connection.introspection.table_names(cursor)
+    return _index_available
+
+
+def index_product(product):
+    if not index_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, name, category) VALUES (%s, %s, %s)",
+            [product.id, to_search_text(product.name), product.category or ''],
+        )
+
+
+def unindex_product(product_id):
+    if not index_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [product_id])
+
+
+def rebuild_index(chunk_size=2000):
+    """
+    Re-create the index contents from the Product table. Returns the number of products indexed.
+    """
+    if not index_available():
+        return 0
+    count = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        rows = Product.objects.values_list('id', 'name', 'category').order_by('id')
+        batch = []
+        for product_id, name, category in rows.iterator(chunk_size=chunk_size):
+            batch.append((product_id, to_search_text(name), category or ''))
+            if len(batch) >= chunk_size:
+                cursor.executemany(f"INSERT INTO {SEARCH_TABLE} (rowid, name, category) VALUES (%s, %s, %s)", batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(f"INSERT INTO {SEARCH_TABLE} (rowid, name, category) VALUES (%s, %s, %s)", batch)
+            count += len(batch)
+    return count
+
+
+def model_numbers_match(search_text, name):
+    """
+    Whether every model number in the query starts a word of the name, so that "galaxy s24" does not
+    match "galaxy s23" however similar the rest of the name is. A prefix is enough for queries still being typed.
+    """
+    name_words = re.findall(r'\w+', name)
+    return all(
+        any(word.startswith(model_number) for word in name_words)
+        for model_number in MODEL_NUMBER.findall(search_text)
+    )
+
+
+def _match(expression, limit):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, name FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s ORDER BY rank LIMIT %s",
+            [expression, limit],
+        )
+        return cursor.fetchall()
+
+
+def search_product_ids(query, category_name=None, limit=SEARCH_MAX_CANDIDATES):
+    """
+    Return ids of products sharing enough trigrams with the query, most similar first. This typo-tolerant
+    lookup tolerates transliteration differences; only the best `limit` index hits by rank are scored,
+    and model numbers in the query must match.
+    """
+    search_text = to_search_text(query)
+    trigrams = {search_text[i:i + 3] for i in range(len(search_text) - 2)}
+    any_trigram = " OR ".join(fts_phrase(trigram) for trigram in sorted(trigrams))
+    rows = _match(f"name : ({any_trigram}){_category_filter(category_name)}", limit)
+
+    scored = []
+    for product_id, name in rows:
+        score = fuzz.partial_ratio(search_text, name)
+        if score >= SEARCH_MIN_SIMILARITY and model_numbers_match(search_text, name):
+            scored.append((score, product_id))
+    scored.sort(key=lambda item: -item[0])
+    return [product_id for _, product_id in scored]
+
+
+def _category_filter(category_name):
+    return f" AND category : {fts_phrase(category_name)}" if category_name else ""
+
+
+def _matching_products(expression):
+    """
+    Return all products matching an FTS expression, annotated with the match rank as `search_rank`.
+    The match stays in the database as subqueries, so the queryset can be counted and paginated in full.
+    """
+    product_table = connection.ops.quote_name(Product._meta.db_table)
+    return Product.objects.filter(
+        id__in=RawSQL(f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s", [expression])
+    ).annotate(search_rank=RawSQL(
+        f"SELECT rank FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s AND rowid = {product_table}.id",
+        [expression], output_field=FloatField(),
+    ))
+
+
+def search_products(query, category_name=None):
+    """
+    Return a queryset of products matching the query, annotated with `search_rank` (lower is better).
+    Products containing the query are all returned, ranked by the FTS5 trigram index; if there are none,
+    the typo-tolerant `search_product_ids` lookup is used. Without the index this falls back to `icontains` filtering.
+    """
+    if index_available() and len(to_search_text(query)) >= MIN_TRIGRAM_QUERY_LENGTH:
+        if not category_name or len(category_name) >= MIN_TRIGRAM_QUERY_LENGTH:
+            expression = f"name : {fts_phrase(to_search_text(query))}{_category_filter(category_name)}"
+            if _match(expression, 1):
+                return _matching_products(expression)
+
+            product_ids = search_product_ids(query, category_name)
+            if not product_ids:
+                return Product.objects.none()
+            return Product.objects.filter(id__in=product_ids).annotate(search_rank=Case(
+                *[When(id=product_id, then=Value(position)) for position, product_id in enumerate(product_ids)],
+                output_field=IntegerField(),
+            ))
+
+    logger.info("Product search index is not available for this query, falling back to a table scan.")
+    filters = Q(name__icontains=query)
+    if category_name:
+        filters &= Q(category__icontains=category_name)
+    return Product.objects.filter(filters).annotate(search_rank=Value(0, output_field=IntegerField()))
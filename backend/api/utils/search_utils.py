@@ -52,3 +52,19 @@ def find_best_match(suggestion_name, search_results):
 
     logger.info(f"Best match: {best_match}, Score: {best_score}")
     return best_match
+
+
+def find_best_match_across_queries(product_name, partial_names, search):
+    """
+    Run `search(query)` for each partial name and return the result that most closely matches the product name.
+    `search` returns a list of dicts with at least a "name" key.
+    """
+    best_match = None
+
+    for partial_name in partial_names:
+        logger.info(f"Searching with query: {partial_name}")
+        match = find_best_match(product_name, search(partial_name))
+        if match and (best_match is None or match["score"] > best_match["score"]):
+            best_match = match
+
+    return best_match
@@ -0,0 +1,92 @@
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from api.models import InflightOperation
+from api.utils.hash_utils import normalize_text, normalized_text_hash
+from backend.logger import logger
+
+SINGLEFLIGHT_LEASE = getattr(settings, 'SINGLEFLIGHT_LEASE', 300)
+# The leader extends its lease this often while the operation runs, so a slow operation keeps its lock
+SINGLEFLIGHT_RENEW_INTERVAL = getattr(settings, 'SINGLEFLIGHT_RENEW_INTERVAL', SINGLEFLIGHT_LEASE / 3)
+SINGLEFLIGHT_WAIT_TIMEOUT = getattr(settings, 'SINGLEFLIGHT_WAIT_TIMEOUT', 180)
+POLL_INTERVAL = 0.5
+
+
+def operation_key(operation, query, category=None):
+    return normalized_text_hash(f"{operation}\n{normalize_text(query).casefold()}\n{category or ''}")
+
+
+def _try_acquire(operation, key, token, lease):
+    now = timezone.now()
+    # Take over a lock whose holder died without releasing it
+    InflightOperation.objects.filter(key=key, expires_at__lt=now).delete()
+    try:
+        with transaction.atomic():
+            InflightOperation.objects.create(
+                key=key, operation=operation, token=token, expires_at=now + timedelta(seconds=lease)
+            )
+        return True
+    except IntegrityError:
+        return False
+
+
+def _renew_lease(key, token, lease, stop):
+    try:
+        while not stop.wait(SINGLEFLIGHT_RENEW_INTERVAL):
+            InflightOperation.objects.filter(key=key, token=token).update(
+                expires_at=timezone.now() + timedelta(seconds=lease)
+            )
+    except Exception as e:
+        logger.error(f"Renewing the singleflight lease {key} failed: {e}")
+    finally:
+        connection.close()
+
+
+@contextmanager
+def singleflight(operation, query, category=None, lease=SINGLEFLIGHT_LEASE, wait_timeout=SINGLEFLIGHT_WAIT_TIMEOUT):
+    """
+    Coalesce concurrent identical operations across threads and processes.
+    Yields True to exactly one caller (the leader), which should perform the operation, and yields False
+    to the others once the leader has finished or `wait_timeout` has passed; they should then read the
+    leader's result from the database. The leader's lease is renewed while it runs, and only the
+    leader that took the lock can release it:
+
+        with singleflight('scrape_suggestions', query, category) as leader:
+            if leader:
+                ...scrape and save...
+        ...read from the database...
+    """
+    key = operation_key(operation, query, category)
+    token = secrets.token_hex(16)
+    deadline = time.monotonic() + wait_timeout
+    waited = False
+
+    while not _try_acquire(operation, key, token, lease):
+        if not waited:
+            logger.info(f"Waiting for in-flight {operation} of '{query}'.")
+            waited = True
+        if time.monotonic() >= deadline:
+            logger.warning(f"Gave up waiting for in-flight {operation} of '{query}' after {wait_timeout}s.")
+            yield False
+            return
+        time.sleep(POLL_INTERVAL)
+        if not InflightOperation.objects.filter(key=key).exists():
+            # The leader finished; use its result instead of repeating the operation
+            yield False
+            return
+
+    stop_renewing = threading.Event()
+    threading.Thread(target=_renew_lease, args=(key, token, lease, stop_renewing), daemon=True).start()
+    try:
+        yield True
+    finally:
+        stop_renewing.set()
+        # If the lease ran out and another caller took over, the lock is theirs now and must be left alone
+        InflightOperation.objects.filter(key=key, token=token).delete()
@@ -0,0 +1,170 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.wait import WebDriverWait
+
+from backend.logger import logger
+
+# Total seconds a single marketplace scrape may take before it is aborted
+SCRAPE_TIME_BUDGET = getattr(settings, 'SCRAPE_TIME_BUDGET', 90)
+# Bounds for adaptive wait timeouts, in seconds; the floor matches the fixed wait used before adaptive timeouts
+WAIT_MIN_TIMEOUT = getattr(settings, 'WAIT_MIN_TIMEOUT', 3)
+WAIT_MAX_TIMEOUT = getattr(settings, 'WAIT_MAX_TIMEOUT', 10)
+POLL_FREQUENCY = 0.1
+
+
+class ScrapeBudgetExceeded(Exception):
+    pass
+
+
+class ScrapeTimer:
+    """
+    Tracks how long one scrape spends waiting on the browser versus doing its own work,
+    and enforces a total time budget for the scrape.
+    """
+
+    def __init__(self, name, budget=SCRAPE_TIME_BUDGET):
+        self.name = name
+        self.budget = budget
+        self.started_at = time.monotonic()
+        self.waiting = 0.0
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started_at
+
+    def remaining(self):
+        return self.budget - self.elapsed
+
+    def check(self):
+        if self.remaining() <= 0:
+            raise ScrapeBudgetExceeded(f"{self.name} scrape exceeded its {self.budget}s time budget.")
+
+    @contextmanager
+    def measure_wait(self):
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.waiting += time.monotonic() - started_at
+
+    def report(self):
+        elapsed = self.elapsed
+        logger.info(
+            f"{self.name} scrape took {elapsed:.1f}s: {self.waiting:.1f}s waiting, {elapsed - self.waiting:.1f}s working."
+        )
+
+
+class AdaptiveTimeouts:
+    """
+    Learns a timeout per wait key from how long that wait has taken before.
+    The timeout is a multiple of the moving average, bounded by WAIT_MIN_TIMEOUT and WAIT_MAX_TIMEOUT,
+    so fast pages stop paying for the slowest case and a timeout widens the next attempt.
+    """
+
+    def __init__(self, factor=3.0, smoothing=0.3):
+        self.factor = factor
+        self.smoothing = smoothing
+        self._averages = {}
+        self._lock = threading.Lock()
+
+    def timeout_for(self, key, max_timeout=WAIT_MAX_TIMEOUT):
+        average = self._averages.get(key)
+        if average is None:
+            return max_timeout
+        return min(max_timeout, max(WAIT_MIN_TIMEOUT, average * self.factor))
+
+    def observe(self, key, duration):
+        with self._lock:
+            average = self._averages.get(key)
+            self._averages[key] = duration if average is None else (
+                self.smoothing * duration + (1 - self.smoothing) * average
+            )
+
+    def record_timeout(self, key):
+        with self._lock:
+            # Forget the learned average so the next wait uses the full timeout
+            self._averages.pop(key, None)
+
+
+adaptive_timeouts = AdaptiveTimeouts()
+
+
+def wait_until(driver, condition, key, timer=None, max_timeout=WAIT_MAX_TIMEOUT):
+    """
+    Block until `condition(driver)` returns a truthy value and return that value.
+    `key` names the wait (e.g. 'rozetka.reviews') for adaptive timeouts. If a learned timeout
+    runs out, the wait is retried once with the full `max_timeout`.
+    Raises TimeoutException if the condition is not met in time and ScrapeBudgetExceeded
+    if the scrape's time budget runs out first.
+    """
+    timeout = adaptive_timeouts.timeout_for(key, max_timeout)
+    try:
+        return _wait(driver, condition, key, timer, timeout)
+    except TimeoutException:
+        if timeout >= max_timeout:
+            raise
+        logger.info(f"Wait '{key}' timed out after {timeout:.1f}s; retrying with {max_timeout}s.")
+        return _wait(driver, condition, key, timer, max_timeout)
+
+
+def _wait(driver, condition, key, timer, timeout):
+    budget_limited = False
+    if timer is not None:
+        timer.check()
+        if timer.remaining() < timeout:
+            timeout = timer.remaining()
+            budget_limited = True
+
+    started_at = time.monotonic()
+    try:
+        if timer is not None:
+            with timer.measure_wait():
+                result = WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(condition)
+        else:
+            result = WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(condition)
+    except TimeoutException:
+        adaptive_timeouts.record_timeout(key)
+        if budget_limited:
+            timer.check()
+        raise
+
+    adaptive_timeouts.observe(key, time.monotonic() - started_at)
+    return result
+
+
+def page_is_ready(driver):
+    return driver.execute_script("return document.readyState") == "complete"
+
+
+def wait_for_page_ready(driver, key, timer=None):
+    return wait_until(driver, page_is_ready, key, timer)
+
+
+def wait_for_element(driver, locator, key, timer=None, max_timeout=WAIT_MAX_TIMEOUT):
+    return wait_until(driver, EC.presence_of_element_located(locator), key, timer, max_timeout)
+
+
+def wait_for_elements(driver, locator, key, timer=None, max_timeout=WAIT_MAX_TIMEOUT):
+    return wait_until(driver, EC.presence_of_all_elements_located(locator), key, timer, max_timeout)
+
+
+def wait_for_any(driver, locators, key, timer=None, max_timeout=WAIT_MAX_TIMEOUT):
+    """
+    Wait until any of the given locators matches and return the index of the first one found.
+    """
+    def condition(d):
+        for index, locator in enumerate(locators):
+            if d.find_elements(*locator):
+                return index + 1  # Offset by one so that index 0 is truthy
+        return False
+
+    return wait_until(driver, condition, key, timer, max_timeout) - 1
+
+
+def wait_for_url_change(driver, previous_url, key, timer=None):
+    return wait_until(driver, lambda d: d.current_url != previous_url, key, timer)
@@ -1,32 +1,146 @@
-import undetected_chromedriver as uc
+import atexit
+import os
+import queue
 import threading
+from contextlib import contextmanager
+
+import undetected_chromedriver as uc
+from django.conf import settings
+
+from backend.logger import logger
+
+# Rough resident memory of one Chrome session, used to cap the pool on small machines
+BROWSER_MEMORY_MB = 500
+
+
+def default_pool_size():
+    """
+    Size the pool by CPU count, capped by how many Chrome sessions fit in available memory.
+    """
+    size = os.cpu_count() or 1
+    try:
+        available_mb = os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE') // (1024 * 1024)
+        size = min(size, available_mb // BROWSER_MEMORY_MB)
+    except (ValueError, OSError, AttributeError):
+        pass  # sysconf is not available on every platform
+    return max(1, size)
 
-# Thread-local storage for WebDriver instances
-_thread_local = threading.local()
 
+BROWSER_POOL_SIZE = getattr(settings, 'BROWSER_POOL_SIZE', None) or default_pool_size()
+# Sessions are quit and replaced after this many checkouts to cap memory growth in long-lived browsers
+BROWSER_MAX_USES = getattr(settings, 'BROWSER_MAX_USES', 20)
+BROWSER_CHECKOUT_TIMEOUT = getattr(settings, 'BROWSER_CHECKOUT_TIMEOUT', 120)
+BROWSER_HEADLESS = getattr(settings, 'BROWSER_HEADLESS', True)
 
-def get_driver():
+
+def create_driver():
     """
-    Set up and return a thread-local instance of the Selenium WebDriver (Chrome).
+    Set up and return a new instance of the Selenium WebDriver (Chrome).
     """
-    if not hasattr(_thread_local, "driver"):
-        options = uc.ChromeOptions()
-        # options.add_argument("--headless=new")  # Uncomment for headless mode
-        options.add_argument("--disable-extensions")
-        options.add_argument("--disable-application-cache")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-setuid-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        # options.add_argument('--disable-blink-features=AutomationControlled')
-        _thread_local.driver = uc.Chrome(options=options, headless=False, use_subprocess=False, user_multi_procs=True)
-    return _thread_local.driver
+    options = uc.ChromeOptions()
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-application-cache")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-setuid-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    # options.add_argument('--disable-blink-features=AutomationControlled')
+    return uc.Chrome(options=options, headless=BROWSER_HEADLESS, use_subprocess=False, user_multi_procs=True)
+
+
+class BrowserSession:
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+
+    def is_healthy(self):
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.warning(f"Error while quitting browser session: {e}")
+
+
+class BrowserPool:
+    """
+    A bounded pool of warm Chrome sessions shared by all scrapers.
+    At most `max_size` sessions exist at once; callers block in `checkout` until one is free.
+    Sessions are health-checked on checkout and recycled after `max_uses` checkouts or after a crash.
+    """
+
+    def __init__(self, max_size=BROWSER_POOL_SIZE, max_uses=BROWSER_MAX_USES):
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self._idle = queue.LifoQueue()  # Most recently used first, so warm sessions are reused
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def checkout(self, timeout=BROWSER_CHECKOUT_TIMEOUT):
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No browser session became available within {timeout} seconds.")
+
+        try:
+            while True:
+                try:
+                    session = self._idle.get_nowait()
+                except queue.Empty:
+                    session = BrowserSession(create_driver())
+                    logger.info("Started a new browser session.")
+                    break
+                if session.is_healthy():
+                    break
+                logger.info("Discarding unhealthy browser session.")
+                session.quit()
+        except Exception:
+            self._slots.release()
+            raise
+
+        session.uses += 1
+        return session
+
+    def checkin(self, session, discard=False):
+        try:
+            if discard or session.uses >= self.max_uses or not session.is_healthy():
+                session.quit()
+            else:
+                self._idle.put(session)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def borrow(self):
+        """
+        Check out a driver for the duration of a `with` block and return it to the pool afterwards.
+        """
+        session = self.checkout()
+        try:
+            yield session.driver
+        finally:
+            # checkin health-checks the session, so a crashed browser is replaced rather than reused
+            self.checkin(session)
+
+    def close(self):
+        """
+        Quit all idle sessions.
+        """
+        while True:
+            try:
+                self._idle.get_nowait().quit()
+            except queue.Empty:
+                return
+
+
+browser_pool = BrowserPool()
+atexit.register(browser_pool.close)
 
 
-def quit_driver():
+def borrow_driver():
     """
-    Quit and clean up the thread-local instance of the WebDriver.
+    Borrow a WebDriver from the shared browser pool: `with borrow_driver() as driver: ...`
     """
-    if hasattr(_thread_local, "driver"):
-        _thread_local.driver.quit()
-        del _thread_local.driver
+    return browser_pool.borrow()
@@ -1,18 +1,36 @@
-from django.db.models import Avg, Count, Q
+import json
+from datetime import timedelta
+from itertools import groupby
+
+from django.db import IntegrityError, transaction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, F, Prefetch, Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 from api.auth.permissions import IsAdmin
+from api.jobs.queue import enqueue, get_active_job
+from api.jobs.tasks import TRAIN_MODEL_JOB_KEY
 from api.scrapers import scraper_manager
-from api.models import Product, Review, ProductSource, MLModel
-from api.sentiment.active_ml import train_new_model
+from api.models import Product, Review, ProductSource, MLModel, Job, PriceObservation
 from api.serializers import ProductSerializer, DetailedProductSerializer, ReviewSerializer, MLModelSerializer, \
-    UserSerializer
+    UserSerializer, JobSerializer, REVIEW_FIELDS
 from api.utils.category_utils import ROZETKA_CATEGORIES
-from api.sentiment.sentiment_model import predict_sentiment
+from api.sentiment.model_registry import registry
+from api.sentiment.sentiment_model import predict_sentiment_batch
+from api.utils.aggregate_utils import refresh_product_aggregates
+from api.utils.async_utils import iterate_blocking, run_blocking
+from api.utils.freshness import STALE_WHILE_REVALIDATE, is_stale, refresh_budget_remaining
+from api.utils.pagination_utils import InvalidCursor, decode_cursor, encode_cursor, parse_page_size
+from api.utils.product_search import search_products
+from backend.logger import logger
 
 
 @api_view(['GET'])
@@ -23,118 +41,317 @@ def get_user(request):
     return Response(serializer.data)
 
 
-@api_view(['GET'])
-def get_product_suggestions(request):
+SUGGESTIONS_PAGE_SIZE = 21
+
+
+def order_suggestions(suggestions, sort_by=''):
+    """
+    Order product suggestions in the database: best search matches first, optionally grouped by `is_detailed`.
+    `id` breaks ties to keep page boundaries stable.
+    """
+    if sort_by in ['is_detailed', '-is_detailed']:
+        suggestions = suggestions.order_by(sort_by, 'search_rank', 'id')
+    else:
+        suggestions = suggestions.order_by('search_rank', 'id')
+    return suggestions.only(
+        'id', 'name', 'image_url', 'is_detailed',
+        'review_count', 'rating_sum', 'positive_count', 'neutral_count', 'negative_count',
+    )
+
+
+def suggestion_data(suggestion):
+    """
+    Serialize a suggested product with its precomputed rating and sentiment aggregates.
+    """
+    if suggestion.is_detailed:
+        return {
+            "id": suggestion.id,
+            "name": suggestion.name,
+            "image_url": suggestion.image_url,
+            "is_detailed": suggestion.is_detailed,
+            "average_rating": suggestion.average_rating,
+            "sentiments": {
+                "positive": suggestion.positive_count,
+                "neutral": suggestion.neutral_count,
+                "negative": suggestion.negative_count
+            }
+        }
+
+    # For non-detailed products
+    return {
+        "id": suggestion.id,
+        "name": suggestion.name,
+        "image_url": suggestion.image_url,
+        "is_detailed": suggestion.is_detailed,
+        "average_rating": None,
+        "sentiments": {
+            "positive": 0,
+            "neutral": 0,
+            "negative": 0
+        }
+    }
+
+
+@require_GET
+async def get_product_suggestions(request):
     """
     Retrieve product suggestions based on a search query and allow sorting by `is_detailed`.
+    Responds with the same paginated shape as DRF's PageNumberPagination.
     """
     query = request.GET.get('query', '')
     category_id = request.GET.get('category_id', None)
     sort_by = request.GET.get('sort_by', '')  # New parameter for sorting
 
     if not query:
-        return Response({"error": "Query parameter is required."}, status=400)
+        return JsonResponse({"error": "Query parameter is required."}, status=400)
 
-    # Get product suggestions from scraper_manager
-    suggestions = scraper_manager.get_product_suggestions(query, category_id)
+    try:
+        page_number = int(request.GET.get('page', 1))
+        if page_number < 1:
+            raise ValueError
+    except ValueError:
+        return JsonResponse({"detail": "Invalid page."}, status=404)
+
+    # Get product suggestions from scraper_manager; this may scrape, so it runs off the event loop
+    suggestions = await run_blocking(scraper_manager.get_product_suggestions, query, category_id)
+
+    # Sort and paginate in the database so only the requested page is loaded and enriched
+    suggestions = order_suggestions(suggestions, sort_by)
+    count = await suggestions.acount()
+    if page_number > 1 and (page_number - 1) * SUGGESTIONS_PAGE_SIZE >= count:
+        return JsonResponse({"detail": "Invalid page."}, status=404)
+
+    offset = (page_number - 1) * SUGGESTIONS_PAGE_SIZE
+    page = [suggestion async for suggestion in suggestions[offset:offset + SUGGESTIONS_PAGE_SIZE]]
+
+    url = request.build_absolute_uri()
+    if offset + SUGGESTIONS_PAGE_SIZE < count:
+        next_link = replace_query_param(url, 'page', page_number + 1)
+    else:
+        next_link = None
+    if page_number == 1:
+        previous_link = None
+    elif page_number == 2:
+        previous_link = remove_query_param(url, 'page')
+    else:
+        previous_link = replace_query_param(url, 'page', page_number - 1)
 
-    # Sort suggestions by `is_detailed` if specified
-    if sort_by in ['is_detailed', '-is_detailed']:
-        suggestions = sorted(suggestions, key=lambda x: getattr(x, 'is_detailed'), reverse=sort_by.startswith('-'))
-
-    # Enrich suggestions with average rating and sentiments
-    enriched_suggestions = []
-    for suggestion in suggestions:
-        if suggestion.is_detailed:
-            # Aggregate reviews data for detailed products
-            reviews = Review.objects.filter(product_source__product=suggestion)
-            avg_rating = reviews.aggregate(Avg('rating'))['rating__avg'] or 0
-            sentiments = reviews.aggregate(
-                positive=Count('model_sentiment', filter=Q(model_sentiment="Positive")),
-                neutral=Count('model_sentiment', filter=Q(model_sentiment="Neutral")),
-                negative=Count('model_sentiment', filter=Q(model_sentiment="Negative")),
-            )
-            enriched_suggestions.append({
-                "id": suggestion.id,
-                "name": suggestion.name,
-                "image_url": suggestion.image_url,
-                "is_detailed": suggestion.is_detailed,
-                "average_rating": avg_rating,
-                "sentiments": {
-                    "positive": sentiments['positive'],
-                    "neutral": sentiments['neutral'],
-                    "negative": sentiments['negative']
-                }
-            })
+    return JsonResponse({
+        "count": count,
+        "next": next_link,
+        "previous": previous_link,
+        "results": [suggestion_data(suggestion) for suggestion in page],
+    })
+
+
+def suggestion_events(query, category_id, sort_by=''):
+    """
+    Yield (event, data) pairs for the streaming suggestions endpoint: the first page of database matches
+    as soon as they are found, or each scraped category as it finishes, then a final 'done' with the total count.
+    Scraped categories arrive in completion order, so after scraping 'done' also carries the ordered
+    first page ("results"), the same as page 1 of the paginated endpoint, to replace what was streamed.
+    """
+    scraped = False
+    for category_name, products in scraper_manager.iter_product_suggestions(query, category_id):
+        if category_name is None:
+            products = order_suggestions(products, sort_by)
+            yield 'results', {
+                "source": "database",
+                "results": [suggestion_data(product) for product in products[:SUGGESTIONS_PAGE_SIZE]],
+            }
         else:
-            # For non-detailed products
-            enriched_suggestions.append({
-                "id": suggestion.id,
-                "name": suggestion.name,
-                "image_url": suggestion.image_url,
-                "is_detailed": suggestion.is_detailed,
-                "average_rating": None,
-                "sentiments": {
-                    "positive": 0,
-                    "neutral": 0,
-                    "negative": 0
-                }
-            })
-
-    # Pagination
-    paginator = PageNumberPagination()
-    paginator.page_size = 21
-    paginated_suggestions = paginator.paginate_queryset(enriched_suggestions, request)
-
-    return paginator.get_paginated_response(paginated_suggestions)
+            scraped = True
+            yield 'results', {
+                "source": "rozetka",
+                "category": category_name,
+                "results": [suggestion_data(product) for product in products],
+            }
+
+    suggestions = search_products(query, scraper_manager.get_category_name(category_id))
+    done = {"count": suggestions.count(), "page_size": SUGGESTIONS_PAGE_SIZE}
+    if scraped:
+        first_page = order_suggestions(suggestions, sort_by)[:SUGGESTIONS_PAGE_SIZE]
+        done["results"] = [suggestion_data(product) for product in first_page]
+    yield 'done', done
+
+
+@require_GET
+async def stream_product_suggestions(request):
+    """
+    Stream product suggestions as server-sent events, so results show up before scraping has finished.
+    Emits `results` events ({"source", "category", "results"}) followed by one `done` event ({"count", "page_size"},
+    plus the ordered first page as "results" if suggestions were scraped).
+    Further pages are served by the regular suggestions endpoint.
+    """
+    query = request.GET.get('query', '')
+    category_id = request.GET.get('category_id', None)
+    sort_by = request.GET.get('sort_by', '')
 
+    if not query:
+        return JsonResponse({"error": "Query parameter is required."}, status=400)
 
-@api_view(['GET'])
-def get_product_details(request):
+    async def events():
+        try:
+            async for event, data in iterate_blocking(suggestion_events, query, category_id, sort_by):
+                yield f"event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Stop nginx from buffering the stream
+    return response
+
+
+@require_GET
+async def get_product_details(request):
     """
-    Retrieve detailed information and reviews for a specific product by name.
+    Retrieve detailed information and reviews for a specific product.
+    If the product has not been scraped yet, a scrape job is queued and 202 is returned with its id;
+    poll `jobs/<job_id>/` and request the product again once the job is done.
     """
     product_id = request.GET.get('productId', '')
     if not product_id:
-        return Response({"error": "productId parameter is required."}, status=400)
+        return JsonResponse({"error": "productId parameter is required."}, status=400)
 
-    # Get or scrape detailed product information
-    product_db = Product.objects.get(id=product_id)
-    if not product_db:
-        return Response({"error": "Product not found."}, status=404)
-    product = scraper_manager.scrape_and_save_product(product_db.name)
+    try:
+        product = await Product.objects.aget(id=product_id)
+    except Product.DoesNotExist:
+        return JsonResponse({"error": "Product not found."}, status=404)
 
-    if not product:
-        return Response({"error": "Product not found."}, status=404)
+    await Product.objects.filter(id=product.id).aupdate(view_count=F('view_count') + 1)
+
+    if not product.is_detailed:
+        # Scraping takes up to minutes, so it runs on a job worker instead of blocking this request
+        job, _ = await run_blocking(enqueue, 'scrape_product', product.id, {'product_id': product.id})
+        return JsonResponse(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    if STALE_WHILE_REVALIDATE:
+        # Serve the stored data right away and refresh outdated prices in the background
+        stale_marketplaces = sorted({
+            source.marketplace async for source in product.sources.all() if is_stale(source)
+        })
+        if stale_marketplaces:
+            await run_blocking(queue_stale_refresh, product, stale_marketplaces)
 
     # Serialize detailed product
-    serialized_product = DetailedProductSerializer(product)
-    return Response(serialized_product.data)
+    serialized_product = await run_blocking(lambda: DetailedProductSerializer(product).data)
+    return JsonResponse(serialized_product)
+
+
+def queue_stale_refresh(product, marketplaces):
+    """
+    Queue a background refresh of a product's stale marketplaces, as many as the refresh scrape budget
+    shared with refresh_stale_sources allows. Returns the job, or None if nothing was queued.
+    """
+    if get_active_job('refresh_product', product.id):
+        return None
+    marketplaces = marketplaces[:refresh_budget_remaining()]
+    if not marketplaces:
+        logger.info(f"Refresh scrape budget is used up; not refreshing '{product.name}'.")
+        return None
+    job, _ = enqueue('refresh_product', product.id, {'product_id': product.id, 'marketplaces': marketplaces})
+    return job
 
 
 @api_view(['GET'])
-def get_reviews_for_product(request, product_id):
+def get_job_status(request, job_id):
     """
-    Retrieve all reviews for a product, grouped by its sources, with sentiment analysis.
+    Return the status and, once finished, the result or error of a background job.
     """
     try:
-        product = Product.objects.get(id=product_id)
-        sources = product.sources.all()
+        job = Job.objects.get(id=job_id)
+    except Job.DoesNotExist:
+        return Response({"error": "Job not found."}, status=404)
+
+    return Response(JobSerializer(job).data)
+
+
+REVIEWS_PAGE_SIZE = 100
+REVIEWS_MAX_PAGE_SIZE = 500
+
+
+@require_GET
+async def get_reviews_for_product(request, product_id):
+    """
+    Retrieve the reviews of a product, grouped by its sources, with sentiment analysis.
+    Reviews are cursor-paginated in (source, id) order: follow `next` until it is null.
+    A source whose reviews span two pages appears in both. `page_size` defaults to 100, at most 500.
+    """
+    page_size = parse_page_size(request.GET.get('page_size'), REVIEWS_PAGE_SIZE, REVIEWS_MAX_PAGE_SIZE)
+
+    if not await Product.objects.filter(id=product_id).aexists():
+        return JsonResponse({"error": "Product not found."}, status=404)
+
+    reviews = Review.objects.filter(product_source__product_id=product_id).select_related('product_source').only(
+        *REVIEW_FIELDS, 'product_source__marketplace',
+    ).order_by('product_source_id', 'id')
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            source_id, review_id = decode_cursor(cursor, 2)
+        except InvalidCursor:
+            return JsonResponse({"error": "Invalid cursor."}, status=400)
+        reviews = reviews.filter(Q(product_source_id__gt=source_id) | Q(product_source_id=source_id, id__gt=review_id))
+
+    # One extra row tells whether there is a next page
+    page = [review async for review in reviews[:page_size + 1]]
+    has_next = len(page) > page_size
+    page = page[:page_size]
+
+    reviews_data = []
+    for source_id, source_reviews in groupby(page, key=lambda review: review.product_source_id):
+        source_reviews = list(source_reviews)
+        reviews_data.append({
+            "marketplace": source_reviews[0].product_source.marketplace,
+            "reviews": ReviewSerializer(source_reviews, many=True).data,
+        })
+
+    next_link = None
+    if has_next:
+        last = page[-1]
+        next_link = replace_query_param(
+            request.build_absolute_uri(), 'cursor', encode_cursor(last.product_source_id, last.id)
+        )
 
-        reviews_data = []
-        for source in sources:
-            reviews = source.reviews.all()
-            serialized_reviews = ReviewSerializer(reviews, many=True).data
+    return JsonResponse({"next": next_link, "results": reviews_data})
 
-            reviews_data.append({
-                "marketplace": source.marketplace,
-                "reviews": serialized_reviews
-            })
 
-        return Response(reviews_data)
+@api_view(['GET'])
+def get_price_history(request, product_id):
+    """
+    Return the price history of a product per marketplace over the last `days` days (default 90).
+    Prices are integers in minor units; observations older than the raw retention period are daily.
+    """
+    try:
+        days = int(request.GET.get('days', 90))
+    except ValueError:
+        return Response({"error": "days must be an integer."}, status=400)
+
+    try:
+        product = Product.objects.get(id=product_id)
     except Product.DoesNotExist:
         return Response({"error": "Product not found."}, status=404)
 
+    sources = {source.id: source for source in product.sources.all()}
+    observations = PriceObservation.objects.filter(
+        source_id__in=sources,
+        observed_at__gte=timezone.now() - timedelta(days=days),
+    ).order_by('source_id', 'observed_at').values_list('source_id', 'observed_at', 'price_minor', 'currency')
+
+    series = {}
+    for source_id, observed_at, price_minor, currency in observations:
+        if source_id not in series:
+            series[source_id] = {
+                "marketplace": sources[source_id].marketplace,
+                "currency": currency,
+                "points": [],
+            }
+        series[source_id]["points"].append({"observed_at": observed_at, "price_minor": price_minor})
+
+    return Response(list(series.values()))
+
 
 @api_view(['GET'])
 def get_rozetka_categories(request):
@@ -187,6 +404,7 @@ def update_review_sentiment(request, review_id):
         review.human_sentiment = new_sentiment
         review.needs_review = False
         review.save()
+        refresh_product_aggregates([review.product_source.product_id])
 
         return Response({"message": "Review sentiment updated successfully."})
     except Review.DoesNotExist:
@@ -214,7 +432,7 @@ def add_user_review(request, product_id):
         )
 
         # Add the user review
-        sentiment, confidence = predict_sentiment(data.get('text'))
+        [(sentiment, confidence)] = predict_sentiment_batch([data.get('text')])
         Review.objects.create(
             product_source=source,
             text=data.get('text'),
@@ -222,11 +440,14 @@ def add_user_review(request, product_id):
             model_sentiment=sentiment,
             confidence=confidence
         )
+        refresh_product_aggregates([product.id])
 
         return Response({"message": "Review added successfully!"}, status=status.HTTP_201_CREATED)
 
     except Product.DoesNotExist:
         return Response({"error": "Product not found."}, status=status.HTTP_404_NOT_FOUND)
+    except IntegrityError:
+        return Response({"error": "This review has already been added."}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -253,6 +474,12 @@ def list_reviews_needing_review(request):
     else:
         return Response({"error": "Invalid mode provided. Use 'marked' or 'low_confidence'."}, status=400)
 
+    # Load the product of every row in the same query, and only the columns the response uses
+    reviews = reviews.select_related('product_source__product').only(
+        'id', 'text', 'rating', 'model_sentiment', 'confidence',
+        'product_source__product__id', 'product_source__product__name',
+    ).order_by('id')
+
     paginator = ReviewPagination()
     result_page = paginator.paginate_queryset(reviews, request)
     return paginator.get_paginated_response([
@@ -278,28 +505,26 @@ def list_ml_models(request):
     """
     List all ML models with their metrics, status, and statistics.
     """
-    models = MLModel.objects.all().order_by('-created_at')
-    serialized_data = []
-
-    # Fetch all reviews
-    all_reviews = Review.objects.all()
-    unassociated_reviews_count = all_reviews.filter(
-        human_sentiment__isnull=False  # Reviewed by admin
-    ).exclude(
-        models__isnull=False  # Not associated with any MLModel
-    ).count()
+    # Both totals in one query; distinct because the join to models repeats reviews used by several models
+    labelled_reviews = Review.objects.filter(human_sentiment__isnull=False).aggregate(
+        total=Count('id', distinct=True),
+        unassociated=Count('id', distinct=True, filter=Q(models__isnull=True)),  # Not associated with any MLModel
+    )
+    unassociated_reviews_count = labelled_reviews['unassociated']
+
+    models = MLModel.objects.annotate(
+        associated_reviews_count=Count('reviews', distinct=True),
+        associated_labelled_count=Count('reviews', distinct=True, filter=Q(reviews__human_sentiment__isnull=False)),
+    ).prefetch_related(
+        Prefetch('reviews', queryset=Review.objects.only('id'))
+    ).order_by('-created_at')
 
+    serialized_data = []
     for model in models:
-        # Count new reviews available for this model
-        associated_reviews_count = model.reviews.count()
-        new_reviews_count = all_reviews.filter(
-            human_sentiment__isnull=False  # Reviewed by admin
-        ).exclude(models=model).count()
-
-        # Add statistics to the serialized data
+        # Add statistics to the serialized data; new reviews are labelled reviews this model was not trained on
         serialized_model = MLModelSerializer(model).data
-        serialized_model['associated_reviews_count'] = associated_reviews_count
-        serialized_model['new_reviews_count'] = new_reviews_count
+        serialized_model['associated_reviews_count'] = model.associated_reviews_count
+        serialized_model['new_reviews_count'] = labelled_reviews['total'] - model.associated_labelled_count
 
         serialized_data.append(serialized_model)
 
@@ -316,13 +541,17 @@ def activate_ml_model(request, model_id):
     Activate the specified ML model and deactivate others.
     """
     try:
-        # Deactivate all models
-        MLModel.objects.update(is_active=False)
+        with transaction.atomic():
+            # Deactivate all models
+            MLModel.objects.update(is_active=False)
 
-        # Activate the specified model
-        model = MLModel.objects.get(id=model_id)
-        model.is_active = True
-        model.save()
+            # Activate the specified model
+            model = MLModel.objects.get(id=model_id)
+            model.is_active = True
+            model.save()
+
+        # Swap this process to the new model right away; other workers pick it up on their next check
+        registry.invalidate()
 
         return Response({"message": f"Model '{model.file_name}' has been activated."}, status=status.HTTP_200_OK)
     except MLModel.DoesNotExist:
@@ -333,23 +562,59 @@ def activate_ml_model(request, model_id):
 @permission_classes([IsAdmin])
 def train_model(request):
     """
-    Train a new sentiment analysis model using selected reviews.
+    Queue training of a new sentiment analysis model on the labelled reviews.
+    Training runs on a job worker; poll `models/train/status/` for its progress. Only one training
+    runs at a time, so a request made while one is queued or running returns that job.
+    An optional `mode` of 'full' or 'finetune' overrides the automatic choice between them.
     """
-    try:
-        # Filter reviews with human_sentiment
-        reviews = Review.objects.filter(human_sentiment__isnull=False)
+    mode = request.data.get('mode') or None
+    if mode not in (None, MLModel.TRAINING_MODE_FULL, MLModel.TRAINING_MODE_FINETUNE):
+        return Response({"error": "Mode must be 'full' or 'finetune'."}, status=status.HTTP_400_BAD_REQUEST)
 
-        if not reviews.exists():
-            return Response({"error": "No reviews available for training."}, status=status.HTTP_400_BAD_REQUEST)
+    if not Review.objects.filter(human_sentiment__isnull=False).exists():
+        return Response({"error": "No reviews available for training."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Train the new model and associate reviews
-        ml_model = train_new_model(reviews)
+    job, created = enqueue('train_model', TRAIN_MODEL_JOB_KEY, {'mode': mode})
+    return Response({
+        "message": "Model training queued." if created else "Model training is already in progress.",
+        "data": JobSerializer(job).data,
+    }, status=status.HTTP_202_ACCEPTED)
 
-        serialized_ml_model = MLModelSerializer(ml_model)
 
-        return Response({
-            "message": "Model training completed successfully.",
-            "data": serialized_ml_model.data
-        }, status=status.HTTP_201_CREATED)
-    except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def train_model_status(request):
+    """
+    Return the current training job, or the most recent one if none is active.
+    """
+    job = Job.objects.filter(kind='train_model').order_by('-created_at').first()
+    if job is None:
+        return Response({"data": None})
+    return Response({"data": JobSerializer(job).data})
+
+
+@api_view(['POST'])
+@permission_classes([IsAdmin])
+def cancel_train_model(request, job_id):
+    """
+    Cancel a training job. A queued job is dropped right away; a running one stops after its current epoch.
+    """
+    try:
+        job = Job.objects.get(id=job_id, kind='train_model')
+    except Job.DoesNotExist:
+        return Response({"error": "Training job not found."}, status=status.HTTP_404_NOT_FOUND)
+
+    # The conditional update keeps a worker from claiming the job at the same moment
+    dropped = Job.objects.filter(id=job.id, status=Job.STATUS_QUEUED).update(
+        status=Job.STATUS_FAILED,
+        error="Training was cancelled.",
+        cancel_requested=True,
+        finished_at=timezone.now(),
+    )
+    if not dropped:
+        if job.status not in Job.ACTIVE_STATUSES:
+            return Response({"error": "Training job has already finished."}, status=status.HTTP_400_BAD_REQUEST)
+        Job.objects.filter(id=job.id).update(cancel_requested=True)
+
+    job.refresh_from_db()
+    return Response({"message": "Model training cancelled.", "data": JobSerializer(job).data})
@@ -96,6 +96,8 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'backend.wsgi.application'
+# Served with `uvicorn backend.asgi:application`; the async views and the suggestions stream need it
+ASGI_APPLICATION = 'backend.asgi.application'
 
 
 # Database
@@ -153,3 +155,104 @@ STATICFILES_DIRS = [
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Sentiment analysis
+
+# Maximum number of reviews passed to the LSTM model in a single forward pass
+SENTIMENT_BATCH_SIZE = 256
+# Lists of at least this many reviews are preprocessed across a pool of worker processes, one per CPU;
+# starting the pool costs about a second, which only pays off for whole training corpora
+PREPROCESS_PARALLEL_THRESHOLD = 200000
+
+# Seconds between checks of which MLModel is active; activating a model takes effect within this window
+ACTIVE_MODEL_CHECK_INTERVAL = 5
+
+# Training fine-tunes the active model instead of training from scratch when at most this many labelled
+# reviews are new to it
+FINETUNE_MAX_NEW_LABELS = 500
+# Epochs of a fine-tuning run
+FINETUNE_EPOCHS = 3
+# Base corpus rows replayed per new label during fine-tuning, so the model does not forget the corpus
+FINETUNE_REPLAY_RATIO = 4
+# Minimum number of replayed base corpus rows
+FINETUNE_MIN_REPLAY = 1000
+
+# Translator used before sentiment prediction: 'google' (googletrans) or 'stub' (offline, returns text unchanged)
+TRANSLATION_BACKEND = os.environ.get('TRANSLATION_BACKEND', 'google')
+# Number of translations kept in memory in front of the TranslationCache table
+TRANSLATION_CACHE_SIZE = 10000
+
+# Background jobs
+
+# 'thread' runs queued jobs on a thread pool inside the web process;
+# 'external' leaves them to `python manage.py run_job_worker` processes
+JOB_WORKER_MODE = os.environ.get('JOB_WORKER_MODE', 'thread')
+# Number of jobs the in-process pool runs concurrently
+JOB_WORKER_THREADS = 2
+# Seconds between heartbeats of a running job
+JOB_HEARTBEAT_INTERVAL = 30
+# A running job without a heartbeat for this many seconds is considered dead (its process crashed or restarted)
+JOB_STALE_AFTER = 180
+
+# Scraping
+
+# Maximum number of concurrent Chrome sessions; None sizes the pool from CPU count and free memory
+BROWSER_POOL_SIZE = None
+# A browser session is restarted after this many scrapes
+BROWSER_MAX_USES = 20
+# Seconds a scraper waits for a free browser session before giving up
+BROWSER_CHECKOUT_TIMEOUT = 120
+BROWSER_HEADLESS = True
+# Seconds a single marketplace scrape may run before it is aborted
+SCRAPE_TIME_BUDGET = 90
+# Bounds in seconds for the adaptive timeouts used when waiting on page elements
+WAIT_MIN_TIMEOUT = 3
+WAIT_MAX_TIMEOUT = 10
+
+# Scraping mode per marketplace: 'http' parses pages fetched over HTTP and falls back to the browser,
+# 'browser' always uses Chrome. Marketplaces not listed use DEFAULT_SCRAPER_MODE.
+DEFAULT_SCRAPER_MODE = 'http'
+SCRAPER_MODES = {
+    'rozetka': 'http',
+    'citrus': 'http',
+    'comfy': 'http',
+    'allo': 'http',
+    'foxtrot': 'http',
+}
+HTTP_TIMEOUT = 10
+# Connection pool limits of the shared keep-alive client of each marketplace
+HTTP_MAX_CONNECTIONS = 20
+HTTP_MAX_KEEPALIVE = 10
+# Maximum number of Rozetka review pages read when scraping a product
+ROZETKA_REVIEW_MAX_PAGES = 20
+# Rozetka search categories scraped concurrently across all requests in a process
+SUGGESTION_SCRAPE_CONCURRENCY = 4
+
+# Singleflight: seconds a lock holder may run before others take over, and how long callers wait for it
+SINGLEFLIGHT_LEASE = 300
+SINGLEFLIGHT_WAIT_TIMEOUT = 180
+# Seconds between lease renewals while a singleflight leader is running
+SINGLEFLIGHT_RENEW_INTERVAL = 60
+
+# Freshness: seconds a marketplace's scraped data stays fresh; marketplaces not listed use DEFAULT_SOURCE_TTL
+DEFAULT_SOURCE_TTL = 12 * 60 * 60
+SOURCE_TTLS = {
+    'rozetka': 6 * 60 * 60,
+    'citrus': 12 * 60 * 60,
+    'comfy': 12 * 60 * 60,
+    'allo': 12 * 60 * 60,
+    'foxtrot': 12 * 60 * 60,
+}
+# Serve stale product data immediately and queue a background refresh
+STALE_WHILE_REVALIDATE = True
+# Maximum number of marketplace refreshes queued or running at once, by refresh_stale_sources and product views
+REFRESH_SCRAPE_BUDGET = 20
+# Seconds before a source is refreshed again after an attempt, doubling per consecutive failed or empty refresh
+REFRESH_RETRY_DELAY = 15 * 60
+REFRESH_RETRY_MAX_DELAY = 24 * 60 * 60
+
+# Raw price observations older than this many days are rolled up to one row per day
+PRICE_HISTORY_RAW_DAYS = 30
+
+# Threads available to async views for blocking work such as ORM queries and scraping
+ASYNC_BLOCKING_THREADS = 16
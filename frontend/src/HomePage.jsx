@@ -1,4 +1,4 @@
-import React, { useContext, useEffect, useState } from "react";
+import React, { useContext, useEffect, useRef, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import apiClient from "./axiosConfig";
 import { SearchContext } from "./SearchContext";
@@ -18,8 +18,13 @@ const HomePage = () => {
     const [currentPage, setCurrentPage] = useState(1);
     const [totalPages, setTotalPages] = useState(0);
     const [sortBy, setSortBy] = useState(""); // State for sorting
+    const [isStreaming, setIsStreaming] = useState(false);
+    const eventSourceRef = useRef(null);
     const navigate = useNavigate();
 
+    // Close an open suggestions stream when leaving the page
+    useEffect(() => () => eventSourceRef.current?.close(), []);
+
     useEffect(() => {
         const fetchCategories = async () => {
             try {
@@ -33,7 +38,54 @@ const HomePage = () => {
         fetchCategories();
     }, []);
 
+    // The first page is streamed, so cached results show up at once and scraped ones as each category finishes
+    const streamSearch = () => {
+        eventSourceRef.current?.close();
+        setError("");
+        setSearchResults([]);
+        setTotalPages(0);
+        setCurrentPage(1);
+        setIsStreaming(true);
+
+        const params = new URLSearchParams({
+            query: searchTerm,
+            category_id: selectedCategory,
+            sort_by: sortBy,
+        });
+        const eventSource = new EventSource(
+            `${apiClient.defaults.baseURL}/api/suggestions/stream/?${params}`,
+            { withCredentials: true }
+        );
+        eventSourceRef.current = eventSource;
+
+        eventSource.addEventListener("results", (event) => {
+            const data = JSON.parse(event.data);
+            setSearchResults((previous) => [...previous, ...data.results]);
+        });
+        eventSource.addEventListener("done", (event) => {
+            const data = JSON.parse(event.data);
+            if (data.results) {
+                // Scraped categories stream in as they finish; show the sorted first page in their place
+                setSearchResults(data.results);
+            }
+            setTotalPages(Math.ceil(data.count / data.page_size));
+            setIsStreaming(false);
+            eventSource.close();
+        });
+        eventSource.onerror = () => {
+            // Also fired for the server's `error` event
+            setError("Помилки при отриманні пропозицій.");
+            setIsStreaming(false);
+            eventSource.close();
+        };
+    };
+
     const handleSearch = async (page = 1) => {
+        if (page === 1) {
+            streamSearch();
+            return;
+        }
+
         try {
             setError("");
             const response = await apiClient.get(`/api/suggestions/`, {
@@ -110,6 +162,7 @@ const HomePage = () => {
             </div>
 
             {error && <p className="text-red-500 mt-4">{error}</p>}
+            {isStreaming && <p className="text-gray-500 mt-4">Шукаємо пропозиції...</p>}
 
             {/* Render Suggestions */}
             {searchResults.length > 0 && (
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useCallback } from "react";
 import apiClient from "./axiosConfig";
 import { toast } from 'react-toastify';
 
@@ -6,10 +6,47 @@ const ModelsPanel = () => {
     const [models, setModels] = useState([]);
     const [unassociatedReviewsCount, setUnassociatedReviewsCount] = useState(0);
     const [error, setError] = useState("");
+    const [trainingJob, setTrainingJob] = useState(null);
+    const [trainingMode, setTrainingMode] = useState(""); // "" lets the server choose between full and finetune
+
+    const isTraining = trainingJob && ["queued", "running"].includes(trainingJob.status);
+
+    const fetchTrainingStatus = useCallback(async () => {
+        try {
+            const response = await apiClient.get("/api/admin/models/train/status/");
+            setTrainingJob(response.data.data);
+            return response.data.data;
+        } catch (err) {
+            console.error("Error fetching training status:", err);
+            return null;
+        }
+    }, []);
 
     useEffect(() => {
         fetchModels();
-    }, []);
+        fetchTrainingStatus();
+    }, [fetchTrainingStatus]);
+
+    // Poll the training job while it is queued or running
+    useEffect(() => {
+        if (!isTraining) {
+            return undefined;
+        }
+        const jobId = trainingJob.job_id;
+        const interval = setInterval(async () => {
+            const job = await fetchTrainingStatus();
+            if (!job || job.job_id !== jobId || ["queued", "running"].includes(job.status)) {
+                return;
+            }
+            if (job.status === "done") {
+                toast.success("Навчання моделі успішно завершено.");
+                fetchModels();
+            } else {
+                toast.error(`Не вдалося навчити модель: ${job.error}`);
+            }
+        }, 3000);
+        return () => clearInterval(interval);
+    }, [isTraining, trainingJob?.job_id, fetchTrainingStatus]);
 
     const fetchModels = async () => {
         try {
@@ -35,26 +72,92 @@ const ModelsPanel = () => {
 
     const handleTrainModel = async () => {
         try {
-            const response = await apiClient.post("/api/admin/models/train/");
-            toast.success("Навчання моделі успішно завершено.");
-            fetchModels(); // Refresh the list of models
+            const response = await apiClient.post("/api/admin/models/train/", { mode: trainingMode || null });
+            setTrainingJob(response.data.data);
+            toast.info("Навчання моделі розпочато.");
         } catch (err) {
             console.error("Error training model:", err);
             toast.error("Не вдалося навчити модель.");
         }
     };
 
+    const handleCancelTraining = async () => {
+        try {
+            const response = await apiClient.post(`/api/admin/models/train/${trainingJob.job_id}/cancel/`);
+            setTrainingJob(response.data.data);
+            toast.info("Навчання буде зупинено після поточної епохи.");
+        } catch (err) {
+            console.error("Error cancelling training:", err);
+            toast.error("Не вдалося скасувати навчання.");
+        }
+    };
+
+    const renderTrainingProgress = () => {
+        const progress = trainingJob.progress;
+        if (trainingJob.status === "queued" || !progress) {
+            return <p>Навчання в черзі...</p>;
+        }
+        if (progress.stage !== "training") {
+            return <p>Етап: {progress.stage}</p>;
+        }
+        return (
+            <div>
+                <p>Епоха {progress.epoch} з {progress.epochs}</p>
+                <div className="w-full bg-gray-200 rounded h-2 my-2">
+                    <div
+                        className="bg-green-500 h-2 rounded"
+                        style={{ width: `${(progress.epoch / progress.epochs) * 100}%` }}
+                    />
+                </div>
+                {progress.metrics.accuracy !== undefined && (
+                    <p>
+                        Accuracy: {progress.metrics.accuracy.toFixed(3)}, Loss: {progress.metrics.loss.toFixed(3)}
+                        {progress.metrics.val_accuracy !== undefined &&
+                            `, Val accuracy: ${progress.metrics.val_accuracy.toFixed(3)}`}
+                    </p>
+                )}
+            </div>
+        );
+    };
+
     return (
         <div className="p-4">
             <h1 className="text-4xl font-bold text-center mb-8">Панель Адміна - ML Models</h1>
 
+            <select
+                value={trainingMode}
+                onChange={(e) => setTrainingMode(e.target.value)}
+                className="px-4 py-2 mr-2 mb-4 border rounded"
+                disabled={isTraining}
+            >
+                <option value="">Автоматично</option>
+                <option value="finetune">Донавчання активної моделі</option>
+                <option value="full">Повне навчання</option>
+            </select>
+
             <button
                 onClick={handleTrainModel}
-                className="px-4 py-2 bg-green-500 text-white rounded hover:bg-green-600 mb-4"
+                className={`px-4 py-2 text-white rounded mb-4 ${
+                    isTraining ? "bg-gray-500 cursor-not-allowed" : "bg-green-500 hover:bg-green-600"
+                }`}
+                disabled={isTraining}
             >
-                Навчити Нову Модель
+                {isTraining ? "Модель навчається..." : "Навчити Нову Модель"}
             </button>
 
+            {isTraining && (
+                <div className="p-4 mb-6 bg-white rounded-lg shadow-md border border-gray-300">
+                    {renderTrainingProgress()}
+                    <button
+                        onClick={handleCancelTraining}
+                        className="px-4 py-2 mt-2 bg-red-500 text-white rounded hover:bg-red-600"
+                        disabled={trainingJob.cancel_requested}
+                    >
+                        {trainingJob.cancel_requested ? "Скасування..." : "Скасувати навчання"}
+                    </button>
+                </div>
+            )}
+
             {error && <p className="text-red-500">{error}</p>}
 
             <div className="mb-6">
@@ -73,6 +176,10 @@ const ModelsPanel = () => {
                     >
                         <p><strong>Назва файлу:</strong> {model.file_name}</p>
                         <p><strong>Створено:</strong> {new Date(model.created_at).toLocaleString()}</p>
+                        <p>
+                            <strong>Тип навчання:</strong>{" "}
+                            {model.training_mode === "finetune" ? "Донавчання" : "Повне навчання"}
+                        </p>
                         <p><strong>Accuracy:</strong> {model.accuracy.toFixed(2)}</p>
                         <p><strong>Precision:</strong> {model.precision.toFixed(2)}</p>
                         <p><strong>Recall:</strong> {model.recall.toFixed(2)}</p>
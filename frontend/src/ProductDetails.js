@@ -5,11 +5,43 @@ import {AuthContext} from "./AuthContext";
 import ReviewStars from "./Components/ReviewStars";
 import { toast } from 'react-toastify';
 
+// Give up waiting for a background scrape after this long
+const JOB_WAIT_TIMEOUT_MS = 5 * 60 * 1000;
+
+// Reviews are served in cursor-paginated pages grouped per marketplace
+const fetchReviewPage = async (url) => {
+    const response = await apiClient.get(url);
+    return { groups: response.data.results, next: response.data.next };
+};
+
+// Append a page's per-marketplace groups to those already shown
+const mergeReviewGroups = (groups, page) => {
+    const merged = groups.map((group) => ({ ...group, reviews: [...group.reviews] }));
+    for (const group of page) {
+        const existing = merged.find((g) => g.marketplace === group.marketplace);
+        if (existing) {
+            existing.reviews.push(...group.reviews);
+        } else {
+            merged.push({ marketplace: group.marketplace, reviews: [...group.reviews] });
+        }
+    }
+    return merged;
+};
+
+// Metrics come from the product's precomputed review aggregates, not from the loaded review pages
+const productMetrics = (product) => ({
+    positiveCount: product.positive_count,
+    neutralCount: product.neutral_count,
+    negativeCount: product.negative_count,
+    overallScore: product.review_count > 0 ? product.average_rating.toFixed(2) : "N/A",
+});
+
 const ProductDetails = () => {
     const { productId } = useParams();
     const [product, setProduct] = useState(null);
     const [reviewsBySource, setReviewsBySource] = useState([]);
-    const [metrics, setMetrics] = useState(null);
+    const [nextReviewsUrl, setNextReviewsUrl] = useState(null);
+    const [isLoadingReviews, setIsLoadingReviews] = useState(false);
     const [error, setError] = useState("");
     const [userReview, setUserReview] = useState("");
     const [userRating, setUserRating] = useState(0);
@@ -19,51 +51,70 @@ const ProductDetails = () => {
     const navigate = useNavigate();
 
     useEffect(() => {
+        // Set on unmount or when productId changes, so stale requests stop polling and updating state
+        let cancelled = false;
+
+        // Poll a background scrape job until it finishes, gives up, or the page is left
+        const waitForJob = async (jobId) => {
+            const deadline = Date.now() + JOB_WAIT_TIMEOUT_MS;
+            while (!cancelled) {
+                if (Date.now() > deadline) {
+                    throw new Error("Timed out waiting for the scrape job.");
+                }
+                await new Promise((resolve) => setTimeout(resolve, 2000));
+                if (cancelled) {
+                    return;
+                }
+                const jobResponse = await apiClient.get(`/api/jobs/${jobId}/`);
+                if (jobResponse.data.status === "done") {
+                    return;
+                }
+                if (jobResponse.data.status === "failed") {
+                    throw new Error(jobResponse.data.error);
+                }
+            }
+        };
+
         const fetchProductDetails = async () => {
             try {
-                const productResponse = await apiClient.get(`/api/product/`, { params: { productId: productId } });
+                let productResponse = await apiClient.get(`/api/product/`, { params: { productId: productId } });
+                if (productResponse.status === 202) {
+                    // The product is being scraped; wait for the job and request it again
+                    await waitForJob(productResponse.data.job_id);
+                    if (cancelled) {
+                        return;
+                    }
+                    productResponse = await apiClient.get(`/api/product/`, { params: { productId: productId } });
+                    if (productResponse.status === 202) {
+                        setError("Інформацію про товар не знайдено.");
+                        return;
+                    }
+                }
+                if (cancelled) {
+                    return;
+                }
                 setProduct(productResponse.data);
 
-                const reviewsResponse = await apiClient.get(`/api/product/${productResponse.data.id}/reviews/`);
-                setReviewsBySource(reviewsResponse.data);
-
-                // Calculate metrics
-                const positiveCount = reviewsResponse.data.reduce(
-                    (acc, source) => acc + source.reviews.filter(r => r.model_sentiment === "Positive").length,
-                    0
-                );
-                const neutralCount = reviewsResponse.data.reduce(
-                    (acc, source) => acc + source.reviews.filter(r => r.model_sentiment === "Neutral").length,
-                    0
-                );
-                const negativeCount = reviewsResponse.data.reduce(
-                    (acc, source) => acc + source.reviews.filter(r => r.model_sentiment === "Negative").length,
-                    0
-                );
-
-                const totalRating = reviewsResponse.data.reduce(
-                    (acc, source) => acc + source.reviews.reduce((sum, r) => sum + r.rating, 0),
-                    0
-                );
-
-                const totalReviews = reviewsResponse.data.reduce(
-                    (acc, source) => acc + source.reviews.length,
-                    0
-                );
-
-                setMetrics({
-                    positiveCount,
-                    neutralCount,
-                    negativeCount,
-                    overallScore: totalReviews > 0 ? (totalRating / totalReviews).toFixed(2) : "N/A",
-                });
+                // Only the first page of reviews is loaded up front; further pages load on request
+                const page = await fetchReviewPage(`/api/product/${productResponse.data.id}/reviews/`);
+                if (cancelled) {
+                    return;
+                }
+                setReviewsBySource(mergeReviewGroups([], page.groups));
+                setNextReviewsUrl(page.next);
             } catch (err) {
+                if (cancelled) {
+                    return;
+                }
                 setError("Помилка при отриманні інформації про товар або відгуків.");
                 console.error(err);
             }
         };
 
         fetchProductDetails();
+        return () => {
+            cancelled = true;
+        };
     }, [productId]);
 
     const handleAddReview = async () => {
@@ -82,15 +133,32 @@ const ProductDetails = () => {
             setUserReview("");
             setUserRating(0);
 
-            // Refresh reviews to include the newly added review
-            const reviewsResponse = await apiClient.get(`/api/product/${product.id}/reviews/`);
-            setReviewsBySource(reviewsResponse.data);
+            // Reload the product metrics and the first page of reviews to include the newly added review
+            const productResponse = await apiClient.get(`/api/product/`, { params: { productId: product.id } });
+            setProduct(productResponse.data);
+            const page = await fetchReviewPage(`/api/product/${product.id}/reviews/`);
+            setReviewsBySource(mergeReviewGroups([], page.groups));
+            setNextReviewsUrl(page.next);
         } catch (err) {
             console.error("Error adding review:", err);
             toast.error("Не вдалося надіслати ваш відгук.");
         }
     };
 
+    const loadMoreReviews = async () => {
+        setIsLoadingReviews(true);
+        try {
+            const page = await fetchReviewPage(nextReviewsUrl);
+            setReviewsBySource((groups) => mergeReviewGroups(groups, page.groups));
+            setNextReviewsUrl(page.next);
+        } catch (err) {
+            console.error("Error loading reviews:", err);
+            toast.error("Не вдалося завантажити відгуки.");
+        } finally {
+            setIsLoadingReviews(false);
+        }
+    };
+
     const markReviewForReview = async (reviewId) => {
         try {
             await apiClient.post(`/api/reviews/${reviewId}/mark-for-review/`);
@@ -105,6 +173,8 @@ const ProductDetails = () => {
         return <div className="text-red-500">{error}</div>;
     }
 
+    const metrics = product ? productMetrics(product) : null;
+
     return (
         <div className="flex flex-col items-center justify-center min-h-screen bg-gray-100 p-4">
             <button onClick={() => navigate(-1)} className="mb-4 p-2 bg-gray-200 hover:bg-gray-300 rounded">
@@ -233,6 +303,15 @@ const ProductDetails = () => {
                             </div>
                         );
                     })}
+                    {nextReviewsUrl && (
+                        <button
+                            onClick={loadMoreReviews}
+                            disabled={isLoadingReviews}
+                            className="mb-8 px-4 py-2 bg-gray-200 rounded hover:bg-gray-300 disabled:opacity-50"
+                        >
+                            {isLoadingReviews ? "Завантаження..." : "Показати більше відгуків"}
+                        </button>
+                    )}
                     {user &&
                         <div className="mt-8 bg-white shadow-md rounded-lg p-6 w-full max-w-2xl">
                             <h3 className="text-xl font-bold mb-4">Додати відгук</h3>